@@ -8,7 +8,10 @@ import {
   useGetPropertiesQuery,
   useGetTenantQuery,
 } from "@/state/api";
-import React from "react";
+import React, { useEffect, useState } from "react";
+
+// get_properties' largest page; further pages are followed until none is left
+const FAVORITES_PAGE_SIZE = 100;
 
 const Favorites = () => {
   const { data: authUser } = useGetAuthUserQuery();
@@ -19,15 +22,25 @@ const Favorites = () => {
     }
   );
 
+  const favoriteIds = tenant?.favorites?.map((fav: { id: number }) => fav.id);
+  const favoritesKey = favoriteIds?.join(",") ?? "";
+  const [more, setMore] = useState<{ favoritesKey: string; cursor: string } | null>(null);
+  const cursor = more?.favoritesKey === favoritesKey ? more.cursor : null;
+
   const {
     data: favoriteProperties,
     isLoading,
     error,
   } = useGetPropertiesQuery(
-    { favoriteIds: tenant?.favorites?.map((fav: { id: number }) => fav.id) },
+    { favoriteIds, limit: FAVORITES_PAGE_SIZE, cursor },
     { skip: !tenant?.favorites || tenant?.favorites.length === 0 }
   );
 
+  const nextCursor = favoriteProperties?.nextCursor;
+  useEffect(() => {
+    if (nextCursor) setMore({ favoritesKey, cursor: nextCursor });
+  }, [nextCursor, favoritesKey]);
+
   if (isLoading) return <Loading />;
   if (error) return <div>Error loading favorites</div>;
 
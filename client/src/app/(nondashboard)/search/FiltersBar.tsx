@@ -3,7 +3,7 @@ import { useAppSelector } from '@/state/redux';
 import { usePathname, useRouter } from 'next/navigation';
 import { debounce } from 'lodash';
 
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import { useDispatch } from 'react-redux';
 import { FiltersState, setFilters, setViewMode, toggleFiltersFullOpen } from '@/state';
 import { Filter, Grid, List, Search } from 'lucide-react';
@@ -13,6 +13,8 @@ import { Input } from '@/components/ui/input';
 import { Select, SelectContent, SelectItem, SelectValue } from '@/components/ui/select';
 import { SelectTrigger } from '@radix-ui/react-select';
 import { PropertyTypeIcons } from '@/lib/constants';
+import { useGetLocationSuggestionsQuery } from '@/state/api';
+import { LocationSuggestion } from '@/types/models';
 
 const FiltersBar = () => {
     const dispatch = useDispatch();
@@ -22,6 +24,18 @@ const FiltersBar = () => {
     const isFiltersFullOpen = useAppSelector((state) => state.global.isFiltersFullOpen);
     const viewMode = useAppSelector((state) => state.global.viewMode);
     const [searchInput, setSearchInput] = useState('');
+    const [suggestQuery, setSuggestQuery] = useState('');
+    const [showSuggestions, setShowSuggestions] = useState(false);
+
+    // Autocomplete from our own locations; only the settled input is sent
+    useEffect(() => {
+        const timer = setTimeout(() => setSuggestQuery(searchInput.trim()), 200);
+        return () => clearTimeout(timer);
+    }, [searchInput]);
+    const { data: suggestionData } = useGetLocationSuggestionsQuery(suggestQuery, {
+        skip: suggestQuery.length < 2,
+    });
+    const suggestions = suggestQuery.length < 2 ? [] : suggestionData?.suggestions ?? [];
     const updateURL = debounce((newFilters : FiltersState) => {
         const cleanFilters = cleanParams(newFilters);
         const updatedSearchParams = new URLSearchParams(cleanFilters);
@@ -63,6 +77,17 @@ const FiltersBar = () => {
         dispatch(setFilters(newFilters));
     }
 
+    const handleSuggestionSelect = (suggestion: LocationSuggestion) => {
+        setSearchInput(suggestion.label);
+        setShowSuggestions(false);
+        dispatch(
+          setFilters({
+            location: suggestion.label,
+            coordinates: [suggestion.longitude, suggestion.latitude],
+          })
+        );
+    }
+
     const handleLocationSearch = async () => {
         try {
           const response = await fetch(
@@ -106,13 +131,36 @@ const FiltersBar = () => {
                 </Button>
 
                 {/* Search Location */}
-                <div className='flex items-center'>
+                <div className='relative flex items-center'>
                     <Input 
                         placeholder='Search Location'
                         value={searchInput}
-                        onChange={(e) => setSearchInput(e.target.value)}
+                        onChange={(e) => {
+                            setSearchInput(e.target.value);
+                            setShowSuggestions(true);
+                        }}
+                        onFocus={() => setShowSuggestions(true)}
+                        onBlur={() => setShowSuggestions(false)}
                         className='w-40 rounded-l-xl rounded-r-none border-primary-400 border-r-0'
                     />
+                    {showSuggestions && suggestions.length > 0 && (
+                        <ul className='absolute left-0 top-full z-20 mt-1 w-72 rounded-xl border border-primary-400 bg-white py-1 shadow-lg'>
+                            {suggestions.map((suggestion) => (
+                                <li
+                                    key={`${suggestion.kind}-${suggestion.label}`}
+                                    // onMouseDown fires before the input's onBlur hides the list
+                                    onMouseDown={(e) => {
+                                        e.preventDefault();
+                                        handleSuggestionSelect(suggestion);
+                                    }}
+                                    className='flex cursor-pointer justify-between gap-2 px-3 py-2 text-sm hover:bg-primary-100'
+                                >
+                                    <span className='truncate'>{suggestion.label}</span>
+                                    <span className='shrink-0 text-primary-500'>{suggestion.listings}</span>
+                                </li>
+                            ))}
+                        </ul>
+                    )}
                     <Button
                         onClick={handleLocationSearch}
                         variant='outline'
@@ -1,5 +1,6 @@
 import Card from "@/components/Card";
 import CardCompact from "@/components/CardCompact";
+import { Button } from "@/components/ui/button";
 import {
   useAddFavoritePropertyMutation,
   useGetAuthUserQuery,
@@ -9,7 +10,7 @@ import {
 } from "@/state/api";
 import { useAppSelector } from "@/state/redux";
 import { Property } from "@/types/models";
-import React from "react";
+import React, { useState } from "react";
 
 const Listings = () => {
   const { data: authUser } = useGetAuthUserQuery();
@@ -23,16 +24,21 @@ const Listings = () => {
   const viewMode = useAppSelector((state) => state.global.viewMode);
   const filters = useAppSelector((state) => state.global.filters);
   // console.log(filters);
+  // next page asked for by "Load more"; new filters start from the first page
+  const [more, setMore] = useState<{ filters: typeof filters; cursor: string } | null>(null);
+  const cursor = more?.filters === filters ? more.cursor : null;
 
   const {
     data: properties,
     isLoading,
+    isFetching,
     isError,
   } = useGetPropertiesQuery({
     ...filters,
     priceRange: filters.priceRange as [number, number] | [null, null],
     squareFeet: filters.squareFeet as [number, number] | [null, null],
     coordinates: filters.coordinates as [number, number] | [null, null],
+    cursor,
   });
 
   const handleFavoriteToggle = async (propertyId: number) => {
@@ -59,7 +65,8 @@ const Listings = () => {
   return (
     <div className="w-full">
       <h3 className="text-sm px-4 font-bold">
-        {properties?.properties.length}{" "}
+        {properties?.properties.length}
+        {properties?.nextCursor ? "+" : ""}{" "}
         <span className="text-gray-700 font-normal">
           Places in {filters.location}
         </span>
@@ -91,6 +98,16 @@ const Listings = () => {
               />
             )
           )}
+          {properties.nextCursor && (
+            <Button
+              variant="outline"
+              className="w-full mt-4"
+              disabled={isFetching}
+              onClick={() => setMore({ filters, cursor: properties.nextCursor! })}
+            >
+              {isFetching ? "Loading..." : "Load more"}
+            </Button>
+          )}
         </div>
       </div>
     </div>
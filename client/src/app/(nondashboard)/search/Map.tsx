@@ -6,6 +6,8 @@ import { useGetPropertiesQuery } from '@/state/api';
 import { Property } from '@/types/models';
 
 mapboxgl.accessToken = process.env.NEXT_PUBLIC_MAPBOX_ACCESS_TOKEN as string;
+// markers shown at once: the largest page get_properties serves
+const MAP_MARKER_LIMIT = 100;
 const Map = () => {
     const mapContainerRef = useRef(null);
     const filters = useAppSelector((state) => state.global.filters);
@@ -17,7 +19,8 @@ const Map = () => {
         ...filters,
         priceRange: filters.priceRange as [number, number] | [null, null],
         squareFeet: filters.squareFeet as [number, number] | [null, null],
-        coordinates: filters.coordinates as [number, number] | [null, null]
+        coordinates: filters.coordinates as [number, number] | [null, null],
+        limit: MAP_MARKER_LIMIT,
     });
     
 
@@ -12,7 +12,9 @@ const Card = ({
   propertyLink,
 }: CardProps) => {
   const [imgSrc, setImgSrc] = React.useState(
-    property.photoUrls?.[0] || "/placeholder.jpg"
+    property.photoDerivatives?.[0]?.card?.webp ||
+      property.photoUrls?.[0] ||
+      "/placeholder.jpg"
   );
 
   return (
@@ -1,7 +1,7 @@
 "use client";
 import { createApi, fetchBaseQuery } from "@reduxjs/toolkit/query/react";
 import { fetchAuthSession, getCurrentUser } from "aws-amplify/auth";
-import { Application, Lease, Manager, Payment, Property, Tenant } from "@/types/models";
+import { Application, Lease, LocationSuggestion, Manager, Payment, Property, Tenant } from "@/types/models";
 import { cleanParams, createNewUserInDatabase, withToast } from "@/lib/utils";
 import { FiltersState } from ".";
 
@@ -79,8 +79,8 @@ export const api = createApi({
 
     // Property related endpoints
     getProperties: build.query<
-      {properties: Property[]},
-      Partial<FiltersState> & { favoriteIds?: number[] }
+      {properties: Property[]; nextCursor?: string | null},
+      Partial<FiltersState> & { favoriteIds?: number[]; cursor?: string | null; limit?: number }
     >({
       query: (filters) => {
         const params = cleanParams({
@@ -95,15 +95,33 @@ export const api = createApi({
           amenities: filters.amenities?.join(","),
           availableFrom: filters.availableFrom,
           favoriteIds: filters.favoriteIds?.join(","),
-          latitude: filters.coordinates?.[0],
-          longitude: filters.coordinates?.[1],
+          // filters.coordinates is [lng, lat] (Mapbox order)
+          latitude: filters.coordinates?.[1],
+          longitude: filters.coordinates?.[0],
+          cursor: filters.cursor,
+          limit: filters.limit,
         });
         return { url: "properties", params };
       },
+      // the pages of one search share a cache entry: passing its nextCursor
+      // as `cursor` appends the next page to the properties already loaded
+      serializeQueryArgs: ({ queryArgs }) => {
+        const { cursor, ...search } = queryArgs; // eslint-disable-line @typescript-eslint/no-unused-vars
+        return search;
+      },
+      merge: (cached, page, { arg }) => {
+        if (!arg.cursor) return page;
+        // a refetch of a page already loaded must not repeat its rows
+        const loaded = new Set(cached.properties.map(({ id }) => id));
+        cached.properties.push(...page.properties.filter(({ id }) => !loaded.has(id)));
+        cached.nextCursor = page.nextCursor;
+      },
+      forceRefetch: ({ currentArg, previousArg }) =>
+        currentArg?.cursor !== previousArg?.cursor,
       providesTags: (result) =>
-        Array.isArray(result) && result.length > 0
+        result && result.properties.length > 0
           ? [
-              ...result.map(({ id }) => ({ type: "Properties" as const, id })),
+              ...result.properties.map(({ id }) => ({ type: "Properties" as const, id })),
               { type: "Properties", id: "LIST" },
             ]
           : [{ type: "Properties", id: "LIST" }],
@@ -114,6 +132,15 @@ export const api = createApi({
       },
     }),
 
+    getLocationSuggestions: build.query<
+      {suggestions: LocationSuggestion[]; timedOut: boolean},
+      string
+    >({
+      query: (q) => ({ url: "locations/suggest", params: { q } }),
+      // keep recent prefixes around: backspacing should not refetch
+      keepUnusedDataFor: 300,
+    }),
+
     getProperty: build.query<Property, number>({
       query: (id) => `properties/${id}`,
       providesTags: (result, error, id) => [{ type: "PropertyDetails", id }],
@@ -330,6 +357,7 @@ export const {
   useRemoveFavoritePropertyMutation,
   useCreateApplicationMutation, 
   useGetPropertyQuery,
+  useGetLocationSuggestionsQuery,
   useGetApplicationsQuery,
   useGetLeasesQuery,
   useGetPropertyLeasesQuery,
@@ -65,12 +65,25 @@ export interface Location {
     postalCode: string;
     latitude: number;
     longitude: number;
+    // Pending until the server-side geocoder has placed it
+    geocodeStatus?: 'Pending' | 'Done' | 'Approximate' | 'Failed';
     coordinates: {
         latitude: number;
         longitude: number;
     };
 }
 
+export interface LocationSuggestion {
+    kind: 'city' | 'state' | 'postalCode' | 'address';
+    label: string;
+    city: string | null;
+    state: string;
+    postalCode: string | null;
+    listings: number;
+    longitude: number;
+    latitude: number;
+}
+
 export interface Manager {
     id: number;
     cognitoId: string;
@@ -88,6 +101,13 @@ export interface Tenant {
     favorites: any[];
 }
 
+export interface PhotoDerivative {
+    width: number;
+    height: number;
+    webp: string;
+    jpeg: string;
+}
+
 export interface Property {
     id: number;
     name: string;
@@ -96,6 +116,7 @@ export interface Property {
     securityDeposit: number;
     applicationFee: number;
     photoUrls: string[];
+    photoDerivatives?: (Record<"thumb" | "card" | "full", PhotoDerivative> | null)[];
     amenities: AmenityEnum[];
     highlights: HighlightEnum[];
     isPetsAllowed: boolean;
@@ -0,0 +1,54 @@
+from django.contrib.gis.db.models import GeometryField
+from django.db.models import Aggregate, BooleanField, FloatField, Func, Value
+
+# PostGIS expressions the ORM has no lookup for. `coordinates` is a planar
+# SRID 4326 geometry, so anything measured in meters goes through ::geography.
+
+
+class AsGeography(Func):
+    template = '(%(expressions)s)::geography'
+    output_field = GeometryField(srid=4326, geography=True)
+
+
+class MakeGeographyPoint(Func):
+    """WGS84 point built from plain (longitude, latitude) parameters."""
+    template = 'ST_SetSRID(ST_MakePoint(%(expressions)s), 4326)::geography'
+    output_field = GeometryField(srid=4326, geography=True)
+
+    def __init__(self, longitude: float, latitude: float):
+        super().__init__(Value(float(longitude)), Value(float(latitude)))
+
+
+class GeographyDWithin(Func):
+    """ST_DWithin on geography; served by the GiST index on coordinates::geography."""
+    function = 'ST_DWithin'
+    output_field = BooleanField()
+
+    def __init__(self, field, longitude: float, latitude: float, meters: float):
+        super().__init__(AsGeography(field), MakeGeographyPoint(longitude, latitude), Value(float(meters)))
+
+
+class KnnDistance(Func):
+    """`<->` distance in meters; ORDER BY on it is an index-assisted KNN scan."""
+    template = '%(expressions)s'
+    arg_joiner = ' <-> '
+    output_field = FloatField()
+
+    def __init__(self, field, longitude: float, latitude: float):
+        super().__init__(AsGeography(field), MakeGeographyPoint(longitude, latitude))
+
+
+class PointX(Func):
+    function = 'ST_X'
+    output_field = FloatField()
+
+
+class PointY(Func):
+    function = 'ST_Y'
+    output_field = FloatField()
+
+
+class Median(Aggregate):
+    function = 'percentile_cont'
+    template = '%(function)s(0.5) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
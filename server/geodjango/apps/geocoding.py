@@ -0,0 +1,508 @@
+import hashlib
+import logging
+import random
+import re
+import time
+import unicodedata
+from datetime import timedelta
+import requests
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from apps.models import GeocodeCache, GeocodeJob, GeocodeStatus, Gazetteer, Location
+from core.lru import LRUCache
+from apps.views.property.cache import hasSharedCounters, incrementCounters, readCounters, resetCounters
+
+# Geocoding happens off the request path. perform_create saves the Location
+# as Pending with a placeholder point and queues a GeocodeJob in the same
+# transaction; `manage.py geocode_worker` claims due jobs, calls the
+# configured geocoder under a rate limit shared by every worker, and writes
+# the coordinates back (or retries with exponential backoff).
+#
+# The geocoder is GEOCODER_CLASS: anything with
+#     geocode(address, city, state, country, postalCode) -> (longitude, latitude) or None
+# that raises GeocoderUnavailable on errors worth retrying. Point GEOCODER_URL
+# at `manage.py geocode_stub` to run without the public Nominatim.
+#
+# Answers are kept in the GeocodeCache table under a normalized (street, city,
+# postalCode, country) key, with a per-process LRU in front, so a repeated
+# address is placed at create time without a job. When the geocoder is
+# unavailable or finds nothing, the postal code centroid from the Gazetteer
+# table gives an Approximate position.
+#
+# A bulk import gives each listing its own Location but queues one job per
+# address; the Locations of the same address without a job of their own
+# follow the one that has it (see _sameAddress).
+
+PLACEHOLDER_POINT = (0.0, 0.0)
+GEOCODER_RATE_LIMIT = 'geocoder'
+
+# Atomically take the next free slot: returns how many seconds to wait for it
+RESERVE_SLOT_SQL = """
+INSERT INTO "RateLimit" (name, "nextAt") VALUES (%s, clock_timestamp() + %s * interval '1 second')
+ON CONFLICT (name) DO UPDATE
+SET "nextAt" = GREATEST("RateLimit"."nextAt", clock_timestamp()) + %s * interval '1 second'
+RETURNING EXTRACT(EPOCH FROM ("nextAt" - %s * interval '1 second' - clock_timestamp()))
+"""
+
+# Due jobs are leased rather than locked: runAt moves past the lease, so a
+# worker that dies mid-job only delays it, and no transaction stays open
+# while the geocoder is called. A lease is (id, attempts): a job claimed
+# again after its lease ran out has a higher attempts, and the writes of the
+# worker that lost it match no row. Jobs are claimed one at a time, right
+# before their rate limit slot, so a lease only has to cover one slot wait
+# and one geocoder call rather than a whole batch of them.
+CLAIM_JOBS_SQL = """
+UPDATE "GeocodeJob" SET "runAt" = now() + %s * interval '1 second', attempts = attempts + 1
+WHERE id IN (
+    SELECT id FROM "GeocodeJob" WHERE "runAt" <= now()
+    ORDER BY "runAt" LIMIT %s
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING id, "locationId", attempts
+"""
+
+
+# Spellings that mean the same thing in an address; both sides of a lookup
+# go through normalizeAddress, so only consistency matters
+STREET_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'road': 'rd', 'boulevard': 'blvd', 'drive': 'dr',
+    'lane': 'ln', 'court': 'ct', 'place': 'pl', 'square': 'sq', 'highway': 'hwy',
+    'parkway': 'pkwy', 'terrace': 'ter', 'apartment': 'apt', 'suite': 'ste', 'floor': 'fl',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+}
+COUNTRY_ALIASES = {
+    'united states': 'us', 'united states of america': 'us', 'usa': 'us', 'us': 'us',
+    'viet nam': 'vn', 'vietnam': 'vn', 'vn': 'vn',
+    'united kingdom': 'gb', 'uk': 'gb', 'great britain': 'gb', 'gb': 'gb',
+    'canada': 'ca', 'ca': 'ca', 'australia': 'au', 'au': 'au',
+    'germany': 'de', 'deutschland': 'de', 'de': 'de', 'france': 'fr', 'fr': 'fr',
+}
+
+STATS_KEY = 'geocode:stats'
+# where a lookup was answered; 'miss' went on to the remote geocoder
+LOOKUP_SOURCES = ['lru', 'table', 'miss', 'remote', 'remoteError', 'gazetteer', 'gazetteerMiss']
+_MISSING = object()
+
+
+def _normalizeText(value) -> str:
+    value = unicodedata.normalize('NFKD', str(value or ''))
+    value = ''.join(c for c in value if not unicodedata.combining(c)).lower()
+    return ' '.join(re.sub(r'[^\w]+', ' ', value).split())
+
+
+def normalizeCountry(country) -> str:
+    country = _normalizeText(country)
+    return COUNTRY_ALIASES.get(country, country)
+
+
+def normalizePostalCode(postalCode) -> str:
+    return re.sub(r'[\s-]+', '', str(postalCode or '')).upper()
+
+
+def normalizeAddress(street, city, postalCode, country) -> tuple:
+    """(street, city, postalCode, country) with case, accents, punctuation and common abbreviations folded."""
+    words = [STREET_ABBREVIATIONS.get(word, word) for word in _normalizeText(street).split()]
+    return ' '.join(words), _normalizeText(city), normalizePostalCode(postalCode), normalizeCountry(country)
+
+
+def geocodeKey(parts: tuple) -> str:
+    return hashlib.sha1('\x1f'.join(parts).encode()).hexdigest()
+
+
+# Metrics, counted like the search cache hits: web workers and the geocode
+# worker add up (`manage.py geocode_stats`) on a backend with an atomic incr
+# (Redis), and each process keeps its own otherwise.
+
+def _statKeys() -> list:
+    return [f"{STATS_KEY}:{source}:{kind}" for source in LOOKUP_SOURCES for kind in ('count', 'micros')]
+
+
+def recordLookup(source: str, start: float, count: int = 1):
+    if not count:
+        return
+    micros = int((time.perf_counter() - start) * 1e6)
+    incrementCounters({f"{STATS_KEY}:{source}:count": count, f"{STATS_KEY}:{source}:micros": micros})
+
+
+def geocodeStats() -> dict:
+    """
+    Lookup counts and mean latency per source, plus the cache hit rate
+    (LRU and table hits over all cached lookups).
+    """
+    values = readCounters(_statKeys())
+    sources = {}
+    for source in LOOKUP_SOURCES:
+        count = values[f"{STATS_KEY}:{source}:count"]
+        micros = values[f"{STATS_KEY}:{source}:micros"]
+        sources[source] = {'count': count, 'meanMs': micros / count / 1000 if count else None}
+    hits = sources['lru']['count'] + sources['table']['count']
+    lookups = hits + sources['miss']['count']
+    return {'sources': sources, 'hitRate': hits / lookups if lookups else None, 'shared': hasSharedCounters()}
+
+
+def resetGeocodeStats():
+    resetCounters(_statKeys())
+
+
+# Cache and gazetteer
+
+_geocodeLru = None
+
+
+def geocodeLru() -> LRUCache:
+    global _geocodeLru
+    if _geocodeLru is None:
+        # the TTL lets "no match" entries expire here as they do in the table
+        _geocodeLru = LRUCache(settings.GEOCODE_LRU_SIZE, settings.GEOCODE_LRU_TTL)
+    return _geocodeLru
+
+
+def cachedGeocode(street, city, postalCode, country):
+    """
+    Look an address up in the LRU, then in GeocodeCache. Never calls the
+    remote geocoder. Misses, and "no match" entries older than
+    GEOCODE_NEGATIVE_TTL_DAYS days, are reported as not cached.
+    Returns:
+        tuple: (cached, (longitude, latitude) or None)
+    """
+    start = time.perf_counter()
+    key = geocodeKey(normalizeAddress(street, city, postalCode, country))
+    entry = geocodeLru().get(key, _MISSING)
+    if entry is not _MISSING:
+        recordLookup('lru', start)
+        return True, entry
+
+    row = GeocodeCache.objects.filter(key=key).values_list('coordinates', 'createdAt').first()
+    if row is not None:
+        coordinates, createdAt = row
+        if coordinates is not None or createdAt > timezone.now() - timedelta(days=settings.GEOCODE_NEGATIVE_TTL_DAYS):
+            point = (coordinates.x, coordinates.y) if coordinates is not None else None
+            geocodeLru().set(key, point)
+            recordLookup('table', start)
+            return True, point
+    recordLookup('miss', start)
+    return False, None
+
+
+def cachedGeocodeMany(addresses) -> dict:
+    """
+    cachedGeocode for many addresses at once: the LRU, then a single
+    GeocodeCache query for everything it did not have. Used by bulk imports.
+    Args:
+        addresses: (street, city, postalCode, country) tuples; duplicates are looked up once.
+    Returns:
+        dict: {geocodeKey: (cached, (longitude, latitude) or None)}
+    """
+    start = time.perf_counter()
+    keys = {geocodeKey(normalizeAddress(*address)) for address in addresses}
+    results = {}
+    for key in keys:
+        entry = geocodeLru().get(key, _MISSING)
+        if entry is not _MISSING:
+            results[key] = (True, entry)
+    recordLookup('lru', start, len(results))
+
+    start = time.perf_counter()
+    missing = keys - set(results)
+    expired = timezone.now() - timedelta(days=settings.GEOCODE_NEGATIVE_TTL_DAYS)
+    found = 0
+    for key, coordinates, createdAt in GeocodeCache.objects.filter(key__in=missing).values_list('key', 'coordinates', 'createdAt'):
+        if coordinates is not None or createdAt > expired:
+            point = (coordinates.x, coordinates.y) if coordinates is not None else None
+            geocodeLru().set(key, point)
+            results[key] = (True, point)
+            found += 1
+    recordLookup('table', start, found)
+    for key in keys - set(results):
+        results[key] = (False, None)
+    recordLookup('miss', start, len(missing) - found)
+    return results
+
+
+def storeGeocode(street, city, postalCode, country, point):
+    """Remember a remote geocoder answer; `point` None records "no match"."""
+    parts = normalizeAddress(street, city, postalCode, country)
+    key = geocodeKey(parts)
+    GeocodeCache.objects.update_or_create(key=key, defaults={
+        'street': parts[0][:255], 'city': parts[1][:100], 'postalCode': parts[2][:20], 'country': parts[3][:100],
+        'coordinates': Point(*point, srid=4326) if point is not None else None,
+    })
+    geocodeLru().set(key, point)
+
+
+def gazetteerLookup(postalCode, country):
+    """
+    Returns:
+        tuple: (longitude, latitude) of the postal code centroid, or None.
+    """
+    start = time.perf_counter()
+    postalCode, country = normalizePostalCode(postalCode), normalizeCountry(country)
+    key = f"gazetteer:{country}:{postalCode}"
+    point = geocodeLru().get(key, _MISSING)
+    if point is _MISSING:
+        coordinates = Gazetteer.objects.filter(country=country, postalCode=postalCode).values_list('coordinates', flat=True).first()
+        point = (coordinates.x, coordinates.y) if coordinates is not None else None
+        geocodeLru().set(key, point)
+    recordLookup('gazetteer' if point is not None else 'gazetteerMiss', start)
+    return point
+
+
+def gazetteerLookupMany(pairs) -> dict:
+    """
+    gazetteerLookup for many (postalCode, country) pairs in one query.
+    Returns:
+        dict: {(normalized postalCode, normalized country): (longitude, latitude) or None}
+    """
+    start = time.perf_counter()
+    pairs = {(normalizePostalCode(postalCode), normalizeCountry(country)) for postalCode, country in pairs}
+    results = {}
+    for postalCode, country in pairs:
+        point = geocodeLru().get(f"gazetteer:{country}:{postalCode}", _MISSING)
+        if point is not _MISSING:
+            results[(postalCode, country)] = point
+
+    missing = pairs - set(results)
+    if missing:
+        rows = Gazetteer.objects.filter(
+            country__in={country for _, country in missing}, postalCode__in={postalCode for postalCode, _ in missing},
+        ).values_list('postalCode', 'country', 'coordinates')
+        # the IN lists cross every country with every postal code: keep only the pairs asked for
+        found = {(postalCode, country): (coordinates.x, coordinates.y) for postalCode, country, coordinates in rows}
+        for pair in missing:
+            results[pair] = found.get(pair)
+            geocodeLru().set(f"gazetteer:{pair[1]}:{pair[0]}", results[pair])
+
+    hits = sum(point is not None for point in results.values())
+    recordLookup('gazetteer', start, hits)
+    recordLookup('gazetteerMiss', start, len(results) - hits)
+    return results
+
+
+class GeocoderUnavailable(Exception):
+    """Transient geocoder failure (timeout, 429, 5xx); the job is retried."""
+
+    def __init__(self, message: str, retryAfter: float = None):
+        super().__init__(message)
+        self.retryAfter = retryAfter
+
+
+class NominatimGeocoder:
+    """Structured search against Nominatim or any server speaking its API."""
+
+    def __init__(self, url: str = None, userAgent: str = None, timeout: float = None):
+        self.url = url or settings.GEOCODER_URL
+        self.userAgent = userAgent or settings.GEOCODER_USER_AGENT
+        self.timeout = timeout or settings.GEOCODER_TIMEOUT
+        self.session = requests.Session()
+
+    def geocode(self, address, city, state, country, postalCode):
+        """
+        Returns:
+            tuple: (longitude, latitude), or None when nothing matches.
+        Raises:
+            GeocoderUnavailable: On timeouts, connection errors, 429 and 5xx.
+            requests.HTTPError: On other error responses, which are not retried.
+        """
+        params = {
+            'street': address, 'city': city, 'country': country, 'postalcode': postalCode,
+            'format': 'json', 'limit': 1,
+        }
+        try:
+            response = self.session.get(self.url, params=params, headers={'User-Agent': self.userAgent}, timeout=self.timeout)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            raise GeocoderUnavailable(str(e))
+        if response.status_code == 429 or response.status_code >= 500:
+            retryAfter = response.headers.get('Retry-After')
+            raise GeocoderUnavailable(
+                f"Geocoder answered {response.status_code}",
+                float(retryAfter) if retryAfter and retryAfter.isdigit() else None,
+            )
+        response.raise_for_status()
+        results = response.json()
+        if not results:
+            return None
+        return float(results[0]['lon']), float(results[0]['lat'])
+
+
+_geocoder = None
+
+
+def geocoder():
+    """Process-wide instance of settings.GEOCODER_CLASS."""
+    global _geocoder
+    if _geocoder is None:
+        _geocoder = import_string(settings.GEOCODER_CLASS)()
+    return _geocoder
+
+
+def reserveSlot(name: str, ratePerSecond: float) -> float:
+    """
+    Reserve the next call slot of the rate limit `name`, shared through the
+    database by every worker process and host.
+    Returns:
+        float: Seconds to sleep before making the call.
+    """
+    interval = 1 / ratePerSecond
+    with connection.cursor() as cursor:
+        cursor.execute(RESERVE_SLOT_SQL, [name, interval, interval, interval])
+        wait = cursor.fetchone()[0]
+    return max(float(wait), 0.0)
+
+
+def enqueueGeocode(location: Location):
+    """Queue a geocode of `location`; call inside the transaction that saved it."""
+    GeocodeJob.objects.update_or_create(
+        locationId=location,
+        defaults={'runAt': timezone.now(), 'attempts': 0, 'lastError': ''},
+    )
+
+
+def retryDelay(attempts: int, retryAfter: float = None) -> float:
+    """Exponential backoff with jitter, never shorter than the server's Retry-After."""
+    delay = min(settings.GEOCODE_RETRY_MAX_DELAY, settings.GEOCODE_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+    delay *= random.uniform(0.5, 1.0)
+    return max(delay, retryAfter or 0)
+
+
+def claimJobs(batchSize: int) -> list:
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(CLAIM_JOBS_SQL, [settings.GEOCODE_JOB_LEASE, batchSize])
+        return cursor.fetchall()
+
+
+def _sameAddress(location: Location) -> list:
+    """
+    Locations an import placed along with `location`: the same normalized
+    address and state, in the same status, and no GeocodeJob of their own.
+    """
+    key = geocodeKey(normalizeAddress(location.address, location.city, location.postalCode, location.country))
+    candidates = Location.objects.filter(
+        state__iexact=location.state, geocodeStatus=location.geocodeStatus, geocodeJob__isnull=True,
+    ).exclude(id=location.id)
+    return [
+        other for other in candidates
+        if geocodeKey(normalizeAddress(other.address, other.city, other.postalCode, other.country)) == key
+    ]
+
+
+def _place(locations: list, point, status: str):
+    for location in locations:
+        if point is not None:
+            location.coordinates = Point(*point, srid=4326)
+        location.geocodeStatus = status
+        # a regular save, so the search/market/saved-search signals see the move
+        location.save(update_fields=['coordinates', 'geocodeStatus'])
+
+
+def _holdsLease(jobId: int, attempts: int) -> bool:
+    """Lock the job if this worker's lease on it is still the current one."""
+    return GeocodeJob.objects.select_for_update().filter(id=jobId, attempts=attempts).exists()
+
+
+def _finish(jobId: int, attempts: int, location: Location, point, status: str, error: str = '') -> bool:
+    """
+    Returns:
+        bool: False, and nothing written, when the lease was lost to another worker.
+    """
+    with transaction.atomic():
+        if not _holdsLease(jobId, attempts):
+            return False
+        _place([location] + _sameAddress(location), point, status)
+        GeocodeJob.objects.filter(id=jobId).delete()
+    if error:
+        logging.warning(f"Geocoding location {location.id} failed: {error}")
+    return True
+
+
+def _fallback(jobId: int, attempts: int, location: Location, error: str):
+    """Give up on the geocoder: keep or take the postal code centroid, else Failed."""
+    if location.geocodeStatus == GeocodeStatus.Approximate:
+        point, status = None, GeocodeStatus.Approximate
+    else:
+        point = gazetteerLookup(location.postalCode, location.country)
+        status = GeocodeStatus.Approximate if point else GeocodeStatus.Failed
+    return 'failed' if _finish(jobId, attempts, location, point, status, error) else 'expired'
+
+
+def _approximate(jobId: int, attempts: int, location: Location):
+    """
+    Place a Pending location at its postal code centroid while retries go on.
+    Nothing is written once the lease is lost: another worker may have placed it since.
+    """
+    point = gazetteerLookup(location.postalCode, location.country)
+    if point is None:
+        return
+    with transaction.atomic():
+        if not _holdsLease(jobId, attempts):
+            return
+        # `location` was read before the geocoder call
+        status = Location.objects.select_for_update().filter(id=location.id).values_list('geocodeStatus', flat=True).first()
+        if status != GeocodeStatus.Pending:
+            return
+        location.geocodeStatus = status
+        _place([location] + _sameAddress(location), point, GeocodeStatus.Approximate)
+
+
+def runJob(jobId: int, locationId: int, attempts: int) -> str:
+    """
+    Geocode one claimed job.
+    Returns:
+        str: 'done', 'failed', 'retry', or 'expired' when its lease ran out
+        and another worker claimed it meanwhile.
+    """
+    location = Location.objects.filter(id=locationId).first()
+    if location is None:
+        return 'failed'
+    address = (location.address, location.city, location.postalCode, location.country)
+
+    # another job may have geocoded the same address since this one was queued
+    cached, point = cachedGeocode(*address)
+    if cached:
+        if point is None:
+            return _fallback(jobId, attempts, location, 'no match (cached)')
+        return 'done' if _finish(jobId, attempts, location, point, GeocodeStatus.Done) else 'expired'
+
+    time.sleep(reserveSlot(GEOCODER_RATE_LIMIT, settings.GEOCODER_RATE_PER_SECOND))
+    start = time.perf_counter()
+    try:
+        point = geocoder().geocode(location.address, location.city, location.state, location.country, location.postalCode)
+        recordLookup('remote', start)
+    except GeocoderUnavailable as e:
+        recordLookup('remoteError', start)
+        if attempts >= settings.GEOCODE_MAX_ATTEMPTS:
+            return _fallback(jobId, attempts, location, f"gave up after {attempts} attempts: {str(e)}")
+        _approximate(jobId, attempts, location)
+        retried = GeocodeJob.objects.filter(id=jobId, attempts=attempts).update(
+            runAt=timezone.now() + timedelta(seconds=retryDelay(attempts, e.retryAfter)),
+            lastError=str(e),
+        )
+        return 'retry' if retried else 'expired'
+    except Exception as e:
+        # malformed address, 4xx, unexpected payload: retrying will not help
+        recordLookup('remoteError', start)
+        return _fallback(jobId, attempts, location, str(e))
+
+    storeGeocode(*address, point)
+    if point is None:
+        return _fallback(jobId, attempts, location, 'no match')
+    return 'done' if _finish(jobId, attempts, location, point, GeocodeStatus.Done) else 'expired'
+
+
+def processJobs(batchSize: int) -> dict:
+    """
+    Run up to `batchSize` due jobs, each claimed just before it runs so its
+    lease does not tick while the ones before it wait for the rate limit.
+    Returns:
+        dict: Count of jobs per outcome ('done', 'failed', 'retry', 'expired').
+    """
+    counts = {'done': 0, 'failed': 0, 'retry': 0, 'expired': 0}
+    for _ in range(batchSize):
+        claimed = claimJobs(1)
+        if not claimed:
+            break
+        jobId, locationId, attempts = claimed[0]
+        counts[runJob(jobId, locationId, attempts)] += 1
+    return counts
@@ -0,0 +1,80 @@
+import math
+
+# Geohash helpers matching PostGIS ST_GeoHash, for the Location.geohash column
+# (migration 0014). A prefix of length p is a cell; cells of the same length
+# tile the globe, so region lookups and grouping are string prefix operations.
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+MAX_PRECISION = 12
+
+
+def encode(latitude: float, longitude: float, precision: int = MAX_PRECISION) -> str:
+    latRange, lngRange = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        # bits alternate longitude, latitude, starting with longitude
+        interval, coordinate = (lngRange, longitude) if even else (latRange, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def cellSize(precision: int) -> tuple:
+    """(width, height) in degrees of a cell of `precision` characters."""
+    lngBits = math.ceil(5 * precision / 2)
+    latBits = 5 * precision // 2
+    return 360 / 2 ** lngBits, 180 / 2 ** latBits
+
+
+def precisionFor(degrees: float) -> int:
+    """Longest prefix whose cells are at least `degrees` wide."""
+    precision = 1
+    while precision < MAX_PRECISION and cellSize(precision + 1)[0] >= degrees:
+        precision += 1
+    return precision
+
+
+def _span(low: float, high: float, origin: float, size: float) -> range:
+    return range(math.floor((low - origin) / size), math.floor((high - origin) / size) + 1)
+
+
+def cover(bbox: tuple, maxCells: int = 32) -> tuple:
+    """
+    Cells covering a bounding box at the finest precision that needs at most
+    `maxCells` of them.
+    Args:
+        bbox (tuple): (minLng, minLat, maxLng, maxLat)
+    Returns:
+        tuple: (prefixes of cells inside the box, prefixes of cells crossing its edge)
+    """
+    minLng, minLat, maxLng, maxLat = bbox
+    precision = 1
+    while precision < MAX_PRECISION:
+        width, height = cellSize(precision + 1)
+        cells = len(_span(minLng, maxLng, -180, width)) * len(_span(minLat, maxLat, -90, height))
+        if cells > maxCells:
+            break
+        precision += 1
+
+    width, height = cellSize(precision)
+    inside, edge = [], []
+    for row in _span(minLat, maxLat, -90, height):
+        south = -90 + row * height
+        for column in _span(minLng, maxLng, -180, width):
+            west = -180 + column * width
+            if west >= 180 or south >= 90:
+                continue
+            prefix = encode(south + height / 2, west + width / 2, precision)
+            contained = minLng <= west and west + width <= maxLng and minLat <= south and south + height <= maxLat
+            (inside if contained else edge).append(prefix)
+    return inside, edge
@@ -0,0 +1,105 @@
+import logging
+import os
+import uuid
+
+# Image decoding and resizing for apps/photos.py. Kept free of Django imports:
+# renderDerivatives runs in ProcessPoolExecutor workers started with 'spawn',
+# which import this module but never set Django up.
+
+PHOTO_DIR = 'photos'
+# name -> (width, height, crop): crop fills the box exactly (list cards),
+# otherwise the image is scaled to fit inside it
+DERIVATIVES = {
+    'thumb': (160, 120, True),
+    'card': (640, 480, True),
+    'full': (1600, 1600, False),
+}
+FORMATS = {'webp': ('WEBP', {'quality': 80, 'method': 4}), 'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True})}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+
+def shardedPath(directory: str, name: str, extension: str) -> str:
+    # photos/<directory>/ab/<name>.<extension>: keeps directories small once names are content hashes
+    return os.path.join(PHOTO_DIR, directory, name[:2], f"{name}{extension}")
+
+
+def derivativePath(size: str, name: str, format: str) -> str:
+    return shardedPath(size, name, '.' + EXTENSIONS[format])
+
+
+def writeAtomically(target: str, write):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temporary = f"{target}.{uuid.uuid4().hex}.tmp"
+    try:
+        write(temporary)
+        os.replace(temporary, target)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def renderDerivatives(path: str, mediaRoot: str, mediaUrl: str):
+    """
+    Decode one original and write every derivative. Runs in a pool process,
+    so it only takes and returns plain values.
+    Returns:
+        dict: {size: {'width', 'height', 'webp', 'jpeg'}}, or None if `path` is not a readable image.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    existing = _existingDerivatives(name, mediaRoot, mediaUrl)
+    if existing is not None:
+        return existing
+    try:
+        with Image.open(path) as source:
+            # large JPEGs decode at a reduced scale straight away
+            source.draft('RGB', (DERIVATIVES['full'][0], DERIVATIVES['full'][1]))
+            image = ImageOps.exif_transpose(source).convert('RGB')
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        logging.warning(f"Cannot read photo {path}: {str(e)}")
+        return None
+
+    result = {}
+    # largest first: each size is resized from the previous one, not the original
+    current = image
+    for size, (width, height, crop) in sorted(DERIVATIVES.items(), key=lambda item: -item[1][0] * item[1][1]):
+        if crop:
+            resized = ImageOps.fit(current, (width, height), Image.LANCZOS)
+        else:
+            resized = current.copy()
+            resized.thumbnail((width, height), Image.LANCZOS)
+        entry = {'width': resized.width, 'height': resized.height}
+        for key, (format, options) in FORMATS.items():
+            relativePath = derivativePath(size, name, key)
+            writeAtomically(os.path.join(mediaRoot, relativePath), lambda temporary: resized.save(temporary, format, **options))
+            entry[key] = mediaUrl + relativePath.replace(os.sep, '/')
+        result[size] = entry
+        if not crop:
+            current = resized
+    return result
+
+
+def _existingDerivatives(name: str, mediaRoot: str, mediaUrl: str):
+    """
+    Entries for derivatives already on disk, or None if any is missing.
+    Originals are named by content hash, so a re-uploaded photo finds the
+    files rendered the first time and only their headers are read.
+    """
+    from PIL import Image
+
+    result = {}
+    for size in DERIVATIVES:
+        entry = {}
+        for key in FORMATS:
+            relativePath = derivativePath(size, name, key)
+            if not os.path.exists(os.path.join(mediaRoot, relativePath)):
+                return None
+            entry[key] = mediaUrl + relativePath.replace(os.sep, '/')
+        try:
+            with Image.open(os.path.join(mediaRoot, derivativePath(size, name, 'jpeg'))) as image:
+                entry['width'], entry['height'] = image.size
+        except OSError:
+            return None
+        result[size] = entry
+    return result
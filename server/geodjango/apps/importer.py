@@ -0,0 +1,448 @@
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from apps.models import Amenity, GeocodeJob, GeocodeStatus, Highlight, Manager, PropertyImport, PropertyType
+from apps.geocoding import (
+    PLACEHOLDER_POINT, cachedGeocodeMany, gazetteerLookupMany, geocodeKey, normalizeAddress, normalizeCountry,
+    normalizePostalCode,
+)
+from apps.signals import propertiesCreated
+
+# Bulk import of listings (`manage.py import_properties`, POST
+# /properties/import). The file is read as a stream of CSV rows or NDJSON
+# objects; each record is validated on its own and a bad one is reported
+# with its line number instead of failing the import. Valid rows are written
+# IMPORT_BATCH_SIZE at a time, each batch in one transaction:
+#
+#   1. one Location per listing, placed once per distinct address of the
+#      run: at the point the row gives, else from GeocodeCache in one query,
+#      else at the Gazetteer postal code centroid with one GeocodeJob for the
+#      address when neither knew the exact point (its other Locations follow
+#      that job, see apps/geocoding.py): no remote geocoder call per row
+#   2. ids taken from the sequences in one round trip, then Location and
+#      Property rows sent with COPY
+#   3. the new listings queued for percolate_worker (saved searches)
+#   4. the PropertyImport checkpoint moved past the batch
+#
+# The checkpoint is keyed by the SHA-256 of the manager and file, so running
+# the same file again resumes after the last committed batch, and a finished
+# import is not repeated.
+
+FORMATS = ['csv', 'ndjson']
+FORMAT_EXTENSIONS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+FORMAT_CONTENT_TYPES = {'text/csv': 'csv', 'application/x-ndjson': 'ndjson', 'application/jsonl': 'ndjson'}
+REQUIRED_COLUMNS = [
+    'name', 'pricePerMonth', 'beds', 'baths', 'squareFeet', 'propertyType',
+    'address', 'city', 'state', 'country', 'postalCode',
+]
+# amenities, highlights and photoUrls are lists: JSON arrays in NDJSON, '|' separated in CSV
+LIST_SEPARATOR = '|'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+ALLOCATE_IDS_SQL = "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)"
+LOCATION_COLUMNS = ['id', 'address', 'city', 'state', 'country', 'postalCode', 'coordinates', 'version', 'geocodeStatus']
+PROPERTY_COLUMNS = [
+    'id', 'name', 'description', 'pricePerMonth', 'securityDeposit', 'applicationFee', 'photoUrls',
+    'photoDerivatives', 'amenities', 'highlights', 'isPetsAllowed', 'isParkingIncluded', 'beds', 'baths',
+    'squareFeet', 'propertyType', 'postedDate', 'averageRating', 'numberOfReviews', 'version',
+    'locationId', 'managerCognitoId',
+]
+
+
+def detectFormat(name: str = None, contentType: str = None, requested: str = None) -> str:
+    """
+    Raises:
+        ValueError: If the format is neither requested nor recognizable.
+    """
+    if requested:
+        if requested not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        return requested
+    extension = os.path.splitext(name or '')[1].lower()
+    format = FORMAT_EXTENSIONS.get(extension) or FORMAT_CONTENT_TYPES.get((contentType or '').split(';')[0].strip())
+    if format is None:
+        raise ValueError(f"Cannot tell the format of {name or 'the file'}; pass format=csv or format=ndjson")
+    return format
+
+
+def importKey(source, managerCognitoId: str) -> str:
+    """SHA-256 of the manager and the file; `source` is rewound afterwards."""
+    digest = hashlib.sha256(f"{managerCognitoId}\0".encode())
+    for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    source.seek(0)
+    return digest.hexdigest()
+
+
+def readRecords(source, format: str):
+    """
+    Yields (line number, record dict), or (line number, ValueError) for a
+    record that cannot be parsed.
+    Raises:
+        ValueError: If a CSV header lacks required columns.
+    """
+    text = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+    try:
+        if format == 'csv':
+            reader = csv.DictReader(text)
+            missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+            if missing:
+                raise ValueError(f"Missing column(s): {', '.join(missing)}")
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for lineNumber, line in enumerate(text, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield lineNumber, ValueError(f"Invalid JSON: {str(e)}")
+                    continue
+                yield lineNumber, record if isinstance(record, dict) else ValueError('Expected a JSON object')
+    finally:
+        # the caller owns `source`
+        text.detach()
+
+
+def _text(record: dict, field: str, maxLength: int, required: bool = True) -> str:
+    value = str(record.get(field) or '').strip()
+    if required and not value:
+        raise ValueError(f"{field} is required")
+    if len(value) > maxLength:
+        raise ValueError(f"{field} must be at most {maxLength} characters")
+    return value
+
+
+def _number(record: dict, field: str, cast, default=None, minimum=0):
+    value = record.get(field)
+    if value is None or value == '':
+        if default is None:
+            raise ValueError(f"{field} is required")
+        return default
+    if isinstance(value, bool):
+        raise ValueError(f"{field} must be a number")
+    try:
+        value = cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a number")
+    if minimum is not None and value < minimum:
+        raise ValueError(f"{field} must be at least {minimum}")
+    return value
+
+
+def _boolean(record: dict, field: str) -> bool:
+    value = record.get(field)
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in ('true', '1', 'yes', 't', 'y')
+
+
+def _list(record: dict, field: str, choices=None) -> list:
+    value = record.get(field)
+    if value is None or value == '':
+        return []
+    if isinstance(value, str):
+        value = [item.strip() for item in value.split(LIST_SEPARATOR)]
+    if not isinstance(value, list):
+        raise ValueError(f"{field} must be a list")
+    value = [str(item) for item in value if item not in (None, '')]
+    if choices is not None:
+        invalid = [item for item in value if item not in choices]
+        if invalid:
+            raise ValueError(f"Unknown {field}: {', '.join(invalid)}")
+    return value
+
+
+def validateRecord(record: dict, managerCognitoId: str = None, singleManager: bool = False) -> dict:
+    """
+    Check and convert one record. With `singleManager`, a record may only
+    name `managerCognitoId` as its manager.
+    Returns:
+        dict: Location and Property values; 'point' is (longitude, latitude) when the record gave one.
+    Raises:
+        ValueError: Describing the first invalid field.
+    """
+    propertyType = _text(record, 'propertyType', 20)
+    if propertyType not in PropertyType.values:
+        raise ValueError(f"Unknown propertyType: {propertyType}")
+    photoUrls = _list(record, 'photoUrls')
+    if any(not url.startswith(('http://', 'https://')) for url in photoUrls):
+        raise ValueError('photoUrls must be http(s) URLs')
+
+    point = None
+    if record.get('longitude') not in (None, '') or record.get('latitude') not in (None, ''):
+        longitude = _number(record, 'longitude', float, minimum=-180)
+        latitude = _number(record, 'latitude', float, minimum=-90)
+        if longitude > 180 or latitude > 90:
+            raise ValueError('longitude/latitude out of range')
+        point = (longitude, latitude)
+
+    manager = str(record.get('managerCognitoId') or managerCognitoId or '').strip()
+    if not manager:
+        raise ValueError('managerCognitoId is required')
+    if singleManager and manager != managerCognitoId:
+        raise ValueError(f"managerCognitoId must be {managerCognitoId}")
+    return {
+        'name': _text(record, 'name', 255),
+        'description': _text(record, 'description', 100000, required=False),
+        'pricePerMonth': _number(record, 'pricePerMonth', float),
+        'securityDeposit': _number(record, 'securityDeposit', float, default=0.0),
+        'applicationFee': _number(record, 'applicationFee', float, default=0.0),
+        'photoUrls': photoUrls,
+        'amenities': _list(record, 'amenities', Amenity.values),
+        'highlights': _list(record, 'highlights', Highlight.values),
+        'isPetsAllowed': _boolean(record, 'isPetsAllowed'),
+        'isParkingIncluded': _boolean(record, 'isParkingIncluded'),
+        'beds': _number(record, 'beds', int),
+        'baths': _number(record, 'baths', float),
+        'squareFeet': _number(record, 'squareFeet', int),
+        'propertyType': propertyType,
+        'address': _text(record, 'address', 255),
+        'city': _text(record, 'city', 100),
+        'state': _text(record, 'state', 100),
+        'country': _text(record, 'country', 100),
+        'postalCode': _text(record, 'postalCode', 20),
+        'managerCognitoId': manager,
+        'point': point,
+    }
+
+
+def _arrayLiteral(values: list) -> str:
+    return '{' + ','.join('"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"' for value in values) + '}'
+
+
+def _copy(cursor, table: str, columns: list, rows: list):
+    buffer = io.StringIO()
+    # every value quoted: an empty string stays '' instead of becoming NULL
+    csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+    buffer.seek(0)
+    names = ', '.join(f'"{column}"' for column in columns)
+    cursor.copy_expert(f'COPY "{table}" ({names}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+def _allocateIds(cursor, table: str, count: int) -> list:
+    if not count:
+        return []
+    cursor.execute(ALLOCATE_IDS_SQL, [f'"{table}"', count])
+    return [row[0] for row in cursor.fetchall()]
+
+
+class PropertyImporter:
+    def __init__(self, managerCognitoId: str = None, batchSize: int = None, maxErrors: int = None, progress=None,
+                 singleManager: bool = False):
+        """
+        Args:
+            managerCognitoId (str, optional): Manager of rows without a managerCognitoId of their own.
+            batchSize (int, optional): Rows per checkpoint, IMPORT_BATCH_SIZE by default.
+            maxErrors (int, optional): Rejected rows reported in detail (all are counted).
+            progress (callable, optional): Called with the summary after every checkpoint.
+            singleManager (bool, optional): Reject rows naming another manager than managerCognitoId.
+        """
+        self.managerCognitoId = (managerCognitoId or '').strip() or None
+        self.batchSize = batchSize or settings.IMPORT_BATCH_SIZE
+        self.maxErrors = settings.IMPORT_MAX_ERRORS if maxErrors is None else maxErrors
+        self.progress = progress
+        self.singleManager = singleManager
+
+    def run(self, source, format: str, restart: bool = False) -> dict:
+        """
+        Import a binary file object, resuming from its checkpoint.
+        Returns:
+            dict: Counts, the first rejected rows, and throughput in rows per second.
+        Raises:
+            ValueError: On an unknown manager, a missing CSV column, or a concurrent import of the same file.
+        """
+        start = time.perf_counter()
+        if self.managerCognitoId and not Manager.objects.filter(cognitoId=self.managerCognitoId).exists():
+            raise ValueError(f"Unknown manager: {self.managerCognitoId}")
+
+        key = importKey(source, self.managerCognitoId or '')
+        checkpoint, _ = PropertyImport.objects.get_or_create(
+            id=key, defaults={'managerCognitoId': self.managerCognitoId or '', 'format': format},
+        )
+        if restart:
+            PropertyImport.objects.filter(id=key).update(position=0, imported=0, rejected=0, finishedAt=None)
+            checkpoint.refresh_from_db()
+
+        self.checkpoint = checkpoint
+        self.summary = {
+            'importId': key,
+            'resumedFrom': checkpoint.position,
+            'read': 0,
+            'imported': checkpoint.imported,
+            'rejected': checkpoint.rejected,
+            'errors': [],
+            'locations': 0,
+            'geocode': {'given': 0, 'cached': 0, 'approximate': 0, 'queued': 0},
+            'finished': checkpoint.finishedAt is not None,
+        }
+        # address key -> (point, GeocodeStatus), so later batches reuse the placements of earlier ones
+        self.placements = {}
+
+        if not self.summary['finished']:
+            batch, rejected, position = [], 0, checkpoint.position
+            for number, (lineNumber, record) in enumerate(readRecords(source, format), 1):
+                if number <= checkpoint.position:
+                    # committed by an earlier run
+                    continue
+                self.summary['read'] += 1
+                position = number
+                try:
+                    if isinstance(record, Exception):
+                        raise record
+                    batch.append((lineNumber, validateRecord(record, self.managerCognitoId, self.singleManager)))
+                except ValueError as e:
+                    rejected += 1
+                    self.reject(lineNumber, str(e))
+                if len(batch) >= self.batchSize:
+                    self.flush(batch, rejected, position)
+                    batch, rejected = [], 0
+                    self.report(start)
+            self.flush(batch, rejected, position, finished=True)
+
+        return self.report(start)
+
+    def reject(self, lineNumber: int, error: str):
+        if len(self.summary['errors']) < self.maxErrors:
+            self.summary['errors'].append({'line': lineNumber, 'error': error})
+
+    def report(self, start: float) -> dict:
+        elapsed = time.perf_counter() - start
+        self.summary['seconds'] = round(elapsed, 3)
+        self.summary['rowsPerSecond'] = round(self.summary['read'] / elapsed) if elapsed else None
+        if self.progress:
+            self.progress(self.summary)
+        return self.summary
+
+    def flush(self, batch: list, rejected: int, position: int, finished: bool = False):
+        with transaction.atomic():
+            # the row lock serializes two runs of the same file; the loser stops here
+            checkpoint = PropertyImport.objects.select_for_update().get(id=self.checkpoint.id)
+            if checkpoint.position != self.checkpoint.position:
+                raise ValueError('This file is being imported by another run; try again to resume')
+
+            managers = {row['managerCognitoId'] for _, row in batch}
+            known = set(Manager.objects.filter(cognitoId__in=managers).values_list('cognitoId', flat=True))
+            rows = []
+            for lineNumber, row in batch:
+                if row['managerCognitoId'] in known:
+                    rows.append(row)
+                else:
+                    rejected += 1
+                    self.reject(lineNumber, f"Unknown manager: {row['managerCognitoId']}")
+
+            propertyIds = self.write(rows)
+            checkpoint.position = position
+            checkpoint.imported += len(rows)
+            checkpoint.rejected += rejected
+            checkpoint.finishedAt = timezone.now() if finished else None
+            checkpoint.save(update_fields=['position', 'imported', 'rejected', 'finishedAt', 'updatedAt'])
+            # search index after commit, saved searches queued with the batch
+            propertiesCreated(propertyIds)
+
+        self.checkpoint = checkpoint
+        self.summary['imported'] = checkpoint.imported
+        self.summary['rejected'] = checkpoint.rejected
+        self.summary['finished'] = finished
+
+    def locationKey(self, row: dict) -> tuple:
+        parts = normalizeAddress(row['address'], row['city'], row['postalCode'], row['country'])
+        return geocodeKey(parts), row['state'].strip().lower(), row['point']
+
+    def placeLocations(self, rows: list) -> dict:
+        """
+        Coordinates and status of every distinct address in `rows`, looked up
+        once per run.
+        Returns:
+            dict: {location key: ((longitude, latitude), GeocodeStatus, queue a GeocodeJob)}
+        """
+        placed, pending = {}, {}
+        for row in rows:
+            key = self.locationKey(row)
+            if key in self.placements:
+                placed[key] = (*self.placements[key], False)
+            elif key not in pending:
+                pending[key] = row
+
+        lookups = {key: row for key, row in pending.items() if row['point'] is None}
+        for key, row in pending.items():
+            if row['point'] is not None:
+                placed[key] = (row['point'], GeocodeStatus.Done, False)
+                self.summary['geocode']['given'] += 1
+
+        cached = cachedGeocodeMany([(row['address'], row['city'], row['postalCode'], row['country']) for row in lookups.values()])
+        centroids = {}
+        for key, row in lookups.items():
+            hit, point = cached[key[0]]
+            if hit and point is not None:
+                placed[key] = (point, GeocodeStatus.Done, False)
+                self.summary['geocode']['cached'] += 1
+            else:
+                centroids[key] = hit
+        gazetteer = gazetteerLookupMany([(lookups[key]['postalCode'], lookups[key]['country']) for key in centroids])
+
+        for key, knownMiss in centroids.items():
+            row = lookups[key]
+            point = gazetteer.get((normalizePostalCode(row['postalCode']), normalizeCountry(row['country'])))
+            # a cached "no match" is final, as in runJob: no job for it
+            queue = not knownMiss
+            if point is not None:
+                status = GeocodeStatus.Approximate
+                self.summary['geocode']['approximate'] += 1
+            else:
+                status = GeocodeStatus.Pending if queue else GeocodeStatus.Failed
+            self.summary['geocode']['queued'] += queue
+            placed[key] = (point or PLACEHOLDER_POINT, status, queue)
+
+        for key in pending:
+            self.placements[key] = placed[key][:2]
+        return placed
+
+    def write(self, rows: list):
+        """COPY the Locations and Properties of one batch. Returns the new Property ids."""
+        if not rows:
+            return []
+        placed = self.placeLocations(rows)
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            locationIds = _allocateIds(cursor, 'Location', len(rows))
+            locationRows, jobs = [], []
+            for locationId, row in zip(locationIds, rows):
+                key = self.locationKey(row)
+                point, status, queue = placed[key]
+                locationRows.append([
+                    locationId, row['address'], row['city'], row['state'], row['country'], row['postalCode'],
+                    f"SRID=4326;POINT({point[0]!r} {point[1]!r})", 1, status,
+                ])
+                if queue:
+                    # one job per address: the first of its Locations carries it
+                    jobs.append(GeocodeJob(locationId_id=locationId, runAt=now))
+                    placed[key] = (point, status, False)
+            _copy(cursor, 'Location', LOCATION_COLUMNS, locationRows)
+
+            propertyIds = _allocateIds(cursor, 'Property', len(rows))
+            propertyRows = []
+            for propertyId, locationId, row in zip(propertyIds, locationIds, rows):
+                propertyRows.append([
+                    propertyId, row['name'], row['description'], row['pricePerMonth'], row['securityDeposit'],
+                    row['applicationFee'], _arrayLiteral(row['photoUrls']), json.dumps([None] * len(row['photoUrls'])),
+                    _arrayLiteral(row['amenities']), _arrayLiteral(row['highlights']),
+                    'true' if row['isPetsAllowed'] else 'false', 'true' if row['isParkingIncluded'] else 'false',
+                    row['beds'], row['baths'], row['squareFeet'], row['propertyType'], now.isoformat(),
+                    0.0, 0, 1, locationId, row['managerCognitoId'],
+                ])
+            _copy(cursor, 'Property', PROPERTY_COLUMNS, propertyRows)
+
+        GeocodeJob.objects.bulk_create(jobs, batch_size=self.batchSize)
+        self.summary['locations'] += len(locationRows)
+        if jobs:
+            logging.info(f"Import {self.checkpoint.id[:12]}: {len(jobs)} locations queued for geocode_worker")
+        return propertyIds
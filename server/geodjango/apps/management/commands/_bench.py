@@ -0,0 +1,180 @@
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from django.contrib.gis.geos import Point
+from django.db import connection
+from apps.models import Amenity, Highlight, Lease, Location, Manager, Property, PropertyType, Tenant
+
+# Helpers shared by the bench_* commands. Everything is seeded inside the
+# caller's transaction and thrown away with BenchRollback, so the commands
+# can run against a development database without leaving rows behind.
+
+BENCH_COGNITO_ID = 'bench-manager'
+BENCH_TENANT_COGNITO_ID = 'bench-tenant'
+
+# (city, state, longitude, latitude)
+BENCH_CITIES = [
+    ('Los Angeles', 'CA', -118.25, 34.05),
+    ('Pasadena', 'CA', -118.14, 34.15),
+    ('San Francisco', 'CA', -122.42, 37.77),
+    ('Seattle', 'WA', -122.33, 47.61),
+    ('Portland', 'OR', -122.68, 45.52),
+    ('Denver', 'CO', -104.99, 39.74),
+    ('Austin', 'TX', -97.74, 30.27),
+    ('Chicago', 'IL', -87.63, 41.88),
+    ('New York', 'NY', -74.01, 40.71),
+    ('Boston', 'MA', -71.06, 42.36),
+    ('Miami', 'FL', -80.19, 25.76),
+    ('Anchorage', 'AK', -149.90, 61.22),
+]
+
+
+class BenchRollback(Exception):
+    """Raised at the end of a benchmark to discard the seeded rows."""
+
+
+def seedProperties(count: int, batchSize: int = 5000, seed: int = 42, spread: float = 0.3) -> Manager:
+    """
+    Bulk insert `count` synthetic Location/Property pairs around BENCH_CITIES.
+    Args:
+        count (int): Number of properties.
+        batchSize (int): Rows per bulk_create.
+        seed (int): Random seed, so runs are comparable.
+        spread (float): Max distance in degrees from the city center.
+    Returns:
+        Manager: Owner of the seeded properties.
+    """
+    rng = random.Random(seed)
+    manager, _ = Manager.objects.get_or_create(
+        cognitoId=BENCH_COGNITO_ID,
+        defaults={'name': 'Bench Manager', 'email': 'bench@example.com', 'phoneNumber': '0000000000'}
+    )
+    amenities = [a.value for a in Amenity]
+    highlights = [h.value for h in Highlight]
+    propertyTypes = [t.value for t in PropertyType]
+
+    for start in range(0, count, batchSize):
+        size = min(batchSize, count - start)
+        locations = []
+        for i in range(size):
+            city, state, lng, lat = rng.choice(BENCH_CITIES)
+            locations.append(Location(
+                address=f"{rng.randint(1, 9999)} Bench St #{start + i}",
+                city=city,
+                state=state,
+                country='United States',
+                postalCode=f"{rng.randint(10000, 99999)}",
+                coordinates=Point(lng + rng.uniform(-spread, spread), lat + rng.uniform(-spread, spread), srid=4326),
+            ))
+        locations = Location.objects.bulk_create(locations)
+
+        properties = []
+        for location in locations:
+            price = round(rng.uniform(500, 8000), 2)
+            properties.append(Property(
+                name=f"Bench property {location.address}",
+                description='Synthetic listing for benchmarks.',
+                pricePerMonth=price,
+                securityDeposit=price,
+                applicationFee=50.0,
+                amenities=rng.sample(amenities, rng.randint(0, 6)),
+                highlights=rng.sample(highlights, rng.randint(0, 4)),
+                beds=rng.randint(0, 6),
+                baths=rng.choice([1, 1.5, 2, 2.5, 3]),
+                squareFeet=rng.randint(250, 5000),
+                propertyType=rng.choice(propertyTypes),
+                averageRating=round(rng.uniform(0, 5), 1),
+                numberOfReviews=rng.randint(0, 200),
+                locationId=location,
+                managerCognitoId=manager,
+            ))
+        Property.objects.bulk_create(properties)
+
+    analyze()
+    return manager
+
+
+def seedLeases(manager: Manager, perProperty: int = 3, batchSize: int = 20000, seed: int = 42) -> int:
+    """
+    Give every property of `manager` `perProperty` back-to-back leases of 6-18
+    months starting somewhere in the last three years.
+    Returns:
+        int: Number of leases created.
+    """
+    rng = random.Random(seed)
+    tenant, _ = Tenant.objects.get_or_create(
+        cognitoId=BENCH_TENANT_COGNITO_ID,
+        defaults={'name': 'Bench Tenant', 'email': 'bench-tenant@example.com', 'phoneNumber': '0000000000'}
+    )
+    now = datetime.now(timezone.utc)
+    leases = []
+    created = 0
+    for propertyId, price in Property.objects.filter(managerCognitoId=manager).values_list('id', 'pricePerMonth').iterator():
+        start = now - timedelta(days=rng.randint(0, 3 * 365))
+        for _ in range(perProperty):
+            end = start + timedelta(days=30 * rng.randint(6, 18))
+            leases.append(Lease(
+                startDate=start, endDate=end, rent=price, deposit=price,
+                propertyId_id=propertyId, tenantCognitoId=tenant,
+            ))
+            # sometimes leave a gap between tenants
+            start = end + timedelta(days=rng.choice([0, 0, 0, 30, 90]))
+        if len(leases) >= batchSize:
+            Lease.objects.bulk_create(leases)
+            created += len(leases)
+            leases = []
+    Lease.objects.bulk_create(leases)
+    created += len(leases)
+    analyze()
+    return created
+
+
+def analyze():
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE "Location"; ANALYZE "Property"; ANALYZE "Lease";')
+
+
+def timeQuery(fn, repeat: int = 50) -> dict:
+    """
+    Run `fn` `repeat` times (after one warm-up call) and summarize latencies in ms.
+    """
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'mean': statistics.fmean(samples),
+        'p50': samples[len(samples) // 2],
+        'p95': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
+
+
+def formatTiming(label: str, timing: dict) -> str:
+    return f"{label:<32} mean {timing['mean']:8.2f} ms  p50 {timing['p50']:8.2f} ms  p95 {timing['p95']:8.2f} ms"
+
+
+def explain(queryset) -> str:
+    return queryset.explain(analyze=True, buffers=True)
+
+
+def planNodes(plan: dict):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from planNodes(child)
+
+
+def planSummary(queryset) -> str:
+    """One line per plan: node types (and index names) from the top down."""
+    plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+    nodes = []
+    for node in planNodes(plan):
+        label = node['Node Type']
+        if 'Index Name' in node:
+            label += f" ({node['Index Name']})"
+        nodes.append(label)
+    return ' > '.join(nodes)
@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+BACKFILL_SQL = """
+UPDATE "Location" SET geohash = ST_GeoHash(coordinates, 12)
+WHERE id IN (
+    SELECT id FROM "Location" WHERE geohash IS NULL AND coordinates IS NOT NULL
+    LIMIT %s FOR UPDATE SKIP LOCKED
+)
+"""
+
+
+class Command(BaseCommand):
+    help = 'Fill Location.geohash for rows still without one (migration 0023 does it once), in short batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--sleep', type=float, default=0, help='Seconds between batches, to go easy on a live database')
+
+    def handle(self, *args, **options):
+        total = 0
+        start = time.perf_counter()
+        while True:
+            # one transaction per batch: row locks are held briefly
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(BACKFILL_SQL, [options['batch_size']])
+                updated = cursor.rowcount
+            if not updated:
+                break
+            total += updated
+            self.stdout.write(f"{total} locations updated")
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {total} geohashes in {time.perf_counter() - start:.1f}s"))
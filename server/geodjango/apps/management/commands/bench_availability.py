@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.http import QueryDict
+from apps.models import Lease, Property
+from apps.views.property.services import buildPropertyQuerySet, paginateKeyset, parsePropertyFilters
+from ._bench import BenchRollback, explain, formatTiming, seedLeases, seedProperties, timeQuery
+
+
+class Command(BaseCommand):
+    help = 'Compare the old lease join with the tstzrange anti-join for availableFrom'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+        parser.add_argument('--leases', type=int, default=3, help='Leases per property')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--explain', action='store_true')
+
+    def handle(self, *args, **options):
+        for rows in options['rows']:
+            try:
+                with transaction.atomic():
+                    self.stdout.write(f"Seeding {rows} properties with {options['leases']} leases each...")
+                    manager = seedProperties(rows)
+                    seedLeases(manager, options['leases'])
+                    self.run(rows, options)
+                    raise BenchRollback()
+            except BenchRollback:
+                pass
+
+    def run(self, rows: int, options):
+        day = date.today() + timedelta(days=60)
+        repeat = options['repeat']
+
+        def legacyJoin():
+            # what get_properties tried to do: join leases, then DISTINCT
+            return Property.objects.select_related('locationId').filter(lease__startDate__date__lte=day).distinct()
+
+        def legacyExists():
+            return Property.objects.select_related('locationId').filter(Exists(
+                Lease.objects.filter(propertyId=OuterRef('pk'), startDate__date__lte=day)
+            ))
+
+        def antiJoin(months=12):
+            return buildPropertyQuerySet(parsePropertyFilters(
+                QueryDict(f"availableFrom={day.isoformat()}&availableFor={months}")
+            ))
+
+        self.stdout.write(self.style.SUCCESS(f"== {rows} properties, {options['leases']} leases each"))
+        self.stdout.write(formatTiming('join + distinct (page)', timeQuery(lambda: list(legacyJoin().order_by('-postedDate', '-id')[:20]), repeat)))
+        self.stdout.write(formatTiming('exists startDate <= (page)', timeQuery(lambda: list(legacyExists().order_by('-postedDate', '-id')[:20]), repeat)))
+        self.stdout.write(formatTiming('anti-join 12 months (page)', timeQuery(lambda: paginateKeyset(antiJoin(), 'postedDate', True), repeat)))
+        self.stdout.write(formatTiming('anti-join 3 months (page)', timeQuery(lambda: paginateKeyset(antiJoin(3), 'postedDate', True), repeat)))
+        self.stdout.write(formatTiming('anti-join 12 months (count)', timeQuery(lambda: antiJoin().count(), max(1, repeat // 4))))
+
+        if options['explain']:
+            self.stdout.write(explain(antiJoin().order_by('-postedDate', '-id')[:20]))
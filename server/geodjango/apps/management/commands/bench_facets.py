@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.http import QueryDict
+from apps.views.property.services import (
+    buildPropertyQuerySet, getPropertyFacets, paginateKeyset, parsePropertyFilters
+)
+from ._bench import BenchRollback, formatTiming, seedProperties, timeQuery
+
+# Representative searches: everything, a city radius, a narrow filter set
+SEARCHES = [
+    '',
+    'latitude=34.05&longitude=-118.25&radius=25',
+    'priceMin=1500&priceMax=4000&beds=2&amenities=Pool,Gym',
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare the cost of ?facets=true with the plain property search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        for rows in options['rows']:
+            try:
+                with transaction.atomic():
+                    self.stdout.write(f"Seeding {rows} properties...")
+                    seedProperties(rows)
+                    self.run(rows, options['repeat'])
+                    raise BenchRollback()
+            except BenchRollback:
+                pass
+
+    def run(self, rows: int, repeat: int):
+        self.stdout.write(self.style.SUCCESS(f"== {rows} rows"))
+        for search in SEARCHES:
+            filters = parsePropertyFilters(QueryDict(search))
+            # the page alone hides the cost of a full match, so the count
+            # (which has to visit every match, like the facets) is reported too
+            page = timeQuery(lambda: paginateKeyset(buildPropertyQuerySet(filters), 'postedDate', True), repeat)
+            count = timeQuery(lambda: buildPropertyQuerySet(filters).count(), repeat)
+            facets = timeQuery(lambda: getPropertyFacets(filters), repeat)
+            self.stdout.write(f"search: {search or '(no filters)'}")
+            self.stdout.write(formatTiming('  page', page))
+            self.stdout.write(formatTiming('  count', count))
+            self.stdout.write(formatTiming('  facets', facets))
+            self.stdout.write(f"  facets / count: {facets['p50'] / count['p50']:.2f}x")
@@ -0,0 +1,65 @@
+import random
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.http import QueryDict
+from apps.models import Property
+from apps.views.property.services import buildPropertyQuerySet, paginateKeyset, parsePropertyFilters
+from ._bench import BENCH_CITIES, BenchRollback, explain, formatTiming, seedProperties, timeQuery
+
+
+class Command(BaseCommand):
+    help = 'Compare the legacy degree-based radius search with the geography/KNN search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+        parser.add_argument('--radius', type=float, default=25, help='Search radius in km')
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--explain', action='store_true', help='Print EXPLAIN ANALYZE for each path')
+
+    def handle(self, *args, **options):
+        for rows in options['rows']:
+            try:
+                with transaction.atomic():
+                    self.stdout.write(f"Seeding {rows} locations...")
+                    seedProperties(rows)
+                    self.run(rows, options)
+                    raise BenchRollback()
+            except BenchRollback:
+                pass
+
+    def run(self, rows: int, options):
+        rng = random.Random(7)
+        radius = options['radius']
+        points = [(lng, lat) for _, _, lng, lat in BENCH_CITIES]
+
+        def legacy(lng, lat):
+            # what get_properties used to do: degrees on the planar geometry
+            return Property.objects.select_related('locationId').filter(
+                locationId__coordinates__dwithin=(Point(lng, lat, srid=4326), radius / 111.0)
+            )
+
+        def geography(lng, lat):
+            return buildPropertyQuerySet(parsePropertyFilters(
+                QueryDict(f"latitude={lat}&longitude={lng}&radius={radius}")
+            ))
+
+        self.stdout.write(self.style.SUCCESS(f"== {rows} rows, radius {radius} km"))
+        self.stdout.write(formatTiming('legacy dwithin (degrees)', timeQuery(
+            lambda: list(legacy(*rng.choice(points))[:20]), options['repeat'])))
+        self.stdout.write(formatTiming('geography dwithin', timeQuery(
+            lambda: paginateKeyset(geography(*rng.choice(points)), 'postedDate', True), options['repeat'])))
+        self.stdout.write(formatTiming('geography + KNN sort=distance', timeQuery(
+            lambda: paginateKeyset(geography(*rng.choice(points)), 'distance', False), options['repeat'])))
+
+        # The degree radius is a circle only at the equator; at Anchorage's
+        # latitude it covers roughly twice the requested east-west distance.
+        for city, _, lng, lat in (BENCH_CITIES[0], BENCH_CITIES[-1]):
+            self.stdout.write(
+                f"{city}: legacy {legacy(lng, lat).count()} matches, geography {geography(lng, lat).count()} matches"
+            )
+
+        if options['explain']:
+            lng, lat = points[0]
+            self.stdout.write(explain(legacy(lng, lat)[:20]))
+            self.stdout.write(explain(geography(lng, lat).order_by('distanceMeters', 'id')[:20]))
@@ -0,0 +1,60 @@
+import random
+from django.contrib.gis.geos import Polygon
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import Floor, Substr
+from apps import geohash
+from apps.functions import PointX, PointY
+from apps.models import Location, Property
+from apps.views.property.services import inBoundingBox
+from ._bench import BENCH_CITIES, BenchRollback, formatTiming, seedProperties, timeQuery
+
+# bounding box sizes in degrees: a neighbourhood, a city, a region
+BOX_SIZES = [0.05, 0.3, 2.0]
+
+
+class Command(BaseCommand):
+    help = 'Compare geohash prefix lookups and grouping with ST_Within / ST_X-ST_Y grids'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        for rows in options['rows']:
+            try:
+                with transaction.atomic():
+                    self.stdout.write(f"Seeding {rows} properties...")
+                    seedProperties(rows)
+                    self.run(rows, options['repeat'])
+                    raise BenchRollback()
+            except BenchRollback:
+                pass
+
+    def run(self, rows: int, repeat: int):
+        rng = random.Random(7)
+        self.stdout.write(self.style.SUCCESS(f"== {rows} rows"))
+        for size in BOX_SIZES:
+            _, _, lng, lat = rng.choice(BENCH_CITIES)
+            bbox = (lng - size / 2, lat - size / 2, lng + size / 2, lat + size / 2)
+            envelope = Polygon.from_bbox(bbox)
+            envelope.srid = 4326
+
+            within = lambda: Property.objects.filter(locationId__coordinates__within=envelope).count()
+            prefix = lambda: inBoundingBox(Property.objects.all(), bbox).count()
+            inside, edge = geohash.cover(bbox)
+            self.stdout.write(f"bbox {size} deg: {within()} ST_Within / {prefix()} geohash ({len(inside)} inner + {len(edge)} edge cells)")
+            self.stdout.write(formatTiming('  ST_Within count', timeQuery(within, repeat)))
+            self.stdout.write(formatTiming('  geohash prefix count', timeQuery(prefix, repeat)))
+
+        # clustering of every location: grid from ST_X/ST_Y vs geohash prefix
+        precision = 4
+        width = geohash.cellSize(precision)[0]
+        grid = lambda: list(Location.objects.annotate(
+            cellX=Floor(PointX('coordinates') / width), cellY=Floor(PointY('coordinates') / width),
+        ).values('cellX', 'cellY').annotate(count=Count('id')))
+        cells = lambda: list(Location.objects.annotate(cell=Substr('geohash', 1, precision)).values('cell').annotate(count=Count('id')))
+        self.stdout.write(f"grouping into {width:.3f} deg cells: {len(grid())} grid cells / {len(cells())} geohash cells")
+        self.stdout.write(formatTiming('  ST_X/ST_Y grid', timeQuery(grid, max(1, repeat // 4))))
+        self.stdout.write(formatTiming('  geohash prefix', timeQuery(cells, max(1, repeat // 4))))
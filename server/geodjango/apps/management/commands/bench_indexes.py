@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.http import QueryDict
+from apps.views.property.services import buildPropertyQuerySet, parsePropertyFilters, sortOrdering
+from ._bench import BenchRollback, analyze, formatTiming, planSummary, seedProperties, timeQuery
+
+# Indexes added by migration 0011
+FILTER_INDEXES = [
+    'property_filters_cover_idx',
+    'property_type_posted_idx',
+    'property_apartment_price_idx',
+    'property_rooms_price_idx',
+]
+
+# Filter combinations get_properties receives from the listing filters
+SEARCHES = [
+    'propertyType=Apartment',
+    'propertyType=Apartment&priceMin=1500&priceMax=3000&beds=2',
+    'propertyType=Villa&priceMin=4000',
+    'priceMin=1500&priceMax=2500&beds=2&baths=2',
+    'beds=4&squareFeetMin=3000',
+    'priceMax=1200&amenities=Pool',
+]
+
+
+class Command(BaseCommand):
+    help = 'Report plans and latencies of common property filters with and without the filter indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        for rows in options['rows']:
+            try:
+                with transaction.atomic():
+                    self.stdout.write(f"Seeding {rows} properties...")
+                    seedProperties(rows)
+                    self.stdout.write(self.style.SUCCESS(f"== {rows} rows, with the filter indexes"))
+                    self.run(options['repeat'])
+                    # DROP INDEX is transactional: the rollback brings them back
+                    with connection.cursor() as cursor:
+                        for name in FILTER_INDEXES:
+                            cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+                    analyze()
+                    self.stdout.write(self.style.SUCCESS(f"== {rows} rows, without them"))
+                    self.run(options['repeat'])
+                    raise BenchRollback()
+            except BenchRollback:
+                pass
+
+    def run(self, repeat: int):
+        for search in SEARCHES:
+            filters = parsePropertyFilters(QueryDict(search))
+            page = lambda: buildPropertyQuerySet(filters).order_by(*sortOrdering('postedDate', True))[:21]
+            count = lambda: buildPropertyQuerySet(filters)
+            self.stdout.write(f"search: {search}")
+            self.stdout.write(f"  page plan:  {planSummary(page())}")
+            # plan of matching ids: what the count (and the facets) have to visit
+            self.stdout.write(f"  match plan: {planSummary(count().order_by().values('id'))}")
+            self.stdout.write(formatTiming('  page', timeQuery(lambda: list(page()), repeat)))
+            self.stdout.write(formatTiming('  count', timeQuery(lambda: count().count(), repeat)))
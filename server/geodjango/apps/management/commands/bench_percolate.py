@@ -0,0 +1,76 @@
+import random
+from urllib.parse import urlencode
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from apps.models import Amenity, Property, PropertyType, SavedSearch, SavedSearchAnchor, SavedSearchMatch, Tenant
+from apps.views.savedsearch.services import _savedFilters, anchorsFor, percolate
+from ._bench import BENCH_CITIES, BENCH_TENANT_COGNITO_ID, BenchRollback, formatTiming, seedProperties, timeQuery
+
+
+def randomQuery(rng: random.Random) -> str:
+    """A saved search shaped like the filters tenants actually combine."""
+    params = {}
+    kind = rng.random()
+    if kind < 0.5:
+        _, _, lng, lat = rng.choice(BENCH_CITIES)
+        params.update(latitude=round(lat + rng.uniform(-0.2, 0.2), 4), longitude=round(lng + rng.uniform(-0.2, 0.2), 4), radius=rng.choice([5, 10, 25, 50]))
+    if kind < 0.8:
+        low = rng.randrange(500, 6000, 250)
+        params.update(priceMin=low, priceMax=low + rng.choice([500, 1000, 2000]))
+    if kind < 0.95 and rng.random() < 0.6:
+        params['propertyType'] = rng.choice(PropertyType.values)
+    if rng.random() < 0.5:
+        params['beds'] = rng.randint(1, 4)
+    if rng.random() < 0.2:
+        params['amenities'] = ','.join(rng.sample(Amenity.values, 2))
+    return urlencode(params)
+
+
+class Command(BaseCommand):
+    help = 'Time matching new listings against N saved searches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--searches', type=int, default=100000)
+        parser.add_argument('--listings', type=int, default=2000)
+        parser.add_argument('--sample', type=int, default=200, help='Listings percolated one by one')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise BenchRollback()
+        except BenchRollback:
+            pass
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        self.stdout.write(f"Seeding {options['listings']} listings and {options['searches']} saved searches...")
+        manager = seedProperties(options['listings'])
+        tenant, _ = Tenant.objects.get_or_create(
+            cognitoId=BENCH_TENANT_COGNITO_ID,
+            defaults={'name': 'Bench Tenant', 'email': 'bench-tenant@example.com', 'phoneNumber': '0000000000'}
+        )
+        searches = SavedSearch.objects.bulk_create([
+            SavedSearch(tenantCognitoId=tenant, name=f"bench {i}", query=randomQuery(rng))
+            for i in range(options['searches'])
+        ], batch_size=5000)
+        anchors = []
+        for search in searches:
+            anchors.extend(anchorsFor(search, _savedFilters(search.query)))
+        SavedSearchAnchor.objects.bulk_create(anchors, batch_size=20000)
+
+        self.stdout.write(self.style.SUCCESS(f"== {options['searches']} saved searches, {len(anchors)} anchors"))
+        byKind = SavedSearchAnchor.objects.values('key').annotate(n=Count('id'))
+        kinds = {}
+        for row in byKind:
+            kind = row['key'].split(':')[0]
+            kinds[kind] = kinds.get(kind, 0) + row['n']
+        self.stdout.write('anchors by kind: ' + ', '.join(f"{kind} {n}" for kind, n in sorted(kinds.items())))
+
+        ids = list(Property.objects.filter(managerCognitoId=manager).values_list('id', flat=True))
+        sample = iter(rng.sample(ids, min(options['sample'], len(ids))))
+        self.stdout.write(formatTiming('percolate one listing', timeQuery(lambda: percolate([next(sample)]), options['sample'] - 2)))
+        matches = SavedSearchMatch.objects.filter(tenantCognitoId=tenant).count()
+        self.stdout.write(f"matches: {matches} ({matches / max(1, options['sample'] - 1):.1f} per listing)")
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from apps.models import Lease, Property
+from apps.views.lease.fastserializers import leaseRows
+from apps.views.lease.serializer import LeaseSerializer
+from apps.views.property.fastserializers import propertyRows
+from apps.views.property.serializers import PropertySerializer
+from ._bench import BenchRollback, formatTiming, seedLeases, seedProperties, timeQuery
+
+
+class Command(BaseCommand):
+    help = 'Compare DRF serializers with the values()-based fast path on list endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100, 10000, 100000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                largest = max(options['rows'])
+                self.stdout.write(f"Seeding {largest} properties with one lease each...")
+                manager = seedProperties(largest)
+                seedLeases(manager, 1)
+                for rows in options['rows']:
+                    self.run(rows, manager, options['repeat'])
+                raise BenchRollback()
+        except BenchRollback:
+            pass
+
+    def run(self, rows: int, manager, repeat: int):
+        renderer = JSONRenderer()
+        properties = Property.objects.filter(managerCognitoId=manager).order_by('id')[:rows]
+        leases = Lease.objects.filter(propertyId__managerCognitoId=manager).order_by('id')[:rows]
+
+        def drfProperties():
+            return renderer.render(PropertySerializer(properties.select_related('locationId'), many=True).data)
+
+        def fastProperties():
+            return renderer.render(propertyRows.serialize(properties))
+
+        def drfLeases():
+            queryset = leases.select_related('tenantCognitoId', 'propertyId__locationId')
+            return renderer.render(LeaseSerializer(queryset, many=True).data)
+
+        def fastLeases():
+            return renderer.render(leaseRows.serialize(leases))
+
+        self.stdout.write(self.style.SUCCESS(f"== {rows} rows"))
+        for label, drf, fast in (('properties', drfProperties, fastProperties), ('leases', drfLeases, fastLeases)):
+            if drf() != fast():
+                self.stdout.write(self.style.ERROR(f"{label}: fast path output differs from DRF"))
+            self.stdout.write(formatTiming(f"DRF {label}", timeQuery(drf, repeat)))
+            self.stdout.write(formatTiming(f"fast {label}", timeQuery(fast, repeat)))
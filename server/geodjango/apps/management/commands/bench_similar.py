@@ -0,0 +1,58 @@
+import random
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.models import Property
+from apps.views.property.columnar import ColumnarIndex
+from apps.views.property.similar import SimilarityIndex
+from ._bench import BenchRollback, formatTiming, seedProperties, timeQuery
+
+
+class Command(BaseCommand):
+    help = 'Time properties/<id>/similar lookups on the feature index at several table sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--k', type=int, default=6)
+
+    def handle(self, *args, **options):
+        for rows in options['rows']:
+            try:
+                with transaction.atomic():
+                    self.stdout.write(f"Seeding {rows} properties...")
+                    seedProperties(rows)
+                    # a private directory: the live SEARCH_INDEX_DIR is left alone
+                    with tempfile.TemporaryDirectory() as directory:
+                        self.run(rows, directory, options['repeat'], options['k'])
+                    raise BenchRollback()
+            except BenchRollback:
+                pass
+
+    def run(self, rows: int, directory: str, repeat: int, k: int):
+        self.stdout.write(self.style.SUCCESS(f"== {rows} rows"))
+        index = ColumnarIndex(directory)
+        start = time.perf_counter()
+        index.build()
+        self.stdout.write(f"columnar build: {time.perf_counter() - start:.1f}s")
+
+        similar = SimilarityIndex(index)
+        ids = list(Property.objects.order_by('?').values_list('id', flat=True)[:repeat + 1])
+        start = time.perf_counter()
+        similar.similar(ids[0], k, 'cosine')
+        self.stdout.write(f"feature encoding (first lookup): {time.perf_counter() - start:.1f}s")
+
+        rng = random.Random(7)
+        for metric in ('cosine', 'l2'):
+            for radiusKm in (None, 25):
+                label = f"{metric}{'' if radiusKm is None else f' within {radiusKm} km'}"
+                self.stdout.write(formatTiming(label, timeQuery(lambda: similar.similar(rng.choice(ids), k, metric, radiusKm), repeat)))
+
+        # incremental update: a handful of edits replayed through the change log
+        changed = ids[:10]
+        Property.objects.filter(id__in=changed).update(pricePerMonth=1234)
+        index.recordChanges(changed)
+        start = time.perf_counter()
+        similar.similar(ids[-1], k, 'cosine')
+        self.stdout.write(f"lookup after {len(changed)} changes: {(time.perf_counter() - start) * 1000:.2f} ms")
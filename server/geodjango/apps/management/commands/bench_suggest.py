@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.views.location.services import _querySuggestions, normalizeQuery, suggestCache, suggestLocations
+from ._bench import BenchRollback, analyze, formatTiming, seedProperties, timeQuery
+
+# what users type: short prefixes, a typo, a postal code and an address fragment
+QUERIES = ['lo', 'los', 'los ang', 'seatle', 'san fran', 'ca', '9', '941', 'bench st']
+
+
+class Command(BaseCommand):
+    help = 'Time locations/suggest queries with and without the in-process LRU'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        for rows in options['rows']:
+            try:
+                with transaction.atomic():
+                    self.stdout.write(f"Seeding {rows} properties...")
+                    seedProperties(rows)
+                    analyze()
+                    self.run(rows, options['repeat'])
+                    raise BenchRollback()
+            except BenchRollback:
+                pass
+
+    def run(self, rows: int, repeat: int):
+        self.stdout.write(self.style.SUCCESS(f"== {rows} rows"))
+        for q in QUERIES:
+            q = normalizeQuery(q)
+            suggestions = _querySuggestions(q)
+            if suggestions is None:
+                self.stdout.write(self.style.WARNING(f"{q!r}: over the statement_timeout budget"))
+                continue
+            top = suggestions[0]['label'] if suggestions else '-'
+            self.stdout.write(f"{q!r}: {len(suggestions)} suggestions, top {top}")
+            self.stdout.write(formatTiming('  SQL', timeQuery(lambda: _querySuggestions(q), repeat)))
+            suggestCache().clear()
+            self.stdout.write(formatTiming('  LRU', timeQuery(lambda: suggestLocations(q), repeat)))
@@ -0,0 +1,14 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.views.property.columnar import searchIndex
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the memory-mapped columnar property search index'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = searchIndex().build()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {count} properties in {time.perf_counter() - start:.1f}s"
+        ))
@@ -0,0 +1,62 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.http import QueryDict
+from apps.views.property.services import afterCursor, buildPropertyQuerySet, paginateKeyset, parsePropertyFilters, sortOrdering
+from ._bench import BenchRollback, planNodes, seedProperties
+
+# sort key -> index that must drive ORDER BY ... LIMIT
+SORT_INDEXES = {
+    'postedDate': 'property_posted_id_idx',
+    'pricePerMonth': 'property_price_id_idx',
+    'averageRating': 'property_rating_id_idx',
+    'squareFeet': 'property_sqft_id_idx',
+}
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN every search sort order (both directions, first and later pages) and fail unless its index is used without a Sort'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000)
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        failures = []
+        try:
+            with transaction.atomic():
+                self.stdout.write(f"Seeding {options['rows']} properties...")
+                seedProperties(options['rows'])
+                failures = self.run(options['limit'])
+                raise BenchRollback()
+        except BenchRollback:
+            pass
+        if failures:
+            raise CommandError(f"{len(failures)} sort plan(s) without their index: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('Every sort order is served by its index'))
+
+    def run(self, limit: int) -> list:
+        failures = []
+        filters = parsePropertyFilters(QueryDict(''))
+        for sortKey, index in SORT_INDEXES.items():
+            for descending in (False, True):
+                # a cursor from the first page, to check the keyset predicate too
+                _, cursor = paginateKeyset(buildPropertyQuerySet(filters), sortKey, descending, None, limit)
+                for page, pageCursor in (('first', None), ('next', cursor)):
+                    label = f"{sortKey} {'desc' if descending else 'asc'} {page} page"
+                    queryset = buildPropertyQuerySet(filters)
+                    if pageCursor:
+                        queryset = afterCursor(queryset, sortKey, descending, pageCursor)
+                    queryset = queryset.order_by(*sortOrdering(sortKey, descending))[:limit + 1]
+                    plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+                    nodes = list(planNodes(plan))
+                    usesIndex = any(node.get('Index Name') == index for node in nodes)
+                    sorts = [node['Node Type'] for node in nodes if 'Sort' in node['Node Type']]
+                    if usesIndex and not sorts:
+                        self.stdout.write(f"ok    {label:<36} {index}")
+                    else:
+                        failures.append(label)
+                        self.stdout.write(self.style.ERROR(f"FAIL  {label:<36} index used: {usesIndex}, sorts: {sorts or 'none'}"))
+                        self.stdout.write(queryset.explain())
+        return failures
+
@@ -0,0 +1,201 @@
+import os
+import shutil
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from apps.imaging import FORMATS, PHOTO_DIR, derivativePath, writeAtomically
+from apps.models import MediaBlob, Property
+from apps.photos import (
+    ORIGINAL, STAGING_DIR, contentHash, deleteBlobFiles, enqueuePhotos, hashFile, mediaPath, originalPath,
+    photoUrl, retainBlob,
+)
+
+# Blob files left behind by a rolled back upload: adopted as unreferenced
+# blobs dated by their mtime, so --prune deletes them under the same row lock
+# that keeps it away from files an upload is taking a reference on.
+ADOPT_SQL = """
+INSERT INTO "MediaBlob" (hash, path, size, "refCount", "lastUsedAt")
+VALUES (%s, %s, %s, 0, to_timestamp(%s))
+ON CONFLICT (hash) DO NOTHING
+"""
+
+# Authoritative reference counts: one per photoUrls entry naming the blob
+RECOUNT_SQL = """
+WITH refs AS (
+    SELECT url, count(*) AS n FROM "Property", unnest("photoUrls") AS url GROUP BY url
+)
+UPDATE "MediaBlob" b SET "refCount" = counted.n
+FROM (
+    SELECT blob.hash, coalesce(refs.n, 0) AS n
+    FROM "MediaBlob" blob LEFT JOIN refs ON refs.url = %s || blob.path
+) counted
+WHERE counted.hash = b.hash AND b."refCount" <> counted.n
+"""
+
+PRUNE_SQL = """
+SELECT hash, path FROM "MediaBlob"
+WHERE "refCount" = 0 AND "lastUsedAt" < now() - %s * interval '1 second'
+FOR UPDATE SKIP LOCKED
+"""
+
+
+def _link(source: str, target: str):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        # same filesystem: the blob shares the legacy file's bytes
+        os.link(source, target)
+    except OSError:
+        writeAtomically(target, lambda temporary: shutil.copyfile(source, temporary))
+
+
+class Command(BaseCommand):
+    help = 'Move existing uploads to content-addressed blobs, fix reference counts and optionally delete unused blobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true', help='Delete blobs unreferenced for MEDIA_GC_GRACE seconds')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        self.counts = {'photos': 0, 'stored': 0, 'deduplicated': 0, 'bytesSaved': 0, 'rerender': 0}
+        self.legacyPaths = set()
+        self.legacyHashes = {}
+
+        ids = list(Property.objects.order_by('id').values_list('id', flat=True))
+        for number, propertyId in enumerate(ids, 1):
+            self.migrateProperty(propertyId)
+            if number % 1000 == 0:
+                self.stdout.write(f"  {number}/{len(ids)} properties")
+        removed = self.removeLegacyFiles()
+        adopted = self.adoptOrphans()
+        recounted = self.recount()
+        pruned = self.prune() if options['prune'] else 0
+
+        elapsed = time.perf_counter() - start
+        counts = self.counts
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(ids)} properties in {elapsed:.1f}s ({len(ids) / elapsed if elapsed else 0:.0f}/s): "
+            f"{counts['photos']} legacy photos, {counts['stored']} stored, {counts['deduplicated']} deduplicated "
+            f"({counts['bytesSaved'] / (1024 * 1024):.1f} MB saved), {counts['rerender']} queued for rendering; "
+            f"{removed} legacy files removed, {adopted} orphans adopted, {recounted} counts fixed, {pruned} blobs pruned"
+        ))
+
+    def migrateProperty(self, propertyId: int):
+        with transaction.atomic():
+            property = Property.objects.select_for_update().filter(id=propertyId).first()
+            if property is None:
+                return
+            urls = list(property.photoUrls or [])
+            derivatives = list(property.photoDerivatives or [])
+            derivatives += [None] * (len(urls) - len(derivatives))
+            changed = rerender = False
+
+            for index, url in enumerate(urls):
+                path = originalPath(url)
+                if contentHash(url) or path is None or not os.path.isfile(path):
+                    continue
+                shared = path in self.legacyHashes
+                hash = self.legacyHashes[path] if shared else hashFile(path)
+                size = os.path.getsize(path)
+                relativePath = retainBlob(hash, os.path.splitext(path)[1].lower(), size)
+                target = mediaPath(relativePath)
+                if not os.path.exists(target):
+                    _link(path, target)
+                    self.counts['stored'] += 1
+                elif not shared:
+                    # a second file with the same bytes
+                    self.counts['deduplicated'] += 1
+                    self.counts['bytesSaved'] += size
+                self.counts['photos'] += 1
+                self.legacyPaths.add(path)
+                self.legacyHashes[path] = hash
+                urls[index] = photoUrl(relativePath)
+                derivatives[index] = self.moveDerivatives(derivatives[index], hash)
+                rerender = rerender or derivatives[index] is None
+                changed = True
+
+            if not changed:
+                return
+            # .update(): the references were taken above, the signal handlers must not count them again
+            Property.objects.filter(id=propertyId).update(photoUrls=urls, photoDerivatives=derivatives)
+            if rerender:
+                enqueuePhotos(property)
+                self.counts['rerender'] += 1
+
+    def moveDerivatives(self, entry, hash: str):
+        """Entry with its files under the content-addressed names, None if some are missing."""
+        if not entry:
+            return None
+        moved = {}
+        for size, files in entry.items():
+            moved[size] = dict(files)
+            for key in FORMATS:
+                relativePath = derivativePath(size, hash, key)
+                target = mediaPath(relativePath)
+                source = originalPath(files.get(key))
+                if not os.path.exists(target):
+                    if source is None or not os.path.isfile(source):
+                        return None
+                    _link(source, target)
+                if source is not None:
+                    self.legacyPaths.add(source)
+                moved[size][key] = photoUrl(relativePath)
+        return moved
+
+    def removeLegacyFiles(self) -> int:
+        # a legacy file may still be named by a property this run could not migrate
+        referenced = set()
+        for urls, derivatives in Property.objects.values_list('photoUrls', 'photoDerivatives').iterator(chunk_size=2000):
+            referenced.update(originalPath(url) for url in urls or [])
+            for entry in derivatives or []:
+                for files in (entry or {}).values():
+                    referenced.update(originalPath(url) for url in files.values() if isinstance(url, str))
+        removed = 0
+        for path in self.legacyPaths - referenced:
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def adoptOrphans(self) -> int:
+        root = os.path.join(str(settings.MEDIA_ROOT), PHOTO_DIR, ORIGINAL)
+        expired = time.time() - settings.MEDIA_GC_GRACE
+        known = set(MediaBlob.objects.values_list('hash', flat=True))
+        adopted = 0
+        with connection.cursor() as cursor:
+            for directory, _, names in os.walk(root):
+                for name in names:
+                    path = os.path.join(directory, name)
+                    hash = contentHash(name)
+                    if hash is None or hash in known or os.path.getmtime(path) > expired:
+                        continue
+                    relativePath = os.path.relpath(path, str(settings.MEDIA_ROOT)).replace(os.sep, '/')
+                    cursor.execute(ADOPT_SQL, [hash, relativePath, os.path.getsize(path), os.path.getmtime(path)])
+                    adopted += cursor.rowcount
+
+        # temp files of uploads that never finished
+        staging = os.path.join(str(settings.MEDIA_ROOT), STAGING_DIR)
+        for name in os.listdir(staging) if os.path.isdir(staging) else []:
+            path = os.path.join(staging, name)
+            if os.path.getmtime(path) < expired:
+                os.remove(path)
+        return adopted
+
+    def recount(self) -> int:
+        with transaction.atomic(), connection.cursor() as cursor:
+            # waits for uploads holding a reference in an open transaction, then keeps new ones out
+            cursor.execute('LOCK TABLE "MediaBlob" IN EXCLUSIVE MODE')
+            cursor.execute(RECOUNT_SQL, [settings.MEDIA_URL])
+            return cursor.rowcount
+
+    def prune(self) -> int:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(PRUNE_SQL, [settings.MEDIA_GC_GRACE])
+            blobs = cursor.fetchall()
+            # the rows stay locked until commit: an upload of the same content waits, then recreates the file
+            for _, relativePath in blobs:
+                deleteBlobFiles(relativePath)
+            MediaBlob.objects.filter(hash__in=[hash for hash, _ in blobs]).delete()
+        return len(blobs)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from apps.geocoding import LOOKUP_SOURCES, geocodeStats, resetGeocodeStats
+
+
+class Command(BaseCommand):
+    help = 'Show geocode cache hit rate and lookup latency per source (LRU, table, remote, gazetteer)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        stats = geocodeStats()
+        if not stats['shared']:
+            self.stdout.write(self.style.WARNING(
+                'Counters are kept in each process on the search cache backend, so these are this command\'s own (0). '
+                'Set SEARCH_CACHE_BACKEND to a Redis backend to collect them across processes.'
+            ))
+        for source in LOOKUP_SOURCES:
+            count, meanMs = stats['sources'][source]['count'], stats['sources'][source]['meanMs']
+            latency = f"{meanMs:8.2f} ms" if meanMs is not None else '     n/a'
+            self.stdout.write(f"{source:<14} {count:>10}  mean {latency}")
+        rate = f"{stats['hitRate']:.1%}" if stats['hitRate'] is not None else 'n/a'
+        self.stdout.write(self.style.SUCCESS(f"cache hit rate: {rate}"))
+        if options['reset']:
+            resetGeocodeStats()
+            self.stdout.write('Counters reset')
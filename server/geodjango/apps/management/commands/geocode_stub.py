@@ -0,0 +1,63 @@
+import hashlib
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from django.core.management.base import BaseCommand
+from ._bench import BENCH_CITIES
+
+
+class Command(BaseCommand):
+    help = ('Serve a Nominatim-compatible /search locally, e.g. GEOCODER_URL=http://127.0.0.1:8089/search. '
+            'Answers are deterministic per address; latency and failures can be injected.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8089)
+        parser.add_argument('--delay', type=float, default=0, help='Seconds added to every answer')
+        parser.add_argument('--error-rate', type=float, default=0, help='Share of requests answered 503')
+
+    def handle(self, *args, **options):
+        delay, errorRate = options['delay'], options['error_rate']
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.rstrip('/') != '/search':
+                    self.send_error(404)
+                    return
+                time.sleep(delay)
+                if random.random() < errorRate:
+                    self.send_response(503)
+                    self.send_header('Retry-After', '1')
+                    self.end_headers()
+                    return
+
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                # postal code 00000 never matches, like an unknown address
+                results = []
+                if params.get('postalcode') != '00000':
+                    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).digest()
+                    _, _, lng, lat = BENCH_CITIES[digest[0] % len(BENCH_CITIES)]
+                    lng += (digest[1] - 128) / 1000
+                    lat += (digest[2] - 128) / 1000
+                    results.append({'lon': f"{lng:.7f}", 'lat': f"{lat:.7f}", 'display_name': params.get('street', '')})
+
+                body = json.dumps(results).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', options['port']), Handler)
+        self.stdout.write(self.style.SUCCESS(f"Geocoder stub on http://127.0.0.1:{options['port']}/search"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
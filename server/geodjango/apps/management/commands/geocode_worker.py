@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.geocoding import processJobs
+
+
+class Command(BaseCommand):
+    help = 'Geocode locations queued by property creation (run one or more next to the web workers)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=20, help='Jobs run per round, claimed one at a time')
+        parser.add_argument('--idle', type=float, default=2, help='Seconds to sleep when no job is due')
+        parser.add_argument('--once', action='store_true', help='Process one batch and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            counts = processJobs(options['batch'])
+            if any(counts.values()):
+                self.stdout.write(
+                    f"geocoded {counts['done']}, failed {counts['failed']}, retrying {counts['retry']}, "
+                    f"lease expired {counts['expired']}"
+                )
+            if options['once']:
+                break
+            if not any(counts.values()):
+                time.sleep(options['idle'])
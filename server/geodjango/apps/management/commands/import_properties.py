@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.importer import FORMATS, PropertyImporter, detectFormat
+
+
+class Command(BaseCommand):
+    help = 'Bulk-import properties from CSV or NDJSON (COPY in checkpointed batches; rerun to resume)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--manager', help='managerCognitoId of rows that do not name one')
+        parser.add_argument('--format', choices=FORMATS, help='Default: from the file extension')
+        parser.add_argument('--batch', type=int, help='Rows per checkpoint (default IMPORT_BATCH_SIZE)')
+        parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint of an earlier run of this file')
+
+    def handle(self, *args, **options):
+        try:
+            format = detectFormat(options['path'], requested=options['format'])
+            source = open(options['path'], 'rb')
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        def progress(summary):
+            self.stdout.write(
+                f"  {summary['resumedFrom'] + summary['read']} rows read, {summary['imported']} imported, "
+                f"{summary['rejected']} rejected ({summary['rowsPerSecond']} rows/s)"
+            )
+
+        importer = PropertyImporter(options['manager'], batchSize=options['batch'], progress=progress)
+        try:
+            with source:
+                summary = importer.run(source, format, restart=options['restart'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for error in summary['errors']:
+            self.stdout.write(self.style.WARNING(f"  line {error['line']}: {error['error']}"))
+        if summary['resumedFrom'] and summary['read']:
+            self.stdout.write(f"Resumed after row {summary['resumedFrom']}")
+        geocode = summary['geocode']
+        self.stdout.write(self.style.SUCCESS(
+            f"Import {summary['importId'][:12]}: {summary['imported']} imported, {summary['rejected']} rejected, "
+            f"{summary['locations']} locations ({geocode['given']} with coordinates, {geocode['cached']} from the "
+            f"geocode cache, {geocode['approximate']} approximate, {geocode['queued']} queued) "
+            f"in {summary['seconds']:.1f}s ({summary['rowsPerSecond'] or 0} rows/s)"
+        ))
@@ -0,0 +1,121 @@
+import csv
+import io
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from apps.geocoding import normalizeCountry, normalizePostalCode
+
+# Columns of the header-based CSV format; first matching header wins
+CSV_COLUMNS = {
+    'country': ['country', 'country_code', 'countrycode'],
+    'postalCode': ['postalcode', 'postal_code', 'postcode', 'zip', 'zipcode'],
+    'city': ['city', 'place', 'place_name', 'placename'],
+    'latitude': ['latitude', 'lat'],
+    'longitude': ['longitude', 'lng', 'lon'],
+}
+# GeoNames postal code dumps (allCountries.txt): tab separated, no header
+GEONAMES_COLUMNS = {'country': 0, 'postalCode': 1, 'city': 2, 'latitude': 9, 'longitude': 10}
+
+STAGE_SQL = """
+CREATE TEMP TABLE gazetteer_load (
+    country text, "postalCode" text, city text, longitude float8, latitude float8
+) ON COMMIT DROP
+"""
+
+# Several places may share a postal code: keep their centroid
+MERGE_SQL = """
+INSERT INTO "Gazetteer" (country, "postalCode", city, coordinates)
+SELECT country, "postalCode", min(city), ST_SetSRID(ST_MakePoint(avg(longitude), avg(latitude)), 4326)
+FROM gazetteer_load
+GROUP BY country, "postalCode"
+ON CONFLICT (country, "postalCode") DO UPDATE
+SET city = EXCLUDED.city, coordinates = EXCLUDED.coordinates
+"""
+
+
+def _copyText(value: str) -> str:
+    # COPY text format: tabs, newlines and backslashes are delimiters/escapes
+    return value.replace('\\', ' ').replace('\t', ' ').replace('\n', ' ').replace('\r', ' ')
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load postal code centroids into the Gazetteer table (COPY into a staging table, then upsert)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV with country, postalCode, latitude, longitude[, city] headers, or a GeoNames dump')
+        parser.add_argument('--format', choices=['csv', 'geonames'], default='csv')
+        parser.add_argument('--replace', action='store_true', help='Empty the Gazetteer first')
+        parser.add_argument('--batch', type=int, default=100000, help='Rows per COPY round trip')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            source = open(options['path'], newline='', encoding='utf-8')
+        except OSError as e:
+            raise CommandError(str(e))
+
+        with source, transaction.atomic(), connection.cursor() as cursor:
+            if options['replace']:
+                cursor.execute('TRUNCATE "Gazetteer"')
+            cursor.execute(STAGE_SQL)
+
+            loaded = skipped = 0
+            buffer = io.StringIO()
+            for row in self.rows(source, options['format']):
+                if row is None:
+                    skipped += 1
+                    continue
+                buffer.write('\t'.join(row) + '\n')
+                loaded += 1
+                if loaded % options['batch'] == 0:
+                    self.copy(cursor, buffer)
+                    buffer = io.StringIO()
+                    self.stdout.write(f"  {loaded} rows staged")
+            self.copy(cursor, buffer)
+
+            cursor.execute(MERGE_SQL)
+            merged = cursor.rowcount
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {loaded} rows ({skipped} skipped) into {merged} postal codes "
+            f"in {elapsed:.1f}s ({loaded / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
+
+    @staticmethod
+    def copy(cursor, buffer: io.StringIO):
+        if buffer.tell():
+            buffer.seek(0)
+            cursor.copy_expert('COPY gazetteer_load (country, "postalCode", city, longitude, latitude) FROM STDIN', buffer)
+
+    def rows(self, source, format: str):
+        """Yields COPY-ready tuples, or None for a row without usable coordinates."""
+        if format == 'geonames':
+            reader = csv.reader(source, delimiter='\t', quoting=csv.QUOTE_NONE)
+            columns = GEONAMES_COLUMNS
+        else:
+            reader = csv.reader(source)
+            header = [name.strip().lower() for name in next(reader, [])]
+            columns = {}
+            for column, names in CSV_COLUMNS.items():
+                found = next((header.index(name) for name in names if name in header), None)
+                if found is not None:
+                    columns[column] = found
+            missing = {'country', 'postalCode', 'latitude', 'longitude'} - set(columns)
+            if missing:
+                raise CommandError(f"Missing column(s): {', '.join(sorted(missing))}")
+
+        for values in reader:
+            try:
+                latitude = float(values[columns['latitude']])
+                longitude = float(values[columns['longitude']])
+                postalCode = normalizePostalCode(values[columns['postalCode']])
+                country = normalizeCountry(values[columns['country']])
+            except (IndexError, ValueError):
+                yield None
+                continue
+            if not postalCode or not country or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                yield None
+                continue
+            city = values[columns['city']].strip() if 'city' in columns and columns['city'] < len(values) else ''
+            yield (_copyText(country[:100]), _copyText(postalCode[:20]), _copyText(city[:100]), repr(longitude), repr(latitude))
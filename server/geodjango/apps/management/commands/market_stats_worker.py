@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.views.property.market import processMarketChanges
+
+
+class Command(BaseCommand):
+    help = 'Recompute the market stats of groups written to since the last refresh (run one next to the web workers)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=1000, help='Queued changes taken per round')
+        parser.add_argument('--idle', type=float, default=5, help='Seconds to sleep when nothing is queued')
+        parser.add_argument('--once', action='store_true', help='Process one batch and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            groups = processMarketChanges(options['batch'])
+            if groups:
+                self.stdout.write(f"recomputed {groups} market groups")
+            if options['once']:
+                break
+            if not groups:
+                time.sleep(options['idle'])
@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.views.savedsearch.services import processPercolateJobs
+
+
+class Command(BaseCommand):
+    help = 'Match queued new and updated listings against the saved searches (run one or more next to the web workers)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=5, help='Jobs claimed per round')
+        parser.add_argument('--idle', type=float, default=2, help='Seconds to sleep when no job is due')
+        parser.add_argument('--once', action='store_true', help='Process one batch and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            counts = processPercolateJobs(options['batch'])
+            jobs = counts['done'] + counts['retry'] + counts['failed']
+            if jobs:
+                self.stdout.write(
+                    f"matched {counts['done']} jobs ({counts['matches']} matches), "
+                    f"retrying {counts['retry']}, failed {counts['failed']}"
+                )
+            if options['once']:
+                break
+            if not jobs:
+                time.sleep(options['idle'])
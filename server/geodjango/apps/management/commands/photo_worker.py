@@ -0,0 +1,67 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.core.management.base import BaseCommand
+from django.db.models import F, Func, IntegerField
+from django.utils import timezone
+from apps.models import PhotoJob, Property
+from apps.photos import processJobs
+
+
+class Command(BaseCommand):
+    help = 'Render thumbnail/card/full WebP and JPEG derivatives of uploaded property photos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='Size of the decoding process pool')
+        parser.add_argument('--batch', type=int, default=10, help='Properties claimed per round')
+        parser.add_argument('--idle', type=float, default=2, help='Seconds to sleep when no job is due')
+        parser.add_argument('--once', action='store_true', help='Process one batch and exit')
+        parser.add_argument('--backfill', action='store_true', help='First queue every property whose photos have no derivatives yet')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            queued = self.backfill()
+            self.stdout.write(f"Queued {queued} properties")
+
+        pool = self.startPool(options['processes'])
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    counts = processJobs(pool, options['batch'])
+                except BrokenProcessPool:
+                    # a pool process died (OOM killer, a crashing decoder): the
+                    # jobs it held are retried, the rest of the batch was released
+                    self.stderr.write('Photo pool broken, starting a new one')
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self.startPool(options['processes'])
+                    continue
+                if any(counts.values()):
+                    self.stdout.write(
+                        f"rendered {counts['done']} properties, retrying {counts['retry']}, failed {counts['failed']} "
+                        f"in {time.perf_counter() - start:.1f}s"
+                    )
+                if options['once']:
+                    break
+                if not any(counts.values()):
+                    time.sleep(options['idle'])
+        finally:
+            pool.shutdown()
+
+    @staticmethod
+    def startPool(processes: int) -> ProcessPoolExecutor:
+        # 'spawn': pool processes only import apps.imaging, never Django or the parent's DB connection
+        return ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+
+    @staticmethod
+    def backfill() -> int:
+        # existing rows got photoDerivatives=[] from the migration
+        missing = Property.objects.alias(
+            photoCount=Func(F('photoUrls'), function='cardinality', output_field=IntegerField()),
+        ).filter(photoCount__gt=0, photoDerivatives=[], photoJob__isnull=True).values_list('id', flat=True)
+        now = timezone.now()
+        jobs = [PhotoJob(propertyId_id=id, runAt=now) for id in missing.iterator(chunk_size=2000)]
+        PhotoJob.objects.bulk_create(jobs, batch_size=2000, ignore_conflicts=True)
+        return len(jobs)
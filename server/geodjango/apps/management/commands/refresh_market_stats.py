@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.views.property.market import refreshMarketStats
+
+
+class Command(BaseCommand):
+    help = 'REFRESH MATERIALIZED VIEW CONCURRENTLY "MarketStats" (run from cron, or with --every as a scheduler)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=int, default=0, help='Keep running, refreshing every N seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            refreshMarketStats()
+            self.stdout.write(self.style.SUCCESS(f"MarketStats refreshed in {time.perf_counter() - start:.2f}s"))
+            if not options['every']:
+                break
+            time.sleep(options['every'])
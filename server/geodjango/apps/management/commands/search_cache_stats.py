@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from apps.views.property.cache import cacheStats, resetStats
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss statistics of the property search cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        stats = cacheStats()
+        ratio = f"{stats['hitRatio']:.1%}" if stats['hitRatio'] is not None else 'n/a'
+        self.stdout.write(f"backend:    {stats['backend']}")
+        if not stats['shared']:
+            self.stdout.write(self.style.WARNING(
+                'Counters are kept in each process on this backend: the ones below are this command\'s own (always 0). '
+                'Set SEARCH_CACHE_BACKEND to a Redis backend to read the web workers\' counts.'
+            ))
+        self.stdout.write(f"generation: {stats['generation']}")
+        self.stdout.write(f"hits:       {stats['hits']}")
+        self.stdout.write(f"misses:     {stats['misses']}")
+        self.stdout.write(self.style.SUCCESS(f"hit ratio:  {ratio}"))
+        if options['reset']:
+            resetStats()
+            self.stdout.write('Counters reset')
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0003_alter_application_tenantcognitoid'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['postedDate', 'id'], name='property_posted_id_idx'),
+        ),
+    ]
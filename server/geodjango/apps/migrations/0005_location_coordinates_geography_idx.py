@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-18 10:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0004_property_posted_id_idx'),
+    ]
+
+    # The GiST index Django creates for `coordinates` is on the planar geometry.
+    # Radius search and KNN ordering cast to geography, which needs its own
+    # expression index to avoid a sequential scan.
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS "location_coordinates_geog_idx" '
+                'ON "Location" USING GIST ((coordinates::geography));',
+            reverse_sql='DROP INDEX IF EXISTS "location_coordinates_geog_idx";',
+        ),
+    ]
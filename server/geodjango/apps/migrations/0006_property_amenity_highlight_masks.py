@@ -0,0 +1,70 @@
+# Generated by Django 5.2 on 2026-10-18 11:40
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+# Bit i is the i-th member of Amenity / Highlight as of this migration. The
+# lists are frozen here on purpose: a new enum member needs a new migration
+# that replaces the function and rewrites the generated columns.
+AMENITY_MASK_SQL = """
+CREATE OR REPLACE FUNCTION property_amenity_mask(varchar[]) RETURNS bigint
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT COALESCE(bit_or(1::bigint << (p.i - 1)), 0)
+        FROM unnest($1) AS v(item)
+        CROSS JOIN LATERAL array_position(
+            ARRAY['WasherDryer', 'AirConditioning', 'Dishwasher', 'HighSpeedInternet', 'HardwoodFloors', 'WalkInClosets', 'Microwave', 'Refrigerator', 'Pool', 'Gym', 'Parking', 'PetsAllowed', 'WiFi']::varchar[],
+            v.item
+        ) AS p(i)
+        WHERE p.i IS NOT NULL
+    $$;
+"""
+
+HIGHLIGHT_MASK_SQL = """
+CREATE OR REPLACE FUNCTION property_highlight_mask(varchar[]) RETURNS bigint
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT COALESCE(bit_or(1::bigint << (p.i - 1)), 0)
+        FROM unnest($1) AS v(item)
+        CROSS JOIN LATERAL array_position(
+            ARRAY['HighSpeedInternetAccess', 'WasherDryer', 'AirConditioning', 'Heating', 'SmokeFree', 'CableReady', 'SatelliteTV', 'DoubleVanities', 'TubShower', 'Intercom', 'SprinklerSystem', 'RecentlyRenovated', 'CloseToTransit', 'GreatView', 'QuietNeighborhood']::varchar[],
+            v.item
+        ) AS p(i)
+        WHERE p.i IS NOT NULL
+    $$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0005_location_coordinates_geography_idx'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=AMENITY_MASK_SQL,
+            reverse_sql='DROP FUNCTION IF EXISTS property_amenity_mask(varchar[]);',
+        ),
+        migrations.RunSQL(
+            sql=HIGHLIGHT_MASK_SQL,
+            reverse_sql='DROP FUNCTION IF EXISTS property_highlight_mask(varchar[]);',
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='amenityMask',
+            field=models.GeneratedField(db_column='amenityMask', db_persist=True, expression=models.Func(models.F('amenities'), function='property_amenity_mask', output_field=models.BigIntegerField()), output_field=models.BigIntegerField()),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='highlightMask',
+            field=models.GeneratedField(db_column='highlightMask', db_persist=True, expression=models.Func(models.F('highlights'), function='property_highlight_mask', output_field=models.BigIntegerField()), output_field=models.BigIntegerField()),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['amenities'], name='property_amenities_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['highlights'], name='property_highlights_gin'),
+        ),
+    ]
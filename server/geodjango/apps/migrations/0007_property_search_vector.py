@@ -0,0 +1,73 @@
+# Generated by Django 5.2 on 2026-10-18 13:05
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Weights: A name, B city/state, C address, D description. Property rows are
+# recomputed on every insert/update; Location edits push to their properties.
+SEARCH_VECTOR_SQL = """
+CREATE OR REPLACE FUNCTION property_search_vector(p_name text, p_description text, p_location bigint)
+RETURNS tsvector LANGUAGE sql STABLE AS $$
+    SELECT setweight(to_tsvector('english', coalesce(p_name, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(l.city, '') || ' ' || coalesce(l.state, '')), 'B')
+        || setweight(to_tsvector('english', coalesce(l.address, '')), 'C')
+        || setweight(to_tsvector('english', coalesce(p_description, '')), 'D')
+    FROM (SELECT 1) AS one
+    LEFT JOIN "Location" l ON l.id = p_location
+$$;
+
+CREATE OR REPLACE FUNCTION property_search_vector_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW."searchVector" := property_search_vector(NEW.name, NEW.description, NEW."locationId");
+    RETURN NEW;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION location_search_vector_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE "Property" SET "searchVector" = property_search_vector(name, description, "locationId")
+    WHERE "locationId" = NEW.id;
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER property_search_vector_update
+    BEFORE INSERT OR UPDATE ON "Property"
+    FOR EACH ROW EXECUTE FUNCTION property_search_vector_trigger();
+
+CREATE TRIGGER location_search_vector_update
+    AFTER UPDATE OF address, city, state ON "Location"
+    FOR EACH ROW EXECUTE FUNCTION location_search_vector_trigger();
+
+UPDATE "Property" SET "searchVector" = property_search_vector(name, description, "locationId");
+"""
+
+SEARCH_VECTOR_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS location_search_vector_update ON "Location";
+DROP TRIGGER IF EXISTS property_search_vector_update ON "Property";
+DROP FUNCTION IF EXISTS location_search_vector_trigger();
+DROP FUNCTION IF EXISTS property_search_vector_trigger();
+DROP FUNCTION IF EXISTS property_search_vector(text, text, bigint);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0006_property_amenity_highlight_masks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='searchVector',
+            field=django.contrib.postgres.search.SearchVectorField(db_column='searchVector', editable=False, null=True),
+        ),
+        migrations.RunSQL(sql=SEARCH_VECTOR_SQL, reverse_sql=SEARCH_VECTOR_REVERSE_SQL),
+        migrations.AddIndex(
+            model_name='property',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['searchVector'], name='property_search_vector_gin'),
+        ),
+    ]
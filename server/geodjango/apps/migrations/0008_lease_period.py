@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 14:20
+
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0007_property_search_vector'),
+    ]
+
+    operations = [
+        # GiST support for the integer propertyId column of the composite index
+        BtreeGistExtension(),
+        migrations.AddField(
+            model_name='lease',
+            name='period',
+            field=models.GeneratedField(db_persist=True, expression=models.Func(models.F('startDate'), django.db.models.functions.comparison.Greatest('startDate', 'endDate'), models.Value('[)'), function='tstzrange', output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField()), output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField()),
+        ),
+        migrations.AddIndex(
+            model_name='lease',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['propertyId', 'period'], name='lease_property_period_gist'),
+        ),
+    ]
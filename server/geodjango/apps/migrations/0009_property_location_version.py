@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+# Row versions for ETags. Bumped in the database so queryset.update() and raw
+# SQL writes change the ETag too; whatever version the ORM writes is ignored.
+ROW_VERSION_SQL = """
+CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END
+$$;
+
+CREATE TRIGGER location_version_update
+    BEFORE UPDATE ON "Location"
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+CREATE TRIGGER property_version_update
+    BEFORE UPDATE ON "Property"
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+"""
+
+ROW_VERSION_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS property_version_update ON "Property";
+DROP TRIGGER IF EXISTS location_version_update ON "Location";
+DROP FUNCTION IF EXISTS bump_row_version();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0008_lease_period'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='version',
+            field=models.BigIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='version',
+            field=models.BigIntegerField(default=1, editable=False),
+        ),
+        migrations.RunSQL(ROW_VERSION_SQL, ROW_VERSION_REVERSE_SQL),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0010_property_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['pricePerMonth', 'beds', 'baths', 'squareFeet'], include=['propertyType', 'amenityMask', 'highlightMask'], name='property_filters_cover_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['propertyType', 'postedDate', 'id'], name='property_type_posted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('propertyType', 'Apartment')), fields=['pricePerMonth', 'beds'], name='property_apartment_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('propertyType', 'Rooms')), fields=['pricePerMonth', 'beds'], name='property_rooms_price_idx'),
+        ),
+    ]
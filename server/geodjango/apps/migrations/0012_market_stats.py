@@ -0,0 +1,91 @@
+# Generated by Django 5.2 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+# One row per (city, state, propertyType). `leased` counts listings with a
+# lease covering the refresh time; vacancy is the share without one.
+# Keep in sync with MARKET_STATS_SELECT in apps/views/property/market.py.
+MARKET_STATS_SQL = """
+CREATE MATERIALIZED VIEW "MarketStats" AS
+SELECT
+    l.city || '|' || l.state || '|' || p."propertyType" AS key,
+    l.city,
+    l.state,
+    p."propertyType",
+    count(*)::integer AS listings,
+    count(*) FILTER (WHERE lease.id IS NOT NULL)::integer AS leased,
+    1 - count(*) FILTER (WHERE lease.id IS NOT NULL)::float / count(*) AS vacancy,
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY p."pricePerMonth") AS "medianRent",
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY p."pricePerMonth" / NULLIF(p."squareFeet", 0)) AS "medianPricePerSqft",
+    now() AS "refreshedAt"
+FROM "Property" p
+JOIN "Location" l ON l.id = p."locationId"
+LEFT JOIN LATERAL (
+    SELECT le.id FROM "Lease" le
+    WHERE le."propertyId" = p.id AND le.period @> now()
+    LIMIT 1
+) lease ON true
+GROUP BY l.city, l.state, p."propertyType";
+
+-- REFRESH ... CONCURRENTLY needs a unique index without WHERE
+CREATE UNIQUE INDEX market_stats_group_idx ON "MarketStats" (city, state, "propertyType");
+"""
+
+MARKET_STATS_REVERSE_SQL = """
+DROP MATERIALIZED VIEW IF EXISTS "MarketStats";
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0011_property_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['city', 'state'], name='location_city_state_idx'),
+        ),
+        migrations.CreateModel(
+            name='MarketStats',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('city', models.CharField(max_length=100)),
+                ('state', models.CharField(max_length=100)),
+                ('propertyType', models.CharField(choices=[('Rooms', 'Rooms'), ('Tinyhouse', 'Tinyhouse'), ('Apartment', 'Apartment'), ('Villa', 'Villa'), ('Townhouse', 'Townhouse'), ('Cottage', 'Cottage')], db_column='propertyType', max_length=20)),
+                ('listings', models.IntegerField()),
+                ('leased', models.IntegerField()),
+                ('vacancy', models.FloatField(null=True)),
+                ('medianRent', models.FloatField(db_column='medianRent', null=True)),
+                ('medianPricePerSqft', models.FloatField(db_column='medianPricePerSqft', null=True)),
+                ('refreshedAt', models.DateTimeField(db_column='refreshedAt')),
+            ],
+            options={
+                'db_table': 'MarketStats',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MarketStatsDelta',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('city', models.CharField(max_length=100)),
+                ('state', models.CharField(max_length=100)),
+                ('propertyType', models.CharField(choices=[('Rooms', 'Rooms'), ('Tinyhouse', 'Tinyhouse'), ('Apartment', 'Apartment'), ('Villa', 'Villa'), ('Townhouse', 'Townhouse'), ('Cottage', 'Cottage')], db_column='propertyType', max_length=20)),
+                ('listings', models.IntegerField()),
+                ('leased', models.IntegerField()),
+                ('vacancy', models.FloatField(null=True)),
+                ('medianRent', models.FloatField(db_column='medianRent', null=True)),
+                ('medianPricePerSqft', models.FloatField(db_column='medianPricePerSqft', null=True)),
+                ('computedAt', models.DateTimeField(db_column='computedAt')),
+            ],
+            options={
+                'db_table': 'MarketStatsDelta',
+                'managed': True,
+                'indexes': [models.Index(fields=['city', 'state'], name='market_delta_city_state_idx')],
+            },
+        ),
+        migrations.RunSQL(MARKET_STATS_SQL, MARKET_STATS_REVERSE_SQL),
+    ]
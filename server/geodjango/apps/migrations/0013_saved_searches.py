@@ -0,0 +1,58 @@
+# Generated by Django 5.2 on 2026-10-18 17:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0012_market_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('query', models.TextField()),
+                ('createdAt', models.DateTimeField(auto_now_add=True, db_column='createdAt')),
+                ('tenantCognitoId', models.ForeignKey(db_column='tenantCognitoId', on_delete=django.db.models.deletion.CASCADE, related_name='savedSearches', to='apps.tenant', to_field='cognitoId')),
+            ],
+            options={
+                'db_table': 'SavedSearch',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='SavedSearchAnchor',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('key', models.CharField(max_length=64)),
+                ('savedSearch', models.ForeignKey(db_column='savedSearchId', on_delete=django.db.models.deletion.CASCADE, related_name='anchors', to='apps.savedsearch')),
+            ],
+            options={
+                'db_table': 'SavedSearchAnchor',
+                'managed': True,
+                'indexes': [models.Index(fields=['key', 'savedSearch'], name='saved_search_anchor_key_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SavedSearchMatch',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('matchedAt', models.DateTimeField(auto_now_add=True, db_column='matchedAt')),
+                ('isRead', models.BooleanField(default=False, db_column='isRead')),
+                ('propertyId', models.ForeignKey(db_column='propertyId', on_delete=django.db.models.deletion.CASCADE, to='apps.property')),
+                ('savedSearch', models.ForeignKey(db_column='savedSearchId', on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='apps.savedsearch')),
+                ('tenantCognitoId', models.ForeignKey(db_column='tenantCognitoId', on_delete=django.db.models.deletion.CASCADE, to='apps.tenant', to_field='cognitoId')),
+            ],
+            options={
+                'db_table': 'SavedSearchMatch',
+                'managed': True,
+                'indexes': [models.Index(fields=['tenantCognitoId', '-matchedAt'], name='saved_search_inbox_idx')],
+                'constraints': [models.UniqueConstraint(fields=('savedSearch', 'propertyId'), name='saved_search_match_unique')],
+            },
+        ),
+    ]
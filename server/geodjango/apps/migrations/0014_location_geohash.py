@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+# The column is added empty (no table rewrite); new rows and moved points get
+# their geohash from the trigger, existing rows from `manage.py backfill_geohash`.
+GEOHASH_SQL = """
+CREATE OR REPLACE FUNCTION location_geohash_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.geohash := ST_GeoHash(NEW.coordinates, 12);
+    RETURN NEW;
+END
+$$;
+
+CREATE TRIGGER location_geohash_update
+    BEFORE INSERT OR UPDATE OF coordinates ON "Location"
+    FOR EACH ROW EXECUTE FUNCTION location_geohash_trigger();
+"""
+
+GEOHASH_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS location_geohash_update ON "Location";
+DROP FUNCTION IF EXISTS location_geohash_trigger();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0013_saved_searches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='geohash',
+            field=models.CharField(editable=False, max_length=12, null=True),
+        ),
+        migrations.RunSQL(GEOHASH_SQL, GEOHASH_REVERSE_SQL),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['geohash'], name='location_geohash_idx', opclasses=['text_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 19:10
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0014_location_geohash'),
+    ]
+
+    operations = [
+        # gin_trgm_ops, similarity() and the % / <% operators used by locations/suggest
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='location',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['city'], name='location_city_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['state'], name='location_state_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['address'], name='location_address_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['postalCode'], name='location_postal_code_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
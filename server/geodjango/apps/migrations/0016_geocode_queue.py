@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-18 19:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0015_location_trigram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='geocodeStatus',
+            field=models.CharField(choices=[('Pending', 'Pending'), ('Done', 'Done'), ('Failed', 'Failed')], db_column='geocodeStatus', default='Done', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='GeocodeJob',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('attempts', models.IntegerField(default=0)),
+                ('runAt', models.DateTimeField(db_column='runAt')),
+                ('lastError', models.TextField(blank=True, db_column='lastError', default='')),
+                ('createdAt', models.DateTimeField(auto_now_add=True, db_column='createdAt')),
+                ('locationId', models.OneToOneField(db_column='locationId', on_delete=django.db.models.deletion.CASCADE, related_name='geocodeJob', to='apps.location')),
+            ],
+            options={
+                'db_table': 'GeocodeJob',
+                'managed': True,
+                'indexes': [models.Index(fields=['runAt'], name='geocode_job_run_at_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RateLimit',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('nextAt', models.DateTimeField(db_column='nextAt')),
+            ],
+            options={
+                'db_table': 'RateLimit',
+                'managed': True,
+            },
+        ),
+    ]
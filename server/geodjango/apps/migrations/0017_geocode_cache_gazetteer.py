@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-18 20:15
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0016_geocode_queue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='location',
+            name='geocodeStatus',
+            field=models.CharField(choices=[('Pending', 'Pending'), ('Done', 'Done'), ('Approximate', 'Approximate'), ('Failed', 'Failed')], db_column='geocodeStatus', default='Done', max_length=12),
+        ),
+        migrations.CreateModel(
+            name='GeocodeCache',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('street', models.CharField(max_length=255)),
+                ('city', models.CharField(max_length=100)),
+                ('postalCode', models.CharField(db_column='postalCode', max_length=20)),
+                ('country', models.CharField(max_length=100)),
+                ('coordinates', django.contrib.gis.db.models.fields.PointField(null=True, srid=4326)),
+                ('createdAt', models.DateTimeField(auto_now=True, db_column='createdAt')),
+            ],
+            options={
+                'db_table': 'GeocodeCache',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='Gazetteer',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('country', models.CharField(max_length=100)),
+                ('postalCode', models.CharField(db_column='postalCode', max_length=20)),
+                ('city', models.CharField(blank=True, default='', max_length=100)),
+                ('coordinates', django.contrib.gis.db.models.fields.PointField(srid=4326)),
+            ],
+            options={
+                'db_table': 'Gazetteer',
+                'managed': True,
+                'constraints': [models.UniqueConstraint(fields=('country', 'postalCode'), name='gazetteer_country_postal_code_unique')],
+            },
+        ),
+    ]
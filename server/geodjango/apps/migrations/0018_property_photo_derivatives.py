@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 20:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0017_geocode_cache_gazetteer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='photoDerivatives',
+            field=models.JSONField(db_column='photoDerivatives', default=list),
+        ),
+        migrations.CreateModel(
+            name='PhotoJob',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('attempts', models.IntegerField(default=0)),
+                ('runAt', models.DateTimeField(db_column='runAt')),
+                ('lastError', models.TextField(blank=True, db_column='lastError', default='')),
+                ('createdAt', models.DateTimeField(auto_now_add=True, db_column='createdAt')),
+                ('propertyId', models.OneToOneField(db_column='propertyId', on_delete=django.db.models.deletion.CASCADE, related_name='photoJob', to='apps.property')),
+            ],
+            options={
+                'db_table': 'PhotoJob',
+                'managed': True,
+                'indexes': [models.Index(fields=['runAt'], name='photo_job_run_at_idx')],
+            },
+        ),
+    ]
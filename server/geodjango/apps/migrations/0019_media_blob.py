@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 22:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0018_property_photo_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('path', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('refCount', models.IntegerField(db_column='refCount', default=0)),
+                ('lastUsedAt', models.DateTimeField(db_column='lastUsedAt')),
+            ],
+            options={
+                'db_table': 'MediaBlob',
+                'managed': True,
+                'indexes': [models.Index(condition=models.Q(('refCount', 0)), fields=['lastUsedAt'], name='media_blob_unused_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0019_media_blob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyImport',
+            fields=[
+                ('id', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('managerCognitoId', models.CharField(db_column='managerCognitoId', max_length=255)),
+                ('format', models.CharField(max_length=10)),
+                ('position', models.IntegerField(default=0)),
+                ('imported', models.IntegerField(default=0)),
+                ('rejected', models.IntegerField(default=0)),
+                ('createdAt', models.DateTimeField(auto_now_add=True, db_column='createdAt')),
+                ('updatedAt', models.DateTimeField(auto_now=True, db_column='updatedAt')),
+                ('finishedAt', models.DateTimeField(db_column='finishedAt', null=True)),
+            ],
+            options={
+                'db_table': 'PropertyImport',
+                'managed': True,
+            },
+        ),
+    ]
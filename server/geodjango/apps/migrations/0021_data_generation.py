@@ -0,0 +1,62 @@
+# Generated by Django 5.2 on 2026-10-19 09:10
+
+from django.db import migrations, models
+
+
+# 'search' changes with any write to the tables search responses are built
+# from, including COPY, queryset.update() and other processes. One statement
+# bumps it once whatever the number of rows; the row lock it takes is held
+# until the writing transaction commits, so readers never see a new value
+# before the data it stands for.
+DATA_GENERATION_SQL = """
+INSERT INTO "DataGeneration" (name, value)
+VALUES ('search', (extract(epoch FROM clock_timestamp()) * 1000000)::bigint);
+
+CREATE OR REPLACE FUNCTION bump_search_generation() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE "DataGeneration" SET value = value + 1 WHERE name = 'search';
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER property_search_generation
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "Property"
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_search_generation();
+
+CREATE TRIGGER location_search_generation
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "Location"
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_search_generation();
+
+CREATE TRIGGER lease_search_generation
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "Lease"
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_search_generation();
+"""
+
+DATA_GENERATION_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS lease_search_generation ON "Lease";
+DROP TRIGGER IF EXISTS location_search_generation ON "Location";
+DROP TRIGGER IF EXISTS property_search_generation ON "Property";
+DROP FUNCTION IF EXISTS bump_search_generation();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0020_property_import'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataGeneration',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField()),
+            ],
+            options={
+                'db_table': 'DataGeneration',
+                'managed': True,
+            },
+        ),
+        migrations.RunSQL(DATA_GENERATION_SQL, DATA_GENERATION_REVERSE_SQL),
+    ]
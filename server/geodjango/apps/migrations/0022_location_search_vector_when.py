@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-19 09:40
+
+from django.db import migrations
+
+
+# Django's save() lists every column in its UPDATE, so `UPDATE OF address,
+# city, state` alone fired on every Location save (geocode_worker's included)
+# and rewrote the searchVector of all its properties. Only a text change does now.
+SEARCH_VECTOR_WHEN_SQL = """
+DROP TRIGGER IF EXISTS location_search_vector_update ON "Location";
+CREATE TRIGGER location_search_vector_update
+    AFTER UPDATE OF address, city, state ON "Location"
+    FOR EACH ROW
+    WHEN (OLD.address IS DISTINCT FROM NEW.address OR OLD.city IS DISTINCT FROM NEW.city OR OLD.state IS DISTINCT FROM NEW.state)
+    EXECUTE FUNCTION location_search_vector_trigger();
+"""
+
+SEARCH_VECTOR_WHEN_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS location_search_vector_update ON "Location";
+CREATE TRIGGER location_search_vector_update
+    AFTER UPDATE OF address, city, state ON "Location"
+    FOR EACH ROW EXECUTE FUNCTION location_search_vector_trigger();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0021_data_generation'),
+    ]
+
+    operations = [
+        migrations.RunSQL(SEARCH_VECTOR_WHEN_SQL, SEARCH_VECTOR_WHEN_REVERSE_SQL),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-19 10:05
+
+from django.db import migrations
+
+
+# Map and tile queries find locations by geohash prefix only, so a row left
+# with a NULL geohash by 0014 would be missing from them until someone ran
+# `manage.py backfill_geohash`. Fill them here; the command stays for
+# re-runs in small batches on a live database.
+GEOHASH_BACKFILL_SQL = """
+UPDATE "Location" SET geohash = ST_GeoHash(coordinates, 12)
+WHERE geohash IS NULL AND coordinates IS NOT NULL;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0022_location_search_vector_when'),
+    ]
+
+    operations = [
+        migrations.RunSQL(GEOHASH_BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
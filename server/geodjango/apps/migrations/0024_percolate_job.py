@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-19 10:20
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0023_location_geohash_backfill'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PercolateJob',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('propertyIds', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), db_column='propertyIds', size=None)),
+                ('attempts', models.IntegerField(default=0)),
+                ('runAt', models.DateTimeField(db_column='runAt')),
+                ('lastError', models.TextField(blank=True, db_column='lastError', default='')),
+                ('createdAt', models.DateTimeField(auto_now_add=True, db_column='createdAt')),
+            ],
+            options={
+                'db_table': 'PercolateJob',
+                'managed': True,
+                'indexes': [models.Index(fields=['runAt'], name='percolate_job_run_at_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 5.2 on 2026-10-19 11:30
+
+from django.db import migrations
+
+
+# The 'search' generation of 0021 was a row every writing transaction locked
+# until commit, which serialized writers and could deadlock them. It is now a
+# sequence: nextval() takes no lock that outlives the call and is never rolled
+# back. The triggers are deferred to commit, so a reader only sees a new value
+# once the write it stands for is (all but) visible. Updates that only touch
+# columns the cached responses can do without (row versions, the
+# trigger-maintained searchVector and geohash, and photoDerivatives: cards
+# fall back to the original photo until the next generation) leave cached
+# searches and tiles alone.
+SEARCH_GENERATION_SQL = """
+DROP TRIGGER IF EXISTS lease_search_generation ON "Lease";
+DROP TRIGGER IF EXISTS location_search_generation ON "Location";
+DROP TRIGGER IF EXISTS property_search_generation ON "Property";
+
+CREATE SEQUENCE search_generation;
+SELECT setval('search_generation', (extract(epoch FROM clock_timestamp()) * 1000000)::bigint);
+
+CREATE OR REPLACE FUNCTION bump_search_generation() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM nextval('search_generation');
+    RETURN NULL;
+END
+$$;
+
+CREATE CONSTRAINT TRIGGER property_search_generation
+    AFTER INSERT OR DELETE ON "Property" DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION bump_search_generation();
+CREATE CONSTRAINT TRIGGER property_search_generation_update
+    AFTER UPDATE ON "Property" DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW
+    WHEN ((to_jsonb(OLD) - ARRAY['version', 'searchVector', 'photoDerivatives'])
+          IS DISTINCT FROM (to_jsonb(NEW) - ARRAY['version', 'searchVector', 'photoDerivatives']))
+    EXECUTE FUNCTION bump_search_generation();
+CREATE TRIGGER property_search_generation_truncate
+    AFTER TRUNCATE ON "Property"
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_search_generation();
+
+CREATE CONSTRAINT TRIGGER location_search_generation
+    AFTER INSERT OR DELETE ON "Location" DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION bump_search_generation();
+CREATE CONSTRAINT TRIGGER location_search_generation_update
+    AFTER UPDATE ON "Location" DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW
+    WHEN ((to_jsonb(OLD) - ARRAY['version', 'geohash']) IS DISTINCT FROM (to_jsonb(NEW) - ARRAY['version', 'geohash']))
+    EXECUTE FUNCTION bump_search_generation();
+CREATE TRIGGER location_search_generation_truncate
+    AFTER TRUNCATE ON "Location"
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_search_generation();
+
+CREATE CONSTRAINT TRIGGER lease_search_generation
+    AFTER INSERT OR DELETE ON "Lease" DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION bump_search_generation();
+CREATE CONSTRAINT TRIGGER lease_search_generation_update
+    AFTER UPDATE ON "Lease" DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW WHEN (OLD IS DISTINCT FROM NEW)
+    EXECUTE FUNCTION bump_search_generation();
+CREATE TRIGGER lease_search_generation_truncate
+    AFTER TRUNCATE ON "Lease"
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_search_generation();
+"""
+
+# back to the statement triggers of 0021
+SEARCH_GENERATION_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS lease_search_generation_truncate ON "Lease";
+DROP TRIGGER IF EXISTS lease_search_generation_update ON "Lease";
+DROP TRIGGER IF EXISTS lease_search_generation ON "Lease";
+DROP TRIGGER IF EXISTS location_search_generation_truncate ON "Location";
+DROP TRIGGER IF EXISTS location_search_generation_update ON "Location";
+DROP TRIGGER IF EXISTS location_search_generation ON "Location";
+DROP TRIGGER IF EXISTS property_search_generation_truncate ON "Property";
+DROP TRIGGER IF EXISTS property_search_generation_update ON "Property";
+DROP TRIGGER IF EXISTS property_search_generation ON "Property";
+
+INSERT INTO "DataGeneration" (name, value) SELECT 'search', last_value FROM search_generation;
+DROP SEQUENCE IF EXISTS search_generation;
+
+CREATE OR REPLACE FUNCTION bump_search_generation() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE "DataGeneration" SET value = value + 1 WHERE name = 'search';
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER property_search_generation
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "Property"
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_search_generation();
+CREATE TRIGGER location_search_generation
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "Location"
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_search_generation();
+CREATE TRIGGER lease_search_generation
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "Lease"
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_search_generation();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0024_percolate_job'),
+    ]
+
+    operations = [
+        migrations.RunSQL(SEARCH_GENERATION_SQL, SEARCH_GENERATION_REVERSE_SQL),
+        migrations.DeleteModel(
+            name='DataGeneration',
+        ),
+    ]
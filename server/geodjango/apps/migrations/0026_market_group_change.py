@@ -0,0 +1,137 @@
+# Generated by Django 5.2 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+# Market groups a write may have changed, queued by statement triggers for
+# `manage.py market_stats_worker` (apps/views/property/market.py). One
+# INSERT ... SELECT DISTINCT per statement from its transition tables, so a
+# COPY of a whole import batch queues each of its groups once, and writers
+# never wait on each other: rows are only ever appended. Updates that leave
+# the figures alone (photo derivatives, versions, geocoding) queue nothing.
+MARKET_GROUP_CHANGE_SQL = """
+CREATE OR REPLACE FUNCTION queue_property_market_groups() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO "MarketGroupChange" (city, state, "propertyType")
+        SELECT DISTINCT l.city, l.state, p."propertyType"
+        FROM new_rows p JOIN "Location" l ON l.id = p."locationId";
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO "MarketGroupChange" (city, state, "propertyType")
+        SELECT DISTINCT l.city, l.state, p."propertyType"
+        FROM old_rows p JOIN "Location" l ON l.id = p."locationId";
+    ELSE
+        INSERT INTO "MarketGroupChange" (city, state, "propertyType")
+        SELECT DISTINCT l.city, l.state, p."propertyType"
+        FROM (
+            SELECT o."locationId", o."propertyType", n."locationId" AS "newLocationId", n."propertyType" AS "newPropertyType"
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE (o."locationId", o."propertyType", o."pricePerMonth", o."squareFeet")
+                IS DISTINCT FROM (n."locationId", n."propertyType", n."pricePerMonth", n."squareFeet")
+        ) changed
+        CROSS JOIN LATERAL (VALUES
+            (changed."locationId", changed."propertyType"),
+            (changed."newLocationId", changed."newPropertyType")
+        ) p ("locationId", "propertyType")
+        JOIN "Location" l ON l.id = p."locationId";
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION queue_location_market_groups() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    -- a new Location has no listings yet, and deleting one deletes them first
+    INSERT INTO "MarketGroupChange" (city, state, "propertyType")
+    SELECT DISTINCT g.city, g.state, p."propertyType"
+    FROM old_rows o JOIN new_rows n ON n.id = o.id
+    JOIN "Property" p ON p."locationId" = n.id
+    CROSS JOIN LATERAL (VALUES (o.city, o.state), (n.city, n.state)) g (city, state)
+    WHERE (o.city, o.state) IS DISTINCT FROM (n.city, n.state);
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION queue_lease_market_groups() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO "MarketGroupChange" (city, state, "propertyType")
+        SELECT DISTINCT l.city, l.state, p."propertyType"
+        FROM new_rows le JOIN "Property" p ON p.id = le."propertyId" JOIN "Location" l ON l.id = p."locationId";
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO "MarketGroupChange" (city, state, "propertyType")
+        SELECT DISTINCT l.city, l.state, p."propertyType"
+        FROM old_rows le JOIN "Property" p ON p.id = le."propertyId" JOIN "Location" l ON l.id = p."locationId";
+    ELSE
+        INSERT INTO "MarketGroupChange" (city, state, "propertyType")
+        SELECT DISTINCT l.city, l.state, p."propertyType"
+        FROM old_rows o JOIN new_rows n ON n.id = o.id
+        CROSS JOIN LATERAL (VALUES (o."propertyId"), (n."propertyId")) le ("propertyId")
+        JOIN "Property" p ON p.id = le."propertyId" JOIN "Location" l ON l.id = p."locationId"
+        WHERE (o."propertyId", o.period) IS DISTINCT FROM (n."propertyId", n.period);
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER property_market_groups_insert
+    AFTER INSERT ON "Property" REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION queue_property_market_groups();
+CREATE TRIGGER property_market_groups_update
+    AFTER UPDATE ON "Property" REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION queue_property_market_groups();
+CREATE TRIGGER property_market_groups_delete
+    AFTER DELETE ON "Property" REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION queue_property_market_groups();
+
+CREATE TRIGGER location_market_groups_update
+    AFTER UPDATE ON "Location" REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION queue_location_market_groups();
+
+CREATE TRIGGER lease_market_groups_insert
+    AFTER INSERT ON "Lease" REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION queue_lease_market_groups();
+CREATE TRIGGER lease_market_groups_update
+    AFTER UPDATE ON "Lease" REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION queue_lease_market_groups();
+CREATE TRIGGER lease_market_groups_delete
+    AFTER DELETE ON "Lease" REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION queue_lease_market_groups();
+"""
+
+MARKET_GROUP_CHANGE_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS lease_market_groups_delete ON "Lease";
+DROP TRIGGER IF EXISTS lease_market_groups_update ON "Lease";
+DROP TRIGGER IF EXISTS lease_market_groups_insert ON "Lease";
+DROP TRIGGER IF EXISTS location_market_groups_update ON "Location";
+DROP TRIGGER IF EXISTS property_market_groups_delete ON "Property";
+DROP TRIGGER IF EXISTS property_market_groups_update ON "Property";
+DROP TRIGGER IF EXISTS property_market_groups_insert ON "Property";
+DROP FUNCTION IF EXISTS queue_lease_market_groups();
+DROP FUNCTION IF EXISTS queue_location_market_groups();
+DROP FUNCTION IF EXISTS queue_property_market_groups();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0025_search_generation_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarketGroupChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('city', models.CharField(max_length=100)),
+                ('state', models.CharField(max_length=100)),
+                ('propertyType', models.CharField(choices=[('Rooms', 'Rooms'), ('Tinyhouse', 'Tinyhouse'), ('Apartment', 'Apartment'), ('Villa', 'Villa'), ('Townhouse', 'Townhouse'), ('Cottage', 'Cottage')], db_column='propertyType', max_length=20)),
+            ],
+            options={
+                'db_table': 'MarketGroupChange',
+                'managed': True,
+            },
+        ),
+        migrations.RunSQL(MARKET_GROUP_CHANGE_SQL, MARKET_GROUP_CHANGE_REVERSE_SQL),
+    ]
@@ -1,9 +1,14 @@
 from django.contrib.gis.db import models 
-from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.fields import ArrayField, DateTimeRangeField
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import User
+from django.db.models.functions import Greatest
 from django.core.validators import MinValueValidator
 
 # Enums as TextChoices
+# Highlight and Amenity are also stored as bitmasks (Property.highlightMask /
+# amenityMask) where bit i is the i-th member below: only ever append new members.
 class Highlight(models.TextChoices):
     HighSpeedInternetAccess = 'HighSpeedInternetAccess', 'High Speed Internet Access'
     WasherDryer = 'WasherDryer', 'Washer/Dryer'
@@ -44,6 +49,20 @@ class PropertyType(models.TextChoices):
     Townhouse = 'Townhouse', 'Townhouse'
     Cottage = 'Cottage', 'Cottage'
 
+def choicesMask(choices, values) -> int:
+    """
+    Bitmask of `values` using the member order of `choices` (Amenity or Highlight).
+    Raises:
+        ValueError: If a value is not a member of `choices`.
+    """
+    order = [choice.value for choice in choices]
+    mask = 0
+    for value in values:
+        if value not in order:
+            raise ValueError(f"Invalid {choices.__name__.lower()}: {value}")
+        mask |= 1 << order.index(value)
+    return mask
+
 class ApplicationStatus(models.TextChoices):
     Pending = 'Pending', 'Pending'
     Denied = 'Denied', 'Denied'
@@ -55,6 +74,17 @@ class PaymentStatus(models.TextChoices):
     PartiallyPaid = 'PartiallyPaid', 'Partially Paid'
     Overdue = 'Overdue', 'Overdue'
 
+class GeocodeStatus(models.TextChoices):
+    Pending = 'Pending', 'Pending'
+    Done = 'Done', 'Done'
+    # postal code centroid from the Gazetteer while the geocoder is unavailable
+    Approximate = 'Approximate', 'Approximate'
+    Failed = 'Failed', 'Failed'
+
+# Statuses whose coordinates are a real place; Pending and Failed rows sit at
+# the POINT(0 0) placeholder and are kept out of every spatial result
+PLACED_GEOCODE_STATUSES = [GeocodeStatus.Done, GeocodeStatus.Approximate]
+
 # Models
 
 class Location(models.Model):
@@ -64,6 +94,17 @@ class Location(models.Model):
     country = models.CharField(max_length=100)
     postalCode = models.CharField(max_length=20, db_column='postalCode')
     coordinates = models.PointField()
+    # +1 on every UPDATE by a database trigger (see migration 0009), for ETags
+    version = models.BigIntegerField(default=1, editable=False)
+    # ST_GeoHash(coordinates, 12), written by a database trigger on every insert
+    # and coordinates update (see migration 0014 and apps/geohash.py). Rows
+    # older than the column are filled by migration 0023 (or, again, by
+    # `manage.py backfill_geohash`).
+    geohash = models.CharField(max_length=12, null=True, editable=False)
+    # Pending while a GeocodeJob is queued; coordinates stay POINT(0 0) until
+    # the geocode worker fills them in, and also when it gives up (Failed).
+    # Spatial queries filter on PLACED_GEOCODE_STATUSES
+    geocodeStatus = models.CharField(max_length=12, choices=GeocodeStatus.choices, default=GeocodeStatus.Done, db_column='geocodeStatus')
 
     def __str__(self):
         return f"{self.address}, {self.city}, {self.state}"
@@ -71,6 +112,17 @@ class Location(models.Model):
     class Meta:
         db_table = 'Location'
         managed = True
+        indexes = [
+            # market stats of one city (see MarketStats)
+            models.Index(fields=['city', 'state'], name='location_city_state_idx'),
+            # prefix (LIKE 'abc%') and equality lookups on geohash cells
+            models.Index(fields=['geohash'], opclasses=['text_pattern_ops'], name='location_geohash_idx'),
+            # ILIKE / similarity matching of locations/suggest (pg_trgm, migration 0015)
+            GinIndex(fields=['city'], opclasses=['gin_trgm_ops'], name='location_city_trgm'),
+            GinIndex(fields=['state'], opclasses=['gin_trgm_ops'], name='location_state_trgm'),
+            GinIndex(fields=['address'], opclasses=['gin_trgm_ops'], name='location_address_trgm'),
+            GinIndex(fields=['postalCode'], opclasses=['gin_trgm_ops'], name='location_postal_code_trgm'),
+        ]
 
 class Manager(models.Model):
     id = models.AutoField(primary_key=True)
@@ -108,8 +160,24 @@ class Property(models.Model):
     securityDeposit = models.FloatField(validators=[MinValueValidator(0.0)], db_column='securityDeposit')
     applicationFee = models.FloatField(validators=[MinValueValidator(0.0)], db_column='applicationFee')
     photoUrls = ArrayField(models.URLField(), default=list, db_column='photoUrls')
+    # One entry per photoUrls entry: {size: {width, height, webp, jpeg}} for the
+    # sizes in apps/photos.py, null until `manage.py photo_worker` rendered it
+    photoDerivatives = models.JSONField(default=list, db_column='photoDerivatives')
     amenities = ArrayField(models.CharField(max_length=50, choices=Amenity.choices), default=list, db_column='amenities')
     highlights = ArrayField(models.CharField(max_length=50, choices=Highlight.choices), default=list, db_column='highlights')
+    # Maintained by Postgres from the arrays on every write (see migration 0006)
+    amenityMask = models.GeneratedField(
+        expression=models.Func(models.F('amenities'), function='property_amenity_mask', output_field=models.BigIntegerField()),
+        output_field=models.BigIntegerField(),
+        db_persist=True,
+        db_column='amenityMask',
+    )
+    highlightMask = models.GeneratedField(
+        expression=models.Func(models.F('highlights'), function='property_highlight_mask', output_field=models.BigIntegerField()),
+        output_field=models.BigIntegerField(),
+        db_persist=True,
+        db_column='highlightMask',
+    )
     isPetsAllowed = models.BooleanField(default=False, db_column='isPetsAllowed')
     isParkingIncluded = models.BooleanField(default=False, db_column='isParkingIncluded')
     beds = models.PositiveIntegerField()
@@ -117,8 +185,13 @@ class Property(models.Model):
     squareFeet = models.PositiveIntegerField(db_column='squareFeet')
     propertyType = models.CharField(max_length=20, choices=PropertyType.choices, db_column='propertyType')
     postedDate = models.DateTimeField(auto_now_add=True, db_column='postedDate')
+    # name + Location address/city/state + description, written by database
+    # triggers on Property and Location (see migration 0007)
+    searchVector = SearchVectorField(null=True, editable=False, db_column='searchVector')
     averageRating = models.FloatField(default=0.0, null=True, db_column='averageRating')
     numberOfReviews = models.PositiveIntegerField(default=0, null=True, db_column='numberOfReviews')
+    # +1 on every UPDATE by a database trigger (see migration 0009), for ETags
+    version = models.BigIntegerField(default=1, editable=False)
     locationId = models.ForeignKey(Location, on_delete=models.CASCADE, db_column='locationId')
     managerCognitoId = models.ForeignKey(Manager, on_delete=models.CASCADE, to_field='cognitoId', db_column='managerCognitoId')
     favoritedBy = models.ManyToManyField(Tenant, related_name='favorites', blank=True)
@@ -130,6 +203,37 @@ class Property(models.Model):
     class Meta:
         db_table = 'Property'
         managed = True
+        indexes = [
+            # keyset pagination of the search endpoint (newest first)
+            models.Index(fields=['postedDate', 'id'], name='property_posted_id_idx'),
+            # sort=pricePerMonth / averageRating / squareFeet, either direction
+            models.Index(fields=['pricePerMonth', 'id'], name='property_price_id_idx'),
+            models.Index(fields=['averageRating', 'id'], name='property_rating_id_idx'),
+            models.Index(fields=['squareFeet', 'id'], name='property_sqft_id_idx'),
+            # Search filters (see migration 0011). Every numeric filter is a key
+            # column, so ranges are checked in the index before the heap; the
+            # INCLUDE columns let counts run as index-only scans
+            models.Index(
+                fields=['pricePerMonth', 'beds', 'baths', 'squareFeet'],
+                include=['propertyType', 'amenityMask', 'highlightMask'],
+                name='property_filters_cover_idx',
+            ),
+            # propertyType=... with the default newest-first order
+            models.Index(fields=['propertyType', 'postedDate', 'id'], name='property_type_posted_idx'),
+            # the most common types, filtered by price and beds
+            models.Index(
+                fields=['pricePerMonth', 'beds'], condition=models.Q(propertyType='Apartment'),
+                name='property_apartment_price_idx',
+            ),
+            models.Index(
+                fields=['pricePerMonth', 'beds'], condition=models.Q(propertyType='Rooms'),
+                name='property_rooms_price_idx',
+            ),
+            # @> / && on the arrays, for queries that don't go through the masks
+            GinIndex(fields=['amenities'], name='property_amenities_gin'),
+            GinIndex(fields=['highlights'], name='property_highlights_gin'),
+            GinIndex(fields=['searchVector'], name='property_search_vector_gin'),
+        ]
 
 class Lease(models.Model):
     id = models.AutoField(primary_key=True)
@@ -139,6 +243,16 @@ class Lease(models.Model):
     deposit = models.FloatField(validators=[MinValueValidator(0.0)])
     propertyId = models.ForeignKey(Property, on_delete=models.CASCADE, db_column='propertyId')
     tenantCognitoId = models.ForeignKey(Tenant, on_delete=models.CASCADE, to_field='cognitoId', db_column='tenantCognitoId')
+    # [startDate, endDate) as a tstzrange for overlap queries; GREATEST keeps a
+    # lease with endDate before startDate from failing the insert
+    period = models.GeneratedField(
+        expression=models.Func(
+            models.F('startDate'), Greatest('startDate', 'endDate'), models.Value('[)'),
+            function='tstzrange', output_field=DateTimeRangeField(),
+        ),
+        output_field=DateTimeRangeField(),
+        db_persist=True,
+    )
 
     def __str__(self):
         return f"Lease {self.id} for {self.property}"
@@ -146,6 +260,10 @@ class Lease(models.Model):
     class Meta:
         db_table = 'Lease'
         managed = True
+        indexes = [
+            # availability anti-join: leases of one property overlapping a window
+            GistIndex(fields=['propertyId', 'period'], name='lease_property_period_gist'),
+        ]
 
 class Application(models.Model):
     id = models.AutoField(primary_key=True)
@@ -178,3 +296,222 @@ class Payment(models.Model):
         db_table = 'Payment'
         managed = True
 
+
+class MarketStatsRow(models.Model):
+    """Per (city, state, propertyType) market figures, see apps/views/property/market.py."""
+    key = models.CharField(max_length=255, primary_key=True)
+    city = models.CharField(max_length=100)
+    state = models.CharField(max_length=100)
+    propertyType = models.CharField(max_length=20, choices=PropertyType.choices, db_column='propertyType')
+    listings = models.IntegerField()
+    leased = models.IntegerField()
+    vacancy = models.FloatField(null=True)
+    medianRent = models.FloatField(null=True, db_column='medianRent')
+    medianPricePerSqft = models.FloatField(null=True, db_column='medianPricePerSqft')
+
+    class Meta:
+        abstract = True
+
+class MarketStats(MarketStatsRow):
+    # Materialized view, refreshed CONCURRENTLY by `manage.py refresh_market_stats`
+    refreshedAt = models.DateTimeField(db_column='refreshedAt')
+
+    class Meta:
+        db_table = 'MarketStats'
+        managed = False
+
+class MarketStatsDelta(MarketStatsRow):
+    # Groups recomputed after writes since the last refresh; they win over MarketStats
+    computedAt = models.DateTimeField(db_column='computedAt')
+
+    class Meta:
+        db_table = 'MarketStatsDelta'
+        managed = True
+        indexes = [
+            models.Index(fields=['city', 'state'], name='market_delta_city_state_idx'),
+        ]
+
+class MarketGroupChange(models.Model):
+    # Groups written to since they were last recomputed, appended by statement
+    # triggers on Property, Location and Lease (migration 0026) and consumed
+    # by `manage.py market_stats_worker`
+    id = models.BigAutoField(primary_key=True)
+    city = models.CharField(max_length=100)
+    state = models.CharField(max_length=100)
+    propertyType = models.CharField(max_length=20, choices=PropertyType.choices, db_column='propertyType')
+
+    class Meta:
+        db_table = 'MarketGroupChange'
+        managed = True
+
+class SavedSearch(models.Model):
+    id = models.AutoField(primary_key=True)
+    tenantCognitoId = models.ForeignKey(Tenant, on_delete=models.CASCADE, to_field='cognitoId', db_column='tenantCognitoId', related_name='savedSearches')
+    name = models.CharField(max_length=100)
+    # get_properties query string, e.g. "priceMax=2500&beds=2&propertyType=Apartment"
+    query = models.TextField()
+    createdAt = models.DateTimeField(auto_now_add=True, db_column='createdAt')
+
+    def __str__(self):
+        return f"SavedSearch {self.name} of {self.tenantCognitoId_id}"
+
+    class Meta:
+        db_table = 'SavedSearch'
+        managed = True
+
+class SavedSearchAnchor(models.Model):
+    # Keys under which a saved search is found by new listings: the grid cells,
+    # price bands or propertyType of its most selective predicate, or 'all'
+    id = models.BigAutoField(primary_key=True)
+    savedSearch = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, db_column='savedSearchId', related_name='anchors')
+    key = models.CharField(max_length=64)
+
+    class Meta:
+        db_table = 'SavedSearchAnchor'
+        managed = True
+        indexes = [
+            models.Index(fields=['key', 'savedSearch'], name='saved_search_anchor_key_idx'),
+        ]
+
+class SavedSearchMatch(models.Model):
+    # Per-tenant inbox: listings that matched one of the tenant's saved searches
+    id = models.BigAutoField(primary_key=True)
+    savedSearch = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, db_column='savedSearchId', related_name='matches')
+    tenantCognitoId = models.ForeignKey(Tenant, on_delete=models.CASCADE, to_field='cognitoId', db_column='tenantCognitoId')
+    propertyId = models.ForeignKey(Property, on_delete=models.CASCADE, db_column='propertyId')
+    matchedAt = models.DateTimeField(auto_now_add=True, db_column='matchedAt')
+    isRead = models.BooleanField(default=False, db_column='isRead')
+
+    class Meta:
+        db_table = 'SavedSearchMatch'
+        managed = True
+        constraints = [
+            models.UniqueConstraint(fields=['savedSearch', 'propertyId'], name='saved_search_match_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['tenantCognitoId', '-matchedAt'], name='saved_search_inbox_idx'),
+        ]
+
+class GeocodeJob(models.Model):
+    # Queue of `manage.py geocode_worker`, see apps/geocoding.py. runAt is the
+    # next attempt, pushed forward by the claim lease and by retry backoff.
+    id = models.BigAutoField(primary_key=True)
+    locationId = models.OneToOneField(Location, on_delete=models.CASCADE, db_column='locationId', related_name='geocodeJob')
+    attempts = models.IntegerField(default=0)
+    runAt = models.DateTimeField(db_column='runAt')
+    lastError = models.TextField(blank=True, default='', db_column='lastError')
+    createdAt = models.DateTimeField(auto_now_add=True, db_column='createdAt')
+
+    class Meta:
+        db_table = 'GeocodeJob'
+        managed = True
+        indexes = [
+            models.Index(fields=['runAt'], name='geocode_job_run_at_idx'),
+        ]
+
+class RateLimit(models.Model):
+    # One row per rate-limited client, shared by every worker process: each
+    # call reserves the next free slot (see apps/geocoding.py, reserveSlot)
+    name = models.CharField(max_length=64, primary_key=True)
+    nextAt = models.DateTimeField(db_column='nextAt')
+
+    class Meta:
+        db_table = 'RateLimit'
+        managed = True
+
+class GeocodeCache(models.Model):
+    # Remote geocoder answers by normalized (street, city, postalCode, country),
+    # see apps/geocoding.py. NULL coordinates: the geocoder found no match.
+    key = models.CharField(max_length=40, primary_key=True)
+    street = models.CharField(max_length=255)
+    city = models.CharField(max_length=100)
+    postalCode = models.CharField(max_length=20, db_column='postalCode')
+    country = models.CharField(max_length=100)
+    coordinates = models.PointField(null=True)
+    createdAt = models.DateTimeField(auto_now=True, db_column='createdAt')
+
+    class Meta:
+        db_table = 'GeocodeCache'
+        managed = True
+
+class Gazetteer(models.Model):
+    # Offline postal code centroids (`manage.py load_gazetteer`), the fallback
+    # when the remote geocoder is slow, down or finds nothing
+    id = models.BigAutoField(primary_key=True)
+    country = models.CharField(max_length=100)
+    postalCode = models.CharField(max_length=20, db_column='postalCode')
+    city = models.CharField(max_length=100, blank=True, default='')
+    coordinates = models.PointField()
+
+    class Meta:
+        db_table = 'Gazetteer'
+        managed = True
+        constraints = [
+            models.UniqueConstraint(fields=['country', 'postalCode'], name='gazetteer_country_postal_code_unique'),
+        ]
+
+class PhotoJob(models.Model):
+    # Queue of `manage.py photo_worker`: render the derivatives of a property's photos
+    id = models.BigAutoField(primary_key=True)
+    propertyId = models.OneToOneField(Property, on_delete=models.CASCADE, db_column='propertyId', related_name='photoJob')
+    attempts = models.IntegerField(default=0)
+    runAt = models.DateTimeField(db_column='runAt')
+    lastError = models.TextField(blank=True, default='', db_column='lastError')
+    createdAt = models.DateTimeField(auto_now_add=True, db_column='createdAt')
+
+    class Meta:
+        db_table = 'PhotoJob'
+        managed = True
+        indexes = [
+            models.Index(fields=['runAt'], name='photo_job_run_at_idx'),
+        ]
+
+class MediaBlob(models.Model):
+    # One file per distinct photo content (apps/photos.py); refCount counts the photoUrls entries naming it
+    hash = models.CharField(max_length=64, primary_key=True)
+    path = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    refCount = models.IntegerField(default=0, db_column='refCount')
+    lastUsedAt = models.DateTimeField(db_column='lastUsedAt')
+
+    class Meta:
+        db_table = 'MediaBlob'
+        managed = True
+        indexes = [
+            # garbage collection only looks at unreferenced blobs
+            models.Index(fields=['lastUsedAt'], condition=models.Q(refCount=0), name='media_blob_unused_idx'),
+        ]
+
+class PropertyImport(models.Model):
+    # Checkpoint of a bulk import (apps/importer.py), keyed by the SHA-256 of the
+    # manager and file: `position` source records are done, committed with their rows
+    id = models.CharField(max_length=64, primary_key=True)
+    managerCognitoId = models.CharField(max_length=255, db_column='managerCognitoId')
+    format = models.CharField(max_length=10)
+    position = models.IntegerField(default=0)
+    imported = models.IntegerField(default=0)
+    rejected = models.IntegerField(default=0)
+    createdAt = models.DateTimeField(auto_now_add=True, db_column='createdAt')
+    updatedAt = models.DateTimeField(auto_now=True, db_column='updatedAt')
+    finishedAt = models.DateTimeField(null=True, db_column='finishedAt')
+
+    class Meta:
+        db_table = 'PropertyImport'
+        managed = True
+
+class PercolateJob(models.Model):
+    # Queue of `manage.py percolate_worker`: listings written in bulk
+    # (apps/importer.py) still to be matched against the saved searches
+    id = models.BigAutoField(primary_key=True)
+    propertyIds = ArrayField(models.IntegerField(), db_column='propertyIds')
+    attempts = models.IntegerField(default=0)
+    runAt = models.DateTimeField(db_column='runAt')
+    lastError = models.TextField(blank=True, default='', db_column='lastError')
+    createdAt = models.DateTimeField(auto_now_add=True, db_column='createdAt')
+
+    class Meta:
+        db_table = 'PercolateJob'
+        managed = True
+        indexes = [
+            models.Index(fields=['runAt'], name='percolate_job_run_at_idx'),
+        ]
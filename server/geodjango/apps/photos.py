@@ -0,0 +1,273 @@
+import hashlib
+import logging
+import os
+import re
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from apps.models import MediaBlob, PhotoJob, Property
+from apps.imaging import DERIVATIVES, FORMATS, PHOTO_DIR, derivativePath, renderDerivatives, shardedPath
+
+# Property photos. The request streams each upload in PHOTO_CHUNK_SIZE pieces
+# to a temp file while hashing it, and the original is stored once per
+# distinct content under its SHA-256:
+#
+#   photos/original/ab/<sha256>.<ext>
+#
+# MediaBlob keeps one row per stored file with the number of photoUrls
+# entries naming it, so identical uploads share a file and an unreferenced one
+# can be collected (`manage.py dedupe_media --prune`). `manage.py photo_worker`
+# then decodes and resizes off the request path in a ProcessPoolExecutor,
+# writing WebP and JPEG files for every size in DERIVATIVES (apps/imaging.py):
+#
+#   photos/<size>/ab/<sha256>.webp|.jpg
+#
+# and records them in Property.photoDerivatives, one entry per photoUrls
+# entry (null until the worker got to it, or if the file is not an image).
+# A file name never gets new content, which is what lets apps/views/media
+# serve them as immutable.
+
+ORIGINAL = 'original'
+STAGING_DIR = '.staging'
+ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff'}
+CANONICAL_EXTENSIONS = {'.jpeg': '.jpg', '.tif': '.tiff'}
+CONTENT_HASH = re.compile(r'^[0-9a-f]{64}$')
+
+# Take a reference; the first one creates the row. Returns the stored path,
+# which keeps the extension of the first upload of this content.
+RETAIN_BLOB_SQL = """
+INSERT INTO "MediaBlob" (hash, path, size, "refCount", "lastUsedAt") VALUES (%s, %s, %s, 1, now())
+ON CONFLICT (hash) DO UPDATE SET "refCount" = "MediaBlob"."refCount" + 1, "lastUsedAt" = now()
+RETURNING path
+"""
+
+CLAIM_JOBS_SQL = """
+UPDATE "PhotoJob" SET "runAt" = now() + %s * interval '1 second', attempts = attempts + 1
+WHERE id IN (
+    SELECT id FROM "PhotoJob" WHERE "runAt" <= now()
+    ORDER BY "runAt" LIMIT %s
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING id, "propertyId", attempts
+"""
+
+
+def photoUrl(relativePath: str) -> str:
+    return settings.MEDIA_URL + relativePath.replace(os.sep, '/')
+
+
+def blobPath(hash: str, extension: str) -> str:
+    return shardedPath(ORIGINAL, hash, CANONICAL_EXTENSIONS.get(extension, extension))
+
+
+def contentHash(url: str):
+    """SHA-256 named in a content-addressed photo URL, None for any other URL."""
+    name, _ = os.path.splitext(url.rsplit('/', 1)[-1]) if url else ('', '')
+    return name if CONTENT_HASH.match(name) else None
+
+
+def _stagingDir() -> str:
+    # same filesystem as the blobs, so storing one is a rename; never served (dot directory)
+    directory = os.path.join(str(settings.MEDIA_ROOT), STAGING_DIR)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def hashFile(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(settings.PHOTO_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stageUpload(upload) -> dict:
+    """
+    Stream an uploaded photo to a temp file under MEDIA_ROOT, hashing it on
+    the way; the client's filename only contributes its extension. Done
+    before the transaction: storePhotos() then only renames.
+    Returns:
+        dict: {'hash', 'extension', 'size', 'temporary'}
+    Raises:
+        ValueError: If the file is too large or not an image type.
+    """
+    extension = os.path.splitext(upload.name or '')[1].lower()
+    if extension not in ALLOWED_EXTENSIONS:
+        raise ValueError(f"Unsupported photo type: {upload.name}")
+    if upload.size > settings.PHOTO_MAX_BYTES:
+        raise ValueError(f"Photo {upload.name} exceeds {settings.PHOTO_MAX_BYTES // (1024 * 1024)} MB")
+
+    temporary = os.path.join(_stagingDir(), f"{uuid.uuid4().hex}.tmp")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(temporary, 'wb') as out:
+            for chunk in upload.chunks(settings.PHOTO_CHUNK_SIZE):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except Exception:
+        os.remove(temporary)
+        raise
+    return {'hash': digest.hexdigest(), 'extension': extension, 'size': size, 'temporary': temporary}
+
+
+def retainBlob(hash: str, extension: str, size: int) -> str:
+    """Count one more reference to `hash`. Returns the path its file is stored under."""
+    with connection.cursor() as cursor:
+        cursor.execute(RETAIN_BLOB_SQL, [hash, blobPath(hash, extension).replace(os.sep, '/'), size])
+        return cursor.fetchone()[0]
+
+
+def storePhotos(staged: list) -> list:
+    """
+    Store staged uploads as blobs; call inside the transaction that saves the
+    property, so the references and the property commit together. Content
+    already stored just gains a reference and its temp file is dropped.
+    Returns:
+        list: Public URLs, in upload order.
+    """
+    urls = []
+    for photo in staged:
+        relativePath = retainBlob(photo['hash'], photo['extension'], photo['size'])
+        target = os.path.join(str(settings.MEDIA_ROOT), relativePath)
+        # the row lock taken above keeps dedupe_media --prune off this file until commit
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(photo['temporary'], target)
+        urls.append(photoUrl(relativePath))
+    return urls
+
+
+def discardStaged(staged: list):
+    for photo in staged:
+        if os.path.exists(photo['temporary']):
+            os.remove(photo['temporary'])
+
+
+def releasePhotos(urls):
+    """Drop one reference per content-addressed URL; call in the transaction that removes them."""
+    counts = Counter(hash for hash in map(contentHash, urls or []) if hash)
+    for hash, count in counts.items():
+        MediaBlob.objects.filter(hash=hash).update(
+            refCount=Greatest(F('refCount') - count, 0), lastUsedAt=timezone.now(),
+        )
+
+
+def deleteBlobFiles(relativePath: str):
+    """Remove a stored original and every derivative rendered from it."""
+    name = os.path.splitext(os.path.basename(relativePath))[0]
+    paths = [relativePath] + [derivativePath(size, name, key) for size in DERIVATIVES for key in FORMATS]
+    for path in paths:
+        try:
+            os.remove(os.path.join(str(settings.MEDIA_ROOT), path))
+        except FileNotFoundError:
+            pass
+
+
+def enqueuePhotos(property: Property):
+    """Queue derivative generation; call inside the transaction that saved the property."""
+    PhotoJob.objects.update_or_create(
+        propertyId=property,
+        defaults={'runAt': timezone.now(), 'attempts': 0, 'lastError': ''},
+    )
+
+
+def mediaPath(relativePath: str):
+    """Filesystem path of a path under MEDIA_ROOT, None if it would escape it."""
+    root = os.path.normpath(str(settings.MEDIA_ROOT))
+    path = os.path.normpath(os.path.join(root, relativePath))
+    if not path.startswith(root + os.sep):
+        return None
+    return path
+
+
+def originalPath(url: str):
+    """Filesystem path of a photo URL under MEDIA_URL, None for external URLs."""
+    if not url or not url.startswith(settings.MEDIA_URL):
+        return None
+    return mediaPath(url[len(settings.MEDIA_URL):])
+
+
+def claimJobs(batchSize: int) -> list:
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(CLAIM_JOBS_SQL, [settings.PHOTO_JOB_LEASE, batchSize])
+        return cursor.fetchall()
+
+
+def processJobs(pool: ProcessPoolExecutor, batchSize: int) -> dict:
+    """
+    Claim up to `batchSize` due jobs and render their photos on `pool`.
+    Returns:
+        dict: Count of properties per outcome ('done', 'retry', 'failed').
+    Raises:
+        BrokenProcessPool: If a process of `pool` died before this batch was
+            submitted; its jobs are released for the caller's next pool.
+    """
+    counts = {'done': 0, 'retry': 0, 'failed': 0}
+    jobs = claimJobs(batchSize)
+    if not jobs:
+        return counts
+
+    properties = {p.id: p for p in Property.objects.filter(id__in=[propertyId for _, propertyId, _ in jobs])}
+    # every photo of the batch is submitted at once so the pool stays busy
+    futures = {}
+    try:
+        for jobId, propertyId, attempts in jobs:
+            property = properties.get(propertyId)
+            if property is None:
+                continue
+            for index, url in enumerate(property.photoUrls):
+                path = originalPath(url)
+                if path is not None:
+                    futures[(propertyId, index)] = pool.submit(renderDerivatives, path, str(settings.MEDIA_ROOT), settings.MEDIA_URL)
+    except BrokenProcessPool as e:
+        # broken by an earlier batch, not by these jobs: due again at once, and the claim's attempt is given back
+        logging.error(f"Photo pool is broken, releasing {len(jobs)} jobs: {str(e)}")
+        for future in futures.values():
+            future.cancel()
+        PhotoJob.objects.filter(id__in=[jobId for jobId, _, _ in jobs]).update(
+            runAt=timezone.now(), attempts=F('attempts') - 1, lastError=str(e),
+        )
+        raise
+
+    for jobId, propertyId, attempts in jobs:
+        property = properties.get(propertyId)
+        if property is None:
+            counts['failed'] += 1
+            continue
+        try:
+            derivatives = [
+                futures[(propertyId, index)].result() if (propertyId, index) in futures else None
+                for index in range(len(property.photoUrls))
+            ]
+        except Exception as e:
+            # a crashed pool process: retry the whole property later
+            logging.error(f"Error rendering photos of property {propertyId}: {str(e)}")
+            if attempts >= settings.PHOTO_MAX_ATTEMPTS:
+                PhotoJob.objects.filter(id=jobId).delete()
+                counts['failed'] += 1
+            else:
+                PhotoJob.objects.filter(id=jobId).update(
+                    runAt=timezone.now() + timedelta(seconds=60 * 2 ** attempts), lastError=str(e),
+                )
+                counts['retry'] += 1
+            continue
+
+        with transaction.atomic():
+            # photoUrls may have changed meanwhile; only write if they did not
+            updated = Property.objects.filter(id=propertyId, photoUrls=property.photoUrls).update(photoDerivatives=derivatives)
+            PhotoJob.objects.filter(id=jobId).delete()
+        if updated:
+            counts['done'] += 1
+        else:
+            enqueuePhotos(property)
+            counts['retry'] += 1
+    return counts
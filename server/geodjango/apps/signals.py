@@ -0,0 +1,85 @@
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from apps.models import Lease, Location, Property
+from apps.photos import releasePhotos
+
+
+def _recordSearchIndexChanges(ids):
+    if not getattr(settings, 'SEARCH_INDEX_ENABLED', False):
+        return
+    from apps.views.property.columnar import searchIndex
+    # after commit, so workers replaying the log read the new row
+    transaction.on_commit(lambda: searchIndex().recordChanges(ids))
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def propertyChanged(sender, instance, **kwargs):
+    _recordSearchIndexChanges([instance.pk])
+
+
+@receiver(post_save, sender=Location)
+def locationChanged(sender, instance, created, **kwargs):
+    if created:
+        return
+    _recordSearchIndexChanges(list(Property.objects.filter(locationId=instance).values_list('id', flat=True)))
+
+
+# Saved searches: new and updated listings are queued, with the write, for
+# percolate_worker; the request never waits for the matching
+
+def _percolate(ids):
+    if not ids or not getattr(settings, 'SAVED_SEARCH_PERCOLATE', True):
+        return
+    from apps.views.savedsearch.services import enqueuePercolate
+    enqueuePercolate(ids)
+
+
+@receiver(post_save, sender=Property)
+def propertyPercolate(sender, instance, **kwargs):
+    _percolate([instance.pk])
+
+
+@receiver(post_save, sender=Location)
+def locationPercolate(sender, instance, created, **kwargs):
+    if created:
+        return
+    _percolate(list(Property.objects.filter(locationId=instance).values_list('id', flat=True)))
+
+
+# Bulk writes (apps/importer.py) skip the model signals; they report here instead.
+# Cached search responses and market stats need nothing: their triggers see every write.
+
+def propertiesCreated(ids: list):
+    """
+    Do what the post_save handlers would have done for each new property in
+    `ids`; call inside the transaction that wrote them.
+    """
+    if not ids:
+        return
+    _recordSearchIndexChanges(ids)
+    _percolate(ids)
+
+
+# Photo blobs: URLs a property stops naming give their reference back
+
+@receiver(pre_save, sender=Property)
+def propertyPhotosBefore(sender, instance, update_fields=None, **kwargs):
+    if not instance.pk or (update_fields is not None and 'photoUrls' not in update_fields):
+        instance._photoUrls = None
+        return
+    instance._photoUrls = Property.objects.filter(pk=instance.pk).values_list('photoUrls', flat=True).first()
+
+
+@receiver(post_save, sender=Property)
+def propertyPhotosChanged(sender, instance, **kwargs):
+    removed = Counter(getattr(instance, '_photoUrls', None) or []) - Counter(instance.photoUrls or [])
+    releasePhotos(list(removed.elements()))
+
+
+@receiver(post_delete, sender=Property)
+def propertyPhotosDeleted(sender, instance, **kwargs):
+    releasePhotos(instance.photoUrls)
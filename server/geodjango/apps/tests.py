@@ -1,3 +1,366 @@
-from django.test import TestCase
+import io
+import json
+from datetime import timedelta
+from unittest import mock
+from django.contrib.gis.geos import Point
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from apps import geocoding
+from apps.geocoding import GeocoderUnavailable, claimJobs, geocodeLru, retryDelay, runJob
+from apps.importer import PropertyImporter, detectFormat, readRecords, validateRecord
+from apps.management.commands._bench import planNodes, seedProperties
+from apps.management.commands.check_sort_plans import SORT_INDEXES
+from apps.models import Gazetteer, GeocodeJob, GeocodeStatus, Location, Manager, MarketGroupChange, MarketStatsDelta, PercolateJob, Property
+from apps.views.property.cache import searchCache
+from apps.views.property.market import processMarketChanges
+from apps.views.property.services import (
+    afterCursor, buildPropertyQuerySet, decodeCursor, paginateKeyset, parsePropertyFilters, sortOrdering,
+)
 
-# Create your tests here.
+MANAGER_COGNITO_ID = 'test-manager'
+
+
+def createManager() -> Manager:
+    return Manager.objects.create(
+        cognitoId=MANAGER_COGNITO_ID, name='Test Manager', email='manager@example.com', phoneNumber='0000000000',
+    )
+
+
+def createProperty(manager: Manager, **fields) -> Property:
+    location = Location.objects.create(
+        address=fields.pop('address', '1 Test St'), city='Pasadena', state='CA', country='United States',
+        postalCode='91101', coordinates=Point(-118.14, 34.15, srid=4326),
+    )
+    values = {
+        'name': 'Test property', 'description': 'A listing for tests.', 'pricePerMonth': 1000.0,
+        'securityDeposit': 1000.0, 'applicationFee': 50.0, 'beds': 2, 'baths': 1.0, 'squareFeet': 800,
+        'propertyType': 'Apartment',
+    }
+    values.update(fields)
+    return Property.objects.create(locationId=location, managerCognitoId=manager, **values)
+
+
+def filtersFor(query: str = '') -> dict:
+    return parsePropertyFilters(QueryDict(query))
+
+
+class SortPlanTests(TestCase):
+    """The EXPLAIN checks of `manage.py check_sort_plans`, on a small seeded table."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seedProperties(5000)
+
+    def plan(self, queryset) -> list:
+        # A test table is small enough for a sequential scan to win on cost;
+        # pricing it out leaves the question of whether the index can serve
+        # the ORDER BY without a Sort node
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return list(planNodes(json.loads(queryset.explain(format='json'))[0]['Plan']))
+
+    def assertServedBy(self, queryset, index: str, label: str):
+        nodes = self.plan(queryset)
+        self.assertIn(index, [node.get('Index Name') for node in nodes], f"{label}: {queryset.explain()}")
+        self.assertFalse([node for node in nodes if 'Sort' in node['Node Type']], f"{label}: {queryset.explain()}")
+
+    def test_every_sort_uses_its_index(self):
+        filters = filtersFor()
+        for sortKey, index in SORT_INDEXES.items():
+            for descending in (False, True):
+                _, cursor = paginateKeyset(buildPropertyQuerySet(filters), sortKey, descending, None, 20)
+                for pageCursor in (None, cursor):
+                    queryset = buildPropertyQuerySet(filters)
+                    if pageCursor:
+                        queryset = afterCursor(queryset, sortKey, descending, pageCursor)
+                    queryset = queryset.order_by(*sortOrdering(sortKey, descending))[:21]
+                    label = f"{sortKey} {'desc' if descending else 'asc'} {'next' if pageCursor else 'first'} page"
+                    self.assertServedBy(queryset, index, label)
+
+    def test_property_type_filter_uses_type_index(self):
+        filters = filtersFor('propertyType=Apartment')
+        _, cursor = paginateKeyset(buildPropertyQuerySet(filters), 'postedDate', True, None, 20)
+        for pageCursor in (None, cursor):
+            queryset = buildPropertyQuerySet(filters)
+            if pageCursor:
+                queryset = afterCursor(queryset, 'postedDate', True, pageCursor)
+            queryset = queryset.order_by(*sortOrdering('postedDate', True))[:21]
+            self.assertServedBy(queryset, 'property_type_posted_idx', 'propertyType=Apartment')
+
+
+class KeysetCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        manager = createManager()
+        # ties on every sort value, and NULL ratings, so id has to break them
+        for i in range(13):
+            createProperty(
+                manager, address=f"{i} Keyset St", name=f"Garden flat {'garden ' * (i % 3)}",
+                pricePerMonth=1000.0 + 500 * (i % 3), averageRating=None if i % 4 == 0 else float(i % 2),
+            )
+
+    def pages(self, filters: dict, sortKey: str, descending: bool, limit: int = 4) -> list:
+        ids, cursor = [], None
+        while True:
+            page, cursor = paginateKeyset(buildPropertyQuerySet(filters), sortKey, descending, cursor, limit)
+            ids.extend(property.id for property in page)
+            if cursor is None:
+                return ids
+
+    def test_pages_cover_every_row_once_in_order(self):
+        filters = filtersFor()
+        for sortKey in ('pricePerMonth', 'averageRating', 'postedDate', 'id'):
+            for descending in (False, True):
+                expected = list(
+                    buildPropertyQuerySet(filters).order_by(*sortOrdering(sortKey, descending)).values_list('id', flat=True)
+                )
+                self.assertEqual(self.pages(filters, sortKey, descending), expected, f"{sortKey} descending={descending}")
+
+    def test_relevance_pages_neither_repeat_nor_skip(self):
+        filters = filtersFor('q=garden')
+        ids = self.pages(filters, 'relevance', True, limit=2)
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), set(buildPropertyQuerySet(filters).values_list('id', flat=True)))
+
+    def test_malformed_cursor_is_rejected(self):
+        with self.assertRaises(ValueError):
+            decodeCursor('not-a-cursor')
+        with self.assertRaises(ValueError):
+            paginateKeyset(buildPropertyQuerySet(filtersFor()), 'pricePerMonth', False, 'WzFd', 4)
+
+
+@override_settings(SEARCH_INDEX_ENABLED=False)
+class SearchETagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = createManager()
+        createProperty(cls.manager)
+
+    def setUp(self):
+        # a test never commits: fire the deferred search_generation triggers per statement
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        searchCache().clear()
+
+    def test_unchanged_search_is_not_modified(self):
+        first = self.client.get('/properties/', {'priceMin': 500})
+        self.assertEqual(first.status_code, 200)
+        again = self.client.get('/properties/', {'priceMin': 500}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], first['ETag'])
+
+    def test_write_changes_the_etag(self):
+        first = self.client.get('/properties/', {'priceMin': 500})
+        createProperty(self.manager, address='2 Test St', pricePerMonth=700.0)
+        again = self.client.get('/properties/', {'priceMin': 500}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 200)
+        self.assertNotEqual(again['ETag'], first['ETag'])
+        self.assertEqual(len(again.json()['properties']), 2)
+
+    def test_other_filters_have_their_own_etag(self):
+        first = self.client.get('/properties/', {'priceMin': 500})
+        other = self.client.get('/properties/', {'priceMin': 600}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(other.status_code, 200)
+
+
+RECORD = {
+    'name': 'Imported flat', 'pricePerMonth': '1200', 'beds': '2', 'baths': '1', 'squareFeet': '700',
+    'propertyType': 'Apartment', 'address': '10 Import Rd', 'city': 'Pasadena', 'state': 'CA',
+    'country': 'United States', 'postalCode': '91101', 'longitude': '-118.14', 'latitude': '34.15',
+    'amenities': 'Dishwasher|AirConditioning',
+}
+
+
+def ndjson(records: list) -> io.BytesIO:
+    return io.BytesIO(''.join(json.dumps(record) + '\n' for record in records).encode())
+
+
+class ImporterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createManager()
+
+    def test_detect_format(self):
+        self.assertEqual(detectFormat('listings.CSV'), 'csv')
+        self.assertEqual(detectFormat('listings.jsonl'), 'ndjson')
+        self.assertEqual(detectFormat(None, 'application/x-ndjson; charset=utf-8'), 'ndjson')
+        self.assertEqual(detectFormat('listings.txt', requested='csv'), 'csv')
+        with self.assertRaises(ValueError):
+            detectFormat('listings.txt')
+        with self.assertRaises(ValueError):
+            detectFormat('listings.csv', requested='xml')
+
+    def test_read_records(self):
+        with self.assertRaises(ValueError):
+            list(readRecords(io.BytesIO(b'name,city\nA,B\n'), 'csv'))
+        records = list(readRecords(io.BytesIO(b'{"name": "A"}\n\nnot json\n[1]\n'), 'ndjson'))
+        self.assertEqual([number for number, _ in records], [1, 3, 4])
+        self.assertEqual(records[0][1], {'name': 'A'})
+        self.assertIsInstance(records[1][1], ValueError)
+        self.assertIsInstance(records[2][1], ValueError)
+
+    def test_validate_record(self):
+        row = validateRecord(RECORD, MANAGER_COGNITO_ID)
+        self.assertEqual(row['point'], (-118.14, 34.15))
+        self.assertEqual(row['amenities'], ['Dishwasher', 'AirConditioning'])
+        self.assertEqual(row['managerCognitoId'], MANAGER_COGNITO_ID)
+        for field, value in (('propertyType', 'Castle'), ('beds', '-1'), ('latitude', '91'), ('amenities', 'Moat')):
+            with self.assertRaises(ValueError, msg=field):
+                validateRecord({**RECORD, field: value}, MANAGER_COGNITO_ID)
+        with self.assertRaises(ValueError):
+            validateRecord(RECORD)
+        # uploads take the manager from the token: rows cannot name another one
+        with self.assertRaises(ValueError):
+            validateRecord({**RECORD, 'managerCognitoId': 'someone-else'}, MANAGER_COGNITO_ID, singleManager=True)
+
+    def test_import_and_resume(self):
+        records = [RECORD, {**RECORD, 'name': 'Same building'}, {**RECORD, 'beds': 'many'}, {**RECORD, 'address': '12 Import Rd'}]
+        summary = PropertyImporter(MANAGER_COGNITO_ID, batchSize=2).run(ndjson(records), 'ndjson')
+        self.assertEqual((summary['imported'], summary['rejected'], summary['finished']), (3, 1, True))
+        self.assertEqual(summary['errors'][0]['line'], 3)
+        self.assertEqual(Property.objects.count(), 3)
+        # one Location per listing, even in the same building
+        self.assertEqual(Location.objects.count(), 3)
+
+        again = PropertyImporter(MANAGER_COGNITO_ID, batchSize=2).run(ndjson(records), 'ndjson')
+        self.assertEqual((again['read'], again['imported']), (0, 3))
+        self.assertEqual(Property.objects.count(), 3)
+
+    def test_one_geocode_job_per_address(self):
+        geocodeLru().clear()
+        unplaced = {**RECORD, 'longitude': '', 'latitude': ''}
+        records = [unplaced, {**unplaced, 'name': 'Flat 2', 'address': '10 Import Road'}, {**unplaced, 'name': 'Flat 3'}]
+        summary = PropertyImporter(MANAGER_COGNITO_ID, batchSize=2).run(ndjson(records), 'ndjson')
+        self.assertEqual((summary['locations'], summary['geocode']['queued']), (3, 1))
+        locationIds = list(Property.objects.values_list('locationId', flat=True))
+        self.assertEqual(len(set(locationIds)), 3)
+        self.assertEqual(GeocodeJob.objects.count(), 1)
+
+        # the job's answer places every Location of the address
+        GeocodeJob.objects.update(runAt=timezone.now() - timedelta(minutes=1))
+        with mock.patch.object(geocoding, '_geocoder', StubGeocoder((-118.15, 34.16))):
+            self.assertEqual(runJob(*claimJobs(1)[0]), 'done')
+        placed = Location.objects.filter(id__in=locationIds, geocodeStatus=GeocodeStatus.Done)
+        self.assertEqual(sorted((location.coordinates.x, location.coordinates.y) for location in placed), [(-118.15, 34.16)] * 3)
+
+    @override_settings(SAVED_SEARCH_PERCOLATE=True, PERCOLATE_JOB_SIZE=2)
+    def test_new_listings_are_queued_for_percolation(self):
+        records = [{**RECORD, 'name': f"Flat {i}"} for i in range(5)]
+        PropertyImporter(MANAGER_COGNITO_ID, batchSize=3).run(ndjson(records), 'ndjson')
+        queued = sorted(id for ids in PercolateJob.objects.values_list('propertyIds', flat=True) for id in ids)
+        self.assertEqual(queued, sorted(Property.objects.values_list('id', flat=True)))
+        self.assertEqual(PercolateJob.objects.count(), 3)
+
+
+class PercolateQueueTests(TestCase):
+    @override_settings(SAVED_SEARCH_PERCOLATE=True)
+    def test_saved_listings_are_queued_not_matched(self):
+        with mock.patch('apps.views.savedsearch.services.percolate') as percolate:
+            listing = createProperty(createManager())
+            listing.locationId.save()
+        percolate.assert_not_called()
+        self.assertEqual(list(PercolateJob.objects.order_by('id').values_list('propertyIds', flat=True)), [[listing.id]] * 2)
+
+
+class StubGeocoder:
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = 0
+
+    def geocode(self, address, city, state, country, postalCode):
+        self.calls += 1
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+
+@override_settings(GEOCODER_RATE_PER_SECOND=1000, GEOCODE_MAX_ATTEMPTS=3, GEOCODE_RETRY_BASE_DELAY=30, GEOCODE_RETRY_MAX_DELAY=3600)
+class GeocodeRetryTests(TestCase):
+    def setUp(self):
+        geocodeLru().clear()
+        self.geocoder = StubGeocoder(None)
+        patcher = mock.patch.object(geocoding, '_geocoder', self.geocoder)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.location = Location.objects.create(
+            address=f"{self._testMethodName} Ave", city='Nowhere', state='NA', country='United States',
+            postalCode='00000', coordinates=Point(0, 0, srid=4326), geocodeStatus=GeocodeStatus.Pending,
+        )
+        # now() is fixed for the whole test transaction: the job must be due before it began
+        GeocodeJob.objects.create(locationId=self.location, runAt=timezone.now() - timedelta(minutes=1))
+
+    def claim(self) -> tuple:
+        claimed = claimJobs(1)
+        self.assertEqual(len(claimed), 1)
+        return claimed[0]
+
+    def test_retry_delay_grows_and_respects_retry_after(self):
+        for attempts in range(1, 10):
+            delay = retryDelay(attempts)
+            cap = min(3600, 30 * 2 ** (attempts - 1))
+            self.assertGreaterEqual(delay, cap / 2)
+            self.assertLessEqual(delay, cap)
+        self.assertEqual(retryDelay(1, retryAfter=600), 600)
+
+    def test_success_places_the_location(self):
+        self.geocoder.answer = (-118.14, 34.15)
+        self.assertEqual(runJob(*self.claim()), 'done')
+        self.location.refresh_from_db()
+        self.assertEqual(self.location.geocodeStatus, GeocodeStatus.Done)
+        self.assertEqual((self.location.coordinates.x, self.location.coordinates.y), (-118.14, 34.15))
+        self.assertFalse(GeocodeJob.objects.exists())
+
+    def test_unavailable_geocoder_is_retried_then_given_up(self):
+        self.geocoder.answer = GeocoderUnavailable('503', retryAfter=900)
+        jobId, locationId, attempts = self.claim()
+        self.assertEqual(runJob(jobId, locationId, attempts), 'retry')
+        job = GeocodeJob.objects.get(id=jobId)
+        self.assertEqual((job.attempts, job.lastError), (1, '503'))
+        self.assertGreaterEqual(job.runAt, timezone.now() + timedelta(seconds=899))
+
+        # the third claim is the last attempt
+        GeocodeJob.objects.filter(id=jobId).update(attempts=3)
+        self.assertEqual(runJob(jobId, locationId, 3), 'failed')
+        self.location.refresh_from_db()
+        # no Gazetteer centroid for the postal code
+        self.assertEqual(self.location.geocodeStatus, GeocodeStatus.Failed)
+        self.assertFalse(GeocodeJob.objects.exists())
+
+    def test_lost_lease_writes_nothing(self):
+        self.geocoder.answer = (-118.14, 34.15)
+        jobId, locationId, attempts = self.claim()
+        # another worker claimed the job after this lease ran out
+        GeocodeJob.objects.filter(id=jobId).update(attempts=attempts + 1)
+        self.assertEqual(runJob(jobId, locationId, attempts), 'expired')
+        self.location.refresh_from_db()
+        self.assertEqual(self.location.geocodeStatus, GeocodeStatus.Pending)
+        self.assertTrue(GeocodeJob.objects.filter(id=jobId).exists())
+
+    def test_lost_lease_keeps_the_centroid_off_a_placed_location(self):
+        Gazetteer.objects.create(country='us', postalCode='00000', coordinates=Point(-100, 40, srid=4326))
+        self.geocoder.answer = GeocoderUnavailable('503')
+        jobId, locationId, attempts = self.claim()
+        # another worker took the job over and placed the location meanwhile
+        GeocodeJob.objects.filter(id=jobId).update(attempts=attempts + 1)
+        Location.objects.filter(id=locationId).update(geocodeStatus=GeocodeStatus.Done, coordinates=Point(-118.14, 34.15, srid=4326))
+        self.assertEqual(runJob(jobId, locationId, attempts), 'expired')
+        self.location.refresh_from_db()
+        self.assertEqual((self.location.geocodeStatus, self.location.coordinates.x), (GeocodeStatus.Done, -118.14))
+
+
+class MarketChangeTests(TestCase):
+    def test_writes_queue_their_groups_for_the_worker(self):
+        listing = createProperty(createManager())
+        self.assertEqual(set(MarketGroupChange.objects.values_list('city', 'state', 'propertyType')), {('Pasadena', 'CA', 'Apartment')})
+        # figures unchanged: nothing more to recompute
+        MarketGroupChange.objects.all().delete()
+        Property.objects.filter(id=listing.id).update(photoDerivatives=[])
+        self.assertFalse(MarketGroupChange.objects.exists())
+
+        Property.objects.filter(id=listing.id).update(pricePerMonth=1500.0)
+        self.assertEqual(processMarketChanges(100), 1)
+        self.assertFalse(MarketGroupChange.objects.exists())
+        delta = MarketStatsDelta.objects.get(city='Pasadena', state='CA', propertyType='Apartment')
+        self.assertEqual((delta.listings, delta.medianRent), (1, 1500.0))
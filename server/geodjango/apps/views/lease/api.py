@@ -3,17 +3,30 @@ from rest_framework.response import Response
 from rest_framework import status
 from apps.models import Lease, Payment
 from .serializer import LeaseSerializer, PaymentSerializer
+from .fastserializers import leaseRows
+from core.streaming import parseStreamFormat, streamChunkSize, streamingJsonResponse
 import logging
 
 @api_view(["GET"])
 def getLeases(request):
     try:
-        leases = Lease.objects.select_related('tenantCognitoId', 'propertyId').all()
-        serializer = LeaseSerializer(leases, many=True)
+        leases = Lease.objects.all()
+
+        # ?stream=json|ndjson: serialize while reading through a server-side cursor
+        streamFormat = parseStreamFormat(request)
+        if streamFormat:
+            rows = leaseRows.iterate(leases.order_by('id'), streamChunkSize())
+            return streamingJsonResponse(rows, 'data', streamFormat, 'leases')
+
         return Response(
-            {"data": serializer.data},
+            {"data": leaseRows.serialize(leases)},
             status=status.HTTP_200_OK
         )
+    except ValueError as e:
+        return Response(
+            {"message": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     except Exception as e:
         logging.error(f"Error retrieving leases: {str(e)}")
         return Response(
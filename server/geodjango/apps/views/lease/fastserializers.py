@@ -0,0 +1,6 @@
+from core.rowserializer import RowSerializer
+from apps.views.property.fastserializers import LOCATION_COLUMNS
+from .serializer import LeaseSerializer
+
+# values()-based equivalent of LeaseSerializer, see apps/views/property/fastserializers.py
+leaseRows = RowSerializer(LeaseSerializer, LOCATION_COLUMNS)
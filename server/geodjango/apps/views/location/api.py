@@ -0,0 +1,17 @@
+from django.http import JsonResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from .services import suggestLocations
+import logging
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def suggest_locations(request):
+    try:
+        return JsonResponse(suggestLocations(request.GET.get('q', '')), status=200)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logging.error(f"Error suggesting locations: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
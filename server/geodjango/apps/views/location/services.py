@@ -0,0 +1,116 @@
+import logging
+import re
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from core.lru import LRUCache
+
+# Autocomplete for the search bar. One query matches the typed text against
+# city, state, postal code and address through the pg_trgm GIN indexes of
+# migration 0015: prefix (ILIKE 'q%') or fuzzy (similarity / word similarity)
+# matches, grouped into distinct suggestions with their property counts.
+# The query runs under a statement_timeout, and a per-worker LRU answers the
+# short, common prefixes that every user types first.
+
+MIN_QUERY_LENGTH = 2
+MAX_QUERY_LENGTH = 100
+MAX_SUGGESTIONS = 10
+
+# A prefix hit outranks any fuzzy one; similarity (0..1) orders within each.
+SUGGEST_SQL = """
+SELECT kind, label, city, state, "postalCode", count(p.id) AS listings,
+       -- locations waiting for the geocoder sit at POINT(0 0): leave them out of the mean
+       avg(ST_X(m.coordinates)) FILTER (WHERE m."geocodeStatus" IN ('Done', 'Approximate')) AS longitude,
+       avg(ST_Y(m.coordinates)) FILTER (WHERE m."geocodeStatus" IN ('Done', 'Approximate')) AS latitude
+FROM (
+    SELECT 'city' AS kind, l.city || ', ' || l.state AS label, l.city, l.state, NULL AS "postalCode",
+           l.id, l.coordinates, l."geocodeStatus", (l.city ILIKE %(prefix)s)::int + similarity(l.city, %(q)s) AS score
+    FROM "Location" l
+    WHERE l.city ILIKE %(prefix)s OR l.city %% %(q)s
+    UNION ALL
+    SELECT 'state', l.state, NULL, l.state, NULL,
+           l.id, l.coordinates, l."geocodeStatus", (l.state ILIKE %(prefix)s)::int + similarity(l.state, %(q)s)
+    FROM "Location" l
+    WHERE l.state ILIKE %(prefix)s OR l.state %% %(q)s
+    UNION ALL
+    SELECT 'postalCode', l."postalCode" || ' ' || l.city || ', ' || l.state, l.city, l.state, l."postalCode",
+           l.id, l.coordinates, l."geocodeStatus", 1 + similarity(l."postalCode", %(q)s)
+    FROM "Location" l
+    WHERE l."postalCode" ILIKE %(prefix)s
+    UNION ALL
+    -- addresses usually start with a number, so match words anywhere in them
+    SELECT 'address', l.address || ', ' || l.city || ', ' || l.state, l.city, l.state, l."postalCode",
+           l.id, l.coordinates, l."geocodeStatus", (l.address ILIKE %(prefix)s)::int + word_similarity(%(q)s, l.address)
+    FROM "Location" l
+    WHERE l.address ILIKE %(prefix)s OR %(q)s <%% l.address
+) m
+LEFT JOIN "Property" p ON p."locationId" = m.id
+GROUP BY kind, label, city, state, "postalCode"
+ORDER BY max(score) DESC, listings DESC, label
+LIMIT %(limit)s
+"""
+
+SUGGEST_COLUMNS = ['kind', 'label', 'city', 'state', 'postalCode', 'listings', 'longitude', 'latitude']
+
+_suggestCache = None
+
+
+def suggestCache() -> LRUCache:
+    global _suggestCache
+    if _suggestCache is None:
+        _suggestCache = LRUCache(
+            getattr(settings, 'LOCATION_SUGGEST_CACHE_SIZE', 2048),
+            getattr(settings, 'LOCATION_SUGGEST_CACHE_TTL', 300),
+        )
+    return _suggestCache
+
+
+def normalizeQuery(q: str) -> str:
+    """
+    Lowercased, whitespace-collapsed query, so 'Los  Angeles' and 'los angeles' share a cache entry.
+    Raises:
+        ValueError: If the query is too long.
+    """
+    q = re.sub(r'\s+', ' ', (q or '').strip()).lower()
+    if len(q) > MAX_QUERY_LENGTH:
+        raise ValueError(f"q must be at most {MAX_QUERY_LENGTH} characters")
+    return q
+
+
+def _likePrefix(q: str) -> str:
+    return re.sub(r'([\\%_])', r'\\\1', q) + '%'
+
+
+def _querySuggestions(q: str):
+    timeout = int(getattr(settings, 'LOCATION_SUGGEST_TIMEOUT_MS', 150))
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            # SET LOCAL: the budget ends with this transaction
+            cursor.execute(f"SET LOCAL statement_timeout = {timeout}")
+            cursor.execute(SUGGEST_SQL, {'q': q, 'prefix': _likePrefix(q), 'limit': MAX_SUGGESTIONS})
+            rows = cursor.fetchall()
+    except OperationalError as e:
+        # over budget: the caller gets no suggestions rather than a slow response
+        logging.warning(f"Location suggestions for {q!r} cancelled after {timeout} ms: {str(e)}")
+        return None
+    return [dict(zip(SUGGEST_COLUMNS, row)) for row in rows]
+
+
+def suggestLocations(q: str) -> dict:
+    """
+    Up to MAX_SUGGESTIONS distinct cities, states, postal codes and addresses
+    matching `q`, best first, each with its number of properties and the mean
+    coordinates of its locations.
+    Returns:
+        dict: {'suggestions': [...], 'timedOut': bool}
+    Raises:
+        ValueError: If the query is too long.
+    """
+    q = normalizeQuery(q)
+    if len(q) < MIN_QUERY_LENGTH:
+        return {'suggestions': [], 'timedOut': False}
+
+    # timed out lookups are not cached, the next keystroke tries again
+    suggestions = suggestCache().getOrSet(q, lambda: _querySuggestions(q))
+    if suggestions is None:
+        return {'suggestions': [], 'timedOut': True}
+    return {'suggestions': suggestions, 'timedOut': False}
@@ -0,0 +1,6 @@
+from django.urls import path
+from .api import suggest_locations
+
+urlpatterns = [
+    path('suggest', suggest_locations, name='location-suggest'),
+]
@@ -141,6 +141,7 @@ def getManagerProperties(request):
                 'securityDeposit': property.securityDeposit,
                 'applicationFee': property.applicationFee,
                 'photoUrls': property.photoUrls,
+                'photoDerivatives': property.photoDerivatives,
                 'amenities': property.amenities,
                 'highlights': property.highlights,
                 'isPetsAllowed': property.isPetsAllowed,
@@ -0,0 +1,29 @@
+import os
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.views.decorators.http import require_safe
+from core.conditional import etagMatches
+from .services import *
+
+
+# A plain Django view: no DRF negotiation or authentication for static bytes
+@require_safe
+def serve_media(request, path):
+    absolutePath = resolveMedia(path)
+    if absolutePath is None:
+        raise Http404(f"No media file {path}")
+    stat = os.stat(absolutePath)
+    etag = mediaETag(path, stat)
+    if etagMatches(request, etag):
+        return cacheHeaders(HttpResponseNotModified(), path, etag, stat)
+
+    if settings.MEDIA_SENDFILE in SENDFILE_MODES:
+        response = sendfileResponse(path, absolutePath)
+    else:
+        try:
+            response = fileResponse(absolutePath, parseRange(request, etag, stat.st_size), stat.st_size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{stat.st_size}"
+    response['Content-Type'] = contentType(absolutePath)
+    return cacheHeaders(response, path, etag, stat)
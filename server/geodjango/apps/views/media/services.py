@@ -0,0 +1,133 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, parse_etags
+from core.conditional import strongETag
+from apps.photos import contentHash, mediaPath
+
+# Serving MEDIA_URL. Photo files are named by the SHA-256 of their content
+# (apps/photos.py), so a URL never changes meaning: they are sent with a one
+# year `immutable` Cache-Control and a strong ETag derived from the path alone.
+# Anything else under MEDIA_ROOT gets a short max-age and a size + mtime ETag.
+#
+# MEDIA_SENDFILE hands the transfer to the front server instead of streaming
+# it from Python:
+#   'x-accel-redirect'  nginx; MEDIA_ACCEL_PREFIX must be an `internal`
+#                       location aliased to MEDIA_ROOT
+#   'x-sendfile'        Apache mod_xsendfile, lighttpd
+# The front server then answers Range requests itself and keeps the
+# Cache-Control set here.
+
+SENDFILE_MODES = {'x-accel-redirect', 'x-sendfile'}
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def resolveMedia(relativePath: str):
+    """
+    Filesystem path of a public media file, None if there is none. Dot
+    files and directories (upload staging, temp files) are never served.
+    """
+    if any(part.startswith('.') for part in relativePath.split('/')):
+        return None
+    path = mediaPath(relativePath)
+    if path is None or not os.path.isfile(path):
+        return None
+    return path
+
+
+def isImmutable(relativePath: str) -> bool:
+    return contentHash(relativePath) is not None
+
+
+def mediaETag(relativePath: str, stat) -> str:
+    if isImmutable(relativePath):
+        return strongETag('media', relativePath)
+    return strongETag('media', relativePath, stat.st_size, stat.st_mtime_ns)
+
+
+def cacheHeaders(response, relativePath: str, etag: str, stat):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = (
+        IMMUTABLE_CACHE_CONTROL if isImmutable(relativePath) else f"public, max-age={settings.MEDIA_MAX_AGE}"
+    )
+    return response
+
+
+def parseRange(request, etag: str, size: int):
+    """
+    The single byte range asked for, as inclusive (start, end).
+    Returns:
+        tuple: (start, end), or None to send the whole file: no Range header,
+        an If-Range naming another version, or a form not handled here
+        (multiple ranges), which RFC 9110 allows ignoring.
+    Raises:
+        RangeNotSatisfiable: If the range lies outside the file.
+    """
+    header = request.headers.get('Range')
+    if not header:
+        return None
+    ifRange = request.headers.get('If-Range')
+    # If-Range needs a strong comparison; a date never matches since our validators are ETags
+    if ifRange and etag not in parse_etags(ifRange):
+        return None
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def _readRange(path: str, start: int, length: int):
+    with open(path, 'rb') as source:
+        source.seek(start)
+        while length > 0:
+            chunk = source.read(min(READ_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def fileResponse(path: str, byteRange, size: int):
+    if byteRange is None:
+        # FileResponse goes through wsgi.file_wrapper, i.e. sendfile() where the server has it
+        return FileResponse(open(path, 'rb'))
+    start, end = byteRange
+    response = StreamingHttpResponse(_readRange(path, start, end - start + 1), status=206)
+    response['Content-Range'] = f"bytes {start}-{end}/{size}"
+    response['Content-Length'] = str(end - start + 1)
+    return response
+
+
+def sendfileResponse(relativePath: str, path: str):
+    response = HttpResponse()
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_PREFIX + relativePath)
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+def contentType(path: str) -> str:
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
@@ -0,0 +1,6 @@
+from django.urls import path
+from .api import serve_media
+
+urlpatterns = [
+    path('<path:path>', serve_media, name='media'),
+]
@@ -2,8 +2,17 @@ from rest_framework.views import APIView
 from rest_framework.decorators import api_view
 from rest_framework.permissions import AllowAny
 from core.authMiddleware import jwt_auth
-from apps.models import Property, Lease, Location
+from core.conditional import etagMatches, notModified, strongETag, withETag
+from core.streaming import parseStreamFormat, streamChunkSize, streamingJsonResponse
+from apps.models import GeocodeStatus, Property, Lease, Location
+from apps.geocoding import PLACEHOLDER_POINT, cachedGeocode, enqueueGeocode
+from apps.photos import discardStaged, enqueuePhotos, stageUpload, storePhotos
+from apps.importer import PropertyImporter, detectFormat
 from .serializers import *
+from .services import *
+from .cache import cacheKey, cachedResponse, canonicalFilters
+from .market import getMarketStats, parseMarketFilters
+from .similar import getSimilarProperties, parseSimilarParams
 from dateutil import parser
 from django.db.models import Exists, OuterRef
 from django.contrib.gis.geos import Point
@@ -12,13 +21,12 @@ from rest_framework.response import Response
 import logging
 from rest_framework import status
 from rest_framework import generics
-import requests
-from django.core.files.storage import FileSystemStorage
+from django.db import transaction
 from rest_framework.permissions import IsAuthenticated
 import json
 
 
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.contrib.gis.geos import Point
 from django.contrib.gis.measure import Distance
 from django.db.models import Q
@@ -32,104 +40,108 @@ from rest_framework.decorators import api_view, permission_classes
 def get_properties(request):
     try:
         # Lấy tham số truy vấn
-        favorite_ids = request.GET.get('favoriteIds', '')
-        price_min = request.GET.get('priceMin', 0)
-        price_max = request.GET.get('priceMax', 0)
-        beds = request.GET.get('beds', 0)
-        baths = request.GET.get('baths', 0)
-        property_type = request.GET.get('propertyType', 'any')
-        square_feet_min = request.GET.get('squareFeetMin', 0)
-        square_feet_max = request.GET.get('squareFeetMax', 0)
-        amenities = request.GET.get('amenities', 'any')
-        available_from = request.GET.get('availableFrom', 'any')
-        latitude = request.GET.get('latitude', 0)
-        longitude = request.GET.get('longitude', 0)
-
-        # Bắt đầu với tất cả bất động sản
-        queryset = Property.objects.select_related('locationId')  # Changed from 'location' to 'locationId'
-
-        # Lọc dữ liệu
-        if favorite_ids:
-            favorite_ids_array = [int(id) for id in favorite_ids.split(',') if id.isdigit()]
-            queryset = queryset.filter(id__in=favorite_ids_array)
-
-        if price_min:
-            queryset = queryset.filter(price_per_month__gte=float(price_min))
-
-        if price_max:
-            queryset = queryset.filter(price_per_month__lte=float(price_max))
-
-        if beds and beds != 'any':
-            queryset = queryset.filter(beds__gte=int(beds))
-
-        if baths and baths != 'any':
-            queryset = queryset.filter(baths__gte=int(baths))
-
-        if square_feet_min:
-            queryset = queryset.filter(square_feet__gte=int(square_feet_min))
-
-        if square_feet_max:
-            queryset = queryset.filter(square_feet__lte=int(square_feet_max))
-
-        if property_type and property_type != 'any':
-            queryset = queryset.filter(property_type=property_type)
-
-        if amenities and amenities != 'any':
-            amenities_array = amenities.split(',')
-            queryset = queryset.filter(amenities__contains=amenities_array)
-
-        if available_from and available_from != 'any':
-            try:
-                date = datetime.strptime(available_from, '%Y-%m-%d').date()
-                queryset = queryset.filter(lease__start_date__lte=date).distinct()
-            except ValueError:
-                pass
-
-        if latitude and longitude:
-            try:
-                lat = float(latitude)
-                lng = float(longitude)
-                # Convert kilometers to degrees (approximately 1 degree = 111 kilometers at the equator)
-                radius_in_degrees = 1000 / 111.0  # Convert 1000km to degrees
-                reference_point = Point(float(longitude), float(latitude), srid=4326)
-                queryset = queryset.filter(
-                    locationId__coordinates__dwithin=(reference_point, radius_in_degrees)  # Use degrees instead of Distance(km=)
-                )
-            except ValueError:
-                pass
-
-        # Chuẩn bị dữ liệu trả về
-        properties = Property.objects.all()
-        serializer = PropertySerializer(properties, many=True).data
-        # properties = PropertySerializer(data)
-        # for property in queryset:
-        #     location = property.locationId  # Changed from location to locationId
-        #     properties.append({
-        #         'id': property.id,
-        #         'pricePerMonth': float(property.price_per_month),
-        #         'beds': property.beds,
-        #         'baths': property.baths,
-        #         'squareFeet': property.square_feet,
-        #         'propertyType': property.property_type,
-        #         'amenities': property.amenities,
-        #         'location': {
-        #             'id': location.id,
-        #             'address': location.address,
-        #             'city': location.city,
-        #             'state': location.state,
-        #             'country': location.country,
-        #             'postalCode': location.postal_code,
-        #             'coordinates': {
-        #                 'longitude': location.coordinates.x,
-        #                 'latitude': location.coordinates.y,
-        #             }
-        #         }
-        #     })
-
-        # Return the formatted properties list instead of the queryset
-        return JsonResponse({'properties': serializer}, status=200)
+        filters = canonicalFilters(parsePropertyFilters(request.GET))
+        sortKey, descending = parseSort(request.GET, filters)
+
+        # ?stream=json|ndjson: toàn bộ kết quả, không phân trang
+        streamFormat = parseStreamFormat(request)
+        if streamFormat:
+            rows = iterateProperties(filters, sortKey, descending, streamChunkSize())
+            return streamingJsonResponse(rows, 'properties', streamFormat, 'properties')
+
+        limit = parseLimit(request.GET)
+        cursor = request.GET.get('cursor')
+        withFacets = request.GET.get('facets', 'false').lower() == 'true'
+
+        # The key already names the generation, so it doubles as the ETag
+        parts = ['properties', filters, sortKey, descending, cursor, limit, withFacets]
+        key = cacheKey(*parts)
+        etag = strongETag(key)
+        if etagMatches(request, etag):
+            return notModified(etag)
+
+        def search():
+            # Lọc, sắp xếp và phân trang (columnar index hoặc một truy vấn SQL)
+            properties, nextCursor = searchProperties(filters, sortKey, descending, cursor, limit)
+            response = {'properties': properties, 'nextCursor': nextCursor}
+            if withFacets:
+                response['facets'] = getPropertyFacets(filters)
+            return response
+
+        response = cachedResponse(parts, search, key)
+        return withETag(JsonResponse(response, status=200), etag)
+
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logging.error(f"Error retrieving properties: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def get_property_map(request):
+    try:
+        filters = parsePropertyFilters(request.GET)
+        bbox = parseBoundingBox(request.GET)
+        zoom = parseZoom(request.GET)
+
+        return JsonResponse(getPropertyMap(filters, bbox, zoom), status=200)
+
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logging.error(f"Error retrieving property map: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def get_property_tile(request, z, x, y):
+    try:
+        filters = parsePropertyFilters(request.GET)
+        tile = getPropertyTile(filters, z, x, y)
+
+        return HttpResponse(tile, content_type='application/vnd.mapbox-vector-tile', status=200)
+
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logging.error(f"Error generating property tile {z}/{x}/{y}: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def get_market_stats(request):
+    try:
+        filters = parseMarketFilters(request.GET)
+        return JsonResponse(getMarketStats(filters), status=200)
 
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     except Exception as e:
+        logging.error(f"Error retrieving market stats: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def get_similar_properties(request, id):
+    try:
+        params = parseSimilarParams(request.GET)
+
+        parts = ['similar', id, params]
+        key = cacheKey(*parts)
+        etag = strongETag(key)
+        if etagMatches(request, etag):
+            return notModified(etag)
+
+        response = cachedResponse(parts, lambda: getSimilarProperties(id, **params), key)
+        return withETag(JsonResponse(response, status=200), etag)
+
+    except Property.DoesNotExist:
+        return JsonResponse({'error': 'Property not found'}, status=404)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logging.error(f"Error retrieving similar properties: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
 
 class PropertyViewDetails(generics.RetrieveAPIView):
@@ -139,10 +151,19 @@ class PropertyViewDetails(generics.RetrieveAPIView):
 
     def retrieve(self, request, *args, **kwargs):
         try:
+            # Versions only: a 304 skips the full row and the serializer
+            versions = Property.objects.filter(id=self.kwargs['id']).values_list('version', 'locationId__version').first()
+            if versions is None:
+                raise Property.DoesNotExist
+            etag = strongETag('property', self.kwargs['id'], *versions)
+            if etagMatches(request, etag):
+                return notModified(etag)
+
             instance = Property.objects.select_related('locationId').get(id=self.kwargs['id'])
             serializer = self.get_serializer(instance)
 
-            return Response({"data": serializer.data}, status=status.HTTP_200_OK)
+            etag = strongETag('property', instance.id, instance.version, instance.locationId.version)
+            return withETag(Response({"data": serializer.data}, status=status.HTTP_200_OK), etag)
         except Property.DoesNotExist:
             return Response(
                 {"errors": "Property not found"},
@@ -159,6 +180,7 @@ class PropertyViewDetails(generics.RetrieveAPIView):
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def perform_create(request):
+        staged = []
         try:
             # Lấy dữ liệu từ request
             data = request.data
@@ -169,57 +191,76 @@ def perform_create(request):
             country = data.get('country')
             postalCode = data.get('postalCode')
             managerCognitoId = data.get('managerCognitoId')
-            # Upload ảnh vào thư mục upload
-            fs = FileSystemStorage(location='upload/')
-            photo_urls = []
+            # Ghi ảnh gốc theo từng chunk và tính SHA-256; ảnh nhỏ (thumb/card/full) do photo_worker tạo sau
             for file in files:
-                filename = fs.save(file.name, file)
-                photo_urls.append(fs.url(filename))
-
-            # Gọi Nominatim API để lấy tọa độ
-            geocoding_url = (
-                f"https://nominatim.openstreetmap.org/search?"
-                f"street={address}&city={city}&country={country}&postalcode={postalCode}"
-                f"&format=json&limit=1"
-            )
-            headers = {"User-Agent": "RealEstateApp (justsomedummyemail@gmail.com)"}
-            response = requests.get(geocoding_url, headers=headers)
-            response.raise_for_status()
-            geocoding_data = response.json()
-
-            longitude = float(geocoding_data[0]['lon']) if geocoding_data else 0
-            latitude = float(geocoding_data[0]['lat']) if geocoding_data else 0
-
-            # Tạo Location
-            location = Location.objects.create(
-                address=address,
-                city=city,
-                state=state,
-                country=country,
-                postalCode=postalCode,
-                coordinates=Point(longitude, latitude, srid=4326)
-            )
-
-            # Lưu Property
-            property = Property.objects.create(
-                photoUrls=photo_urls,
-                locationId=location,
-                managerCognitoId=managerCognitoId,  # Giả sử user có manager
-                isPetsAllowed=str(data.get('isPetsAllowed', 'false')).lower() == 'true',
-                isParkingIncluded=str(data.get('isParkingIncluded', 'false')).lower() == 'true',
-                pricePerMonth=float(data.get('pricePerMonth', 0)),
-                securityDeposit=float(data.get('securityDeposit', 0)),
-                applicationFee=float(data.get('applicationFee', 0)),
-                beds=int(data.get('beds', 0)),
-                baths=float(data.get('baths', 0)),
-                squareFeet=int(data.get('squareFeet', 0))
-            )
+                staged.append(stageUpload(file))
+
+            # Địa chỉ đã geocode trước đó: lấy tọa độ từ cache, không cần job
+            _, point = cachedGeocode(address, city, postalCode, country)
+
+            with transaction.atomic():
+                # Ảnh trùng nội dung dùng chung một file (apps/photos.py)
+                photo_urls = storePhotos(staged)
+
+                # Tạo Location; nếu chưa có tọa độ thì geocode_worker điền sau (apps/geocoding.py)
+                location = Location.objects.create(
+                    address=address,
+                    city=city,
+                    state=state,
+                    country=country,
+                    postalCode=postalCode,
+                    coordinates=Point(*(point or PLACEHOLDER_POINT), srid=4326),
+                    geocodeStatus=GeocodeStatus.Done if point else GeocodeStatus.Pending,
+                )
+                if not point:
+                    enqueueGeocode(location)
+
+                # Lưu Property
+                property = Property.objects.create(
+                    photoUrls=photo_urls,
+                    locationId=location,
+                    managerCognitoId=managerCognitoId,  # Giả sử user có manager
+                    isPetsAllowed=str(data.get('isPetsAllowed', 'false')).lower() == 'true',
+                    isParkingIncluded=str(data.get('isParkingIncluded', 'false')).lower() == 'true',
+                    pricePerMonth=float(data.get('pricePerMonth', 0)),
+                    securityDeposit=float(data.get('securityDeposit', 0)),
+                    applicationFee=float(data.get('applicationFee', 0)),
+                    beds=int(data.get('beds', 0)),
+                    baths=float(data.get('baths', 0)),
+                    squareFeet=int(data.get('squareFeet', 0)),
+                    photoDerivatives=[None] * len(photo_urls),
+                )
+                if photo_urls:
+                    enqueuePhotos(property)
             serializer = PropertySerializer(property).data
             return Response({"data": serializer}, status=status.HTTP_201_CREATED)
         except Exception as e:
             logging.error(f"Error creating property: {str(e)}")
             raise serializers.ValidationError({"errors": str(e)})
+        finally:
+            discardStaged(staged)
       
+@api_view(["POST"])
+@permission_classes([AllowAny])
+@jwt_auth(allowed_roles=['manager'])
+def import_properties(request):
+    try:
+        # Nhập hàng loạt từ file CSV/NDJSON; gửi lại cùng file để tiếp tục từ checkpoint
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValueError('file is required')
+        format = detectFormat(upload.name, upload.content_type, request.data.get('format'))
+        restart = str(request.data.get('restart', 'false')).lower() == 'true'
+        # the manager is the one the Cognito token names, for every row of the file
+        importer = PropertyImporter(request.custom_user['id'], singleManager=True)
+        summary = importer.run(upload.file, format, restart=restart)
+        return JsonResponse(summary, status=200)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logging.error(f"Error importing properties: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+
 # class PropertyCreateView(generics.CreateAPIView):
 #     queryset = Property.objects.all()
 #     serializer_class = PropertySerializer
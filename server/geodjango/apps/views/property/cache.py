@@ -0,0 +1,134 @@
+import hashlib
+import json
+from collections import Counter
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+
+# Response cache for property searches. The backend is the 'search' alias of
+# CACHES (local memory or Redis, see settings). Every key embeds the data
+# generation, the search_generation sequence that database triggers advance
+# when a write to Property, Location or Lease commits (migration 0025), so one
+# write invalidates every entry in every process, and the keys double as the
+# ETags of the search views.
+#
+# Hit/miss counters go to the cache only when its incr is atomic (Redis,
+# Memcached), so concurrent workers never lose counts; otherwise each process
+# keeps its own in memory (see hasSharedCounters).
+
+SEARCH_CACHE = 'search'
+# Backends whose incr is a single atomic operation shared by every process
+SHARED_COUNTER_BACKENDS = ('RedisCache', 'PyMemcacheCache', 'PyLibMCCache')
+HITS_KEY = 'search:stats:hits'
+MISSES_KEY = 'search:stats:misses'
+DATA_GENERATION_SQL = "SELECT last_value FROM search_generation"
+
+
+def searchCache():
+    return caches[SEARCH_CACHE]
+
+
+# counters of this process, used when the backend cannot share them
+_localCounts = Counter()
+
+
+def hasSharedCounters(alias: str = SEARCH_CACHE) -> bool:
+    """False when counters stay in each process: other processes cannot read them."""
+    return settings.CACHES[alias]['BACKEND'].endswith(SHARED_COUNTER_BACKENDS)
+
+
+def incrementCounters(deltas: dict, alias: str = SEARCH_CACHE):
+    """Add `deltas` ({key: amount}) to the counters, in the cache when hasSharedCounters."""
+    if not hasSharedCounters(alias):
+        _localCounts.update(deltas)
+        return
+    cache = caches[alias]
+    for key, delta in deltas.items():
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            pass
+
+
+def readCounters(keys: list, alias: str = SEARCH_CACHE) -> dict:
+    if not hasSharedCounters(alias):
+        return {key: _localCounts[key] for key in keys}
+    values = caches[alias].get_many(keys)
+    return {key: values.get(key, 0) for key in keys}
+
+
+def resetCounters(keys: list, alias: str = SEARCH_CACHE):
+    if not hasSharedCounters(alias):
+        for key in keys:
+            _localCounts.pop(key, None)
+        return
+    caches[alias].delete_many(keys)
+
+
+def dataGeneration() -> int:
+    """
+    Last value of the search_generation sequence, advanced by triggers on
+    Property, Location and Lease (migration 0025); reading it takes no lock.
+    Keys and ETags built on it change for every process at once, whatever
+    cache backend is configured.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(DATA_GENERATION_SQL)
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def canonicalFilters(filters: dict) -> dict:
+    """
+    Round coordinates and radius so nearby map positions share a cache entry.
+    The rounded values are the ones searched, so cached and fresh results agree.
+    """
+    precision = getattr(settings, 'SEARCH_CACHE_COORDINATE_PRECISION', 3)
+    filters = dict(filters)
+    for name in ('latitude', 'longitude'):
+        if filters[name] is not None:
+            filters[name] = round(filters[name], precision)
+    filters['radius'] = round(filters['radius'], 1)
+    return filters
+
+
+def cacheKey(*parts) -> str:
+    """Key of `parts` in the current data generation; search views also use it as their ETag."""
+    raw = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+    return f"search:{dataGeneration()}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+def cachedResponse(parts: list, compute, key: str = None):
+    """
+    Return the cached value for `parts` in the current generation, or store
+    and return compute(). `key` is cacheKey(*parts) when the caller has it.
+    """
+    cache = searchCache()
+    key = key or cacheKey(*parts)
+    value = cache.get(key)
+    if value is not None:
+        incrementCounters({HITS_KEY: 1})
+        return value
+    incrementCounters({MISSES_KEY: 1})
+    value = compute()
+    cache.set(key, value, getattr(settings, 'SEARCH_CACHE_TIMEOUT', 60))
+    return value
+
+
+def cacheStats() -> dict:
+    counts = readCounters([HITS_KEY, MISSES_KEY])
+    hits, misses = counts[HITS_KEY], counts[MISSES_KEY]
+    total = hits + misses
+    return {
+        'backend': settings.CACHES[SEARCH_CACHE]['BACKEND'],
+        'shared': hasSharedCounters(),
+        'generation': dataGeneration(),
+        'hits': hits,
+        'misses': misses,
+        'hitRatio': hits / total if total else None,
+    }
+
+
+def resetStats():
+    resetCounters([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,365 @@
+import fcntl
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from dateutil import parser
+from django.conf import settings
+from django.db.models import Case, FloatField, Q, When
+from apps.models import PLACED_GEOCODE_STATUSES, Amenity, Highlight, Property, PropertyType, choicesMask
+from apps.functions import PointX, PointY
+
+# Columnar copy of the hot search columns, one .npy file per column, opened
+# with mmap so every gunicorn worker shares the same pages through the OS page
+# cache. Layout of SEARCH_INDEX_DIR:
+#
+#   CURRENT              name of the live generation
+#   g<ns>/<column>.npy   arrays of one build, sorted by id
+#   g<ns>/changes.log    ids of properties written since that build
+#   LOCK                 flock: shared by appends, exclusive while a build
+#                        carries the log over and switches CURRENT
+#
+# Writes only append ids to changes.log (see apps/signals.py). Each worker
+# replays new log lines on its next search: it marks those ids stale in the
+# mapped arrays and re-reads just those rows into a small private overlay.
+
+EARTH_RADIUS_M = 6371008.8
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+CURRENT = 'CURRENT'
+CHANGES = 'changes.log'
+LOCK = 'LOCK'
+BUILD_CHUNK_SIZE = 50000
+
+COLUMNS = {
+    'id': np.int64,
+    'pricePerMonth': np.float64,
+    'beds': np.int32,
+    'baths': np.float64,
+    'squareFeet': np.int32,
+    'propertyType': np.int8,
+    'amenityMask': np.int64,
+    'highlightMask': np.int64,
+    # NaN while the location is not geocoded: no radius or distance matches it
+    'longitude': np.float64,
+    'latitude': np.float64,
+    'postedDate': np.int64,  # microseconds since epoch
+}
+PROPERTY_TYPES = [t.value for t in PropertyType]
+# sort key of services.PROPERTY_SORT_FIELDS -> column; other keys fall back to SQL
+SORT_COLUMNS = {
+    'postedDate': 'postedDate', 'id': 'id', 'distance': None,
+    'pricePerMonth': 'pricePerMonth', 'squareFeet': 'squareFeet',
+}
+FLOAT_SORTS = {'distance', 'pricePerMonth'}
+
+
+def _toMicros(value: datetime) -> int:
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def _fetchColumns(queryset) -> dict:
+    isPlaced = Q(locationId__geocodeStatus__in=PLACED_GEOCODE_STATUSES)
+    rows = queryset.annotate(
+        longitude=Case(When(isPlaced, then=PointX('locationId__coordinates')), default=None, output_field=FloatField()),
+        latitude=Case(When(isPlaced, then=PointY('locationId__coordinates')), default=None, output_field=FloatField()),
+    ).order_by('id').values_list(*COLUMNS).iterator(chunk_size=BUILD_CHUNK_SIZE)
+
+    chunks = {name: [] for name in COLUMNS}
+    batch = []
+
+    def flush():
+        if not batch:
+            return
+        for i, (name, dtype) in enumerate(COLUMNS.items()):
+            if name == 'propertyType':
+                values = [PROPERTY_TYPES.index(row[i]) if row[i] in PROPERTY_TYPES else -1 for row in batch]
+            elif name == 'postedDate':
+                values = [_toMicros(row[i]) for row in batch]
+            else:
+                values = [row[i] for row in batch]
+            chunks[name].append(np.asarray(values, dtype=dtype))
+        batch.clear()
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BUILD_CHUNK_SIZE:
+            flush()
+    flush()
+    return {
+        name: np.concatenate(chunks[name]) if chunks[name] else np.empty(0, dtype=dtype)
+        for name, dtype in COLUMNS.items()
+    }
+
+
+class ColumnarIndex:
+    def __init__(self, directory):
+        self.directory = str(directory)
+        self.lock = threading.Lock()
+        self.generation = None
+        self.base = None
+        self.stale = None
+        self.overlay = None
+        self.logOffset = 0
+
+    # Build / change log
+
+    def currentGeneration(self):
+        try:
+            with open(os.path.join(self.directory, CURRENT)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def _logLock(self, exclusive: bool):
+        fd = os.open(os.path.join(self.directory, LOCK), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            os.close(fd)
+
+    def changesPath(self, generation=None):
+        generation = generation or self.currentGeneration()
+        return os.path.join(self.directory, generation, CHANGES) if generation else None
+
+    def build(self) -> int:
+        """
+        Write a new generation from Postgres and make it the live one.
+        Returns:
+            int: Number of indexed properties.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        previous = self.currentGeneration()
+        previousLog = self.changesPath(previous)
+        previousOffset = os.path.getsize(previousLog) if previousLog and os.path.exists(previousLog) else 0
+
+        generation = f"g{time.time_ns()}"
+        path = os.path.join(self.directory, generation)
+        os.makedirs(path)
+        columns = _fetchColumns(Property.objects.all())
+        for name, values in columns.items():
+            np.save(os.path.join(path, f"{name}.npy"), values)
+
+        # Writes that landed while we were reading are replayed on the new
+        # generation. No append may slip in between the copy and the switch,
+        # or it would only reach the old log after we stopped reading it
+        with self._logLock(exclusive=True):
+            with open(os.path.join(path, CHANGES), 'wb') as log:
+                if previousLog and os.path.exists(previousLog):
+                    with open(previousLog, 'rb') as old:
+                        old.seek(previousOffset)
+                        log.write(old.read())
+
+            pointer = os.path.join(self.directory, f"{CURRENT}.tmp")
+            with open(pointer, 'w') as f:
+                f.write(generation)
+            os.replace(pointer, os.path.join(self.directory, CURRENT))
+
+        # Keep the previous generation: workers may still be reading it
+        for name in os.listdir(self.directory):
+            if name.startswith('g') and name not in (generation, previous):
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+        return len(columns['id'])
+
+    def recordChanges(self, ids):
+        """Append changed property ids to the live generation's log."""
+        if not ids or self.currentGeneration() is None:
+            return
+        # CURRENT is read again under the lock: a build may have just switched it
+        with self._logLock(exclusive=False):
+            path = self.changesPath()
+            # one O_APPEND write per call keeps lines from concurrent workers intact
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, ''.join(f"{id}\n" for id in ids).encode())
+            finally:
+                os.close(fd)
+
+    # Loading
+
+    def _refresh(self) -> bool:
+        generation = self.currentGeneration()
+        if generation is None:
+            return False
+        if generation != self.generation:
+            path = os.path.join(self.directory, generation)
+            self.base = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in COLUMNS}
+            self.stale = None
+            self.overlay = None
+            self.logOffset = 0
+            self.generation = generation
+        self._applyChanges()
+        return True
+
+    def _applyChanges(self):
+        path = self.changesPath(self.generation)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size <= self.logOffset:
+            return
+        with open(path, 'rb') as f:
+            f.seek(self.logOffset)
+            data = f.read(size - self.logOffset)
+        # a concurrent append may have left a partial last line
+        end = data.rfind(b'\n') + 1
+        self.logOffset += end
+        ids = np.unique(np.asarray([int(x) for x in data[:end].split()], dtype=np.int64))
+        if not len(ids):
+            return
+
+        baseIds = self.base['id']
+        if self.stale is None:
+            self.stale = np.zeros(len(baseIds), dtype=bool)
+        positions = np.searchsorted(baseIds, ids)
+        found = positions < len(baseIds)
+        found[found] = baseIds[positions[found]] == ids[found]
+        self.stale[positions[found]] = True
+
+        # Deleted properties simply don't come back from the query
+        fresh = _fetchColumns(Property.objects.filter(id__in=ids.tolist()))
+        if self.overlay is not None:
+            keep = ~np.isin(self.overlay['id'], ids)
+            fresh = {name: np.concatenate([self.overlay[name][keep], fresh[name]]) for name in COLUMNS}
+        self.overlay = fresh
+
+    # Search
+
+    @staticmethod
+    def supports(filters: dict, sortKey: str) -> bool:
+        return sortKey in SORT_COLUMNS and not filters['availableFrom'] and not filters['q']
+
+    @staticmethod
+    def _match(columns: dict, filters: dict):
+        mask = np.ones(len(columns['id']), dtype=bool)
+        if filters['favoriteIds']:
+            mask &= np.isin(columns['id'], filters['favoriteIds'])
+        if filters['priceMin'] is not None:
+            mask &= columns['pricePerMonth'] >= filters['priceMin']
+        if filters['priceMax'] is not None:
+            mask &= columns['pricePerMonth'] <= filters['priceMax']
+        if filters['beds'] is not None:
+            mask &= columns['beds'] >= filters['beds']
+        if filters['baths'] is not None:
+            mask &= columns['baths'] >= filters['baths']
+        if filters['squareFeetMin'] is not None:
+            mask &= columns['squareFeet'] >= filters['squareFeetMin']
+        if filters['squareFeetMax'] is not None:
+            mask &= columns['squareFeet'] <= filters['squareFeetMax']
+        if filters['propertyType']:
+            code = PROPERTY_TYPES.index(filters['propertyType']) if filters['propertyType'] in PROPERTY_TYPES else -2
+            mask &= columns['propertyType'] == code
+        if filters['amenities']:
+            bits = choicesMask(Amenity, filters['amenities'])
+            hits = columns['amenityMask'] & bits
+            mask &= (hits == bits) if filters['amenitiesMatch'] == 'all' else (hits != 0)
+        if filters['highlights']:
+            bits = choicesMask(Highlight, filters['highlights'])
+            mask &= (columns['highlightMask'] & bits) == bits
+        return mask
+
+    @staticmethod
+    def _candidates(columns: dict, mask, filters: dict):
+        """Row positions passing `mask` (and the radius), with their distance in meters."""
+        rows = np.flatnonzero(mask)
+        if filters['latitude'] is None or filters['longitude'] is None:
+            return rows, None
+        # haversine on the mean-radius sphere, like the geography <-> operator
+        lat1, lng1 = np.radians(filters['latitude']), np.radians(filters['longitude'])
+        lat2 = np.radians(columns['latitude'][rows])
+        lng2 = np.radians(columns['longitude'][rows])
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+        distance = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+        within = distance <= filters['radius'] * 1000
+        return rows[within], distance[within]
+
+    def search(self, filters: dict, sortKey: str, descending: bool, cursor=None, limit: int = 20):
+        """
+        Filter, sort and page entirely in memory.
+        Args:
+            filters (dict): Output of services.parsePropertyFilters.
+            sortKey (str): Key of services.PROPERTY_SORT_FIELDS.
+            descending (bool): Sort direction.
+            cursor (list, optional): Decoded [value, id] of the previous page.
+            limit (int): Page size.
+        Returns:
+            tuple: (ids, distances in meters or None, next cursor values or None),
+            or None when the index is not built or cannot answer this search.
+        """
+        if not self.supports(filters, sortKey):
+            return None
+        with self.lock:
+            if not self._refresh():
+                return None
+            parts = [(self.base, None if self.stale is None else ~self.stale)]
+            if self.overlay is not None:
+                parts.append((self.overlay, None))
+
+            ids, keys, distances = [], [], []
+            for columns, live in parts:
+                mask = self._match(columns, filters)
+                if live is not None:
+                    mask &= live
+                rows, distance = self._candidates(columns, mask, filters)
+                ids.append(columns['id'][rows])
+                distances.append(distance if distance is not None else np.empty(0))
+                if sortKey == 'distance':
+                    keys.append(distance)
+                else:
+                    keys.append(columns[SORT_COLUMNS[sortKey]][rows])
+
+        ids = np.concatenate(ids)
+        keys = np.concatenate(keys).astype(np.float64 if sortKey in FLOAT_SORTS else np.int64)
+        hasDistance = filters['latitude'] is not None and filters['longitude'] is not None
+        distances = np.concatenate(distances) if hasDistance else None
+
+        if cursor:
+            value, lastId = cursor
+            if sortKey == 'postedDate':
+                value = _toMicros(parser.isoparse(value))
+            if descending:
+                keep = (keys < value) | ((keys == value) & (ids < lastId))
+            else:
+                keep = (keys > value) | ((keys == value) & (ids > lastId))
+            ids, keys = ids[keep], keys[keep]
+            distances = distances[keep] if distances is not None else None
+
+        # Smallest (key, id) pairs first; negate both for descending
+        sortKeys = -keys if descending else keys
+        sortIds = -ids if descending else ids
+        if len(ids) > limit + 1:
+            # top-N without a full sort: keep everything up to the (limit+1)-th key, ties included
+            threshold = np.partition(sortKeys, limit)[limit]
+            keep = np.flatnonzero(sortKeys <= threshold)
+        else:
+            keep = np.arange(len(ids))
+        order = keep[np.lexsort((sortIds[keep], sortKeys[keep]))][:limit + 1]
+
+        nextCursor = None
+        if len(order) > limit:
+            order = order[:limit]
+            last = order[-1]
+            if sortKey == 'postedDate':
+                lastValue = (EPOCH + timedelta(microseconds=int(keys[last]))).isoformat()
+            else:
+                lastValue = keys[last].item()
+            nextCursor = [lastValue, int(ids[last])]
+
+        return (
+            ids[order].tolist(),
+            distances[order].tolist() if distances is not None else None,
+            nextCursor,
+        )
+
+
+_searchIndex = None
+
+
+def searchIndex() -> ColumnarIndex:
+    """Process-wide index over SEARCH_INDEX_DIR."""
+    global _searchIndex
+    if _searchIndex is None:
+        _searchIndex = ColumnarIndex(settings.SEARCH_INDEX_DIR)
+    return _searchIndex
@@ -0,0 +1,22 @@
+from django.db.models import FloatField, TextField
+from core.rowserializer import MethodColumn, RowSerializer
+from apps.functions import PointX, PointY
+from .serializers import LocationSerializer, PropertySearchSerializer, PropertySerializer, distanceKm
+
+# values()-based equivalents of the serializers in serializers.py, for list
+# endpoints. Output is identical; check with `manage.py bench_serializers`.
+
+LOCATION_COLUMNS = {
+    (LocationSerializer, 'longitude'): MethodColumn(expression=lambda path: PointX(f'{path}coordinates')),
+    (LocationSerializer, 'latitude'): MethodColumn(expression=lambda path: PointY(f'{path}coordinates')),
+}
+
+propertyRows = RowSerializer(PropertySerializer, LOCATION_COLUMNS)
+
+propertySearchRows = RowSerializer(PropertySearchSerializer, {
+    **LOCATION_COLUMNS,
+    # annotated by buildPropertyQuerySet when the search has a latitude/longitude
+    (PropertySearchSerializer, 'distanceKm'): MethodColumn(annotation='distanceMeters', outputField=FloatField(), convert=distanceKm),
+    # filled in afterwards by attachSnippets
+    (PropertySearchSerializer, 'searchSnippet'): MethodColumn(annotation='searchSnippet', outputField=TextField()),
+})
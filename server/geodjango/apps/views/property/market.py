@@ -0,0 +1,136 @@
+from django.db import connection, transaction
+from django.utils import timezone
+from apps.models import MarketStats, MarketStatsDelta, PropertyType
+
+# Market statistics per (city, state, propertyType). Reads never touch
+# Property/Lease: they come from the "MarketStats" materialized view
+# (migration 0012), refreshed CONCURRENTLY by `manage.py refresh_market_stats`,
+# overlaid with MarketStatsDelta rows for groups written to since. Writes only
+# append the groups they touch to MarketGroupChange (database triggers,
+# migration 0026); `manage.py market_stats_worker` recomputes them, one group
+# at a time, off the request path.
+
+STAT_COLUMNS = ['listings', 'leased', 'vacancy', 'medianRent', 'medianPricePerSqft']
+
+# Same figures as the materialized view, for a single group.
+# Keep in sync with MARKET_STATS_SQL in migration 0012.
+MARKET_GROUP_SQL = """
+SELECT
+    count(*)::integer,
+    count(*) FILTER (WHERE lease.id IS NOT NULL)::integer,
+    1 - count(*) FILTER (WHERE lease.id IS NOT NULL)::float / count(*),
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY p."pricePerMonth"),
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY p."pricePerMonth" / NULLIF(p."squareFeet", 0))
+FROM "Property" p
+JOIN "Location" l ON l.id = p."locationId"
+LEFT JOIN LATERAL (
+    SELECT le.id FROM "Lease" le
+    WHERE le."propertyId" = p.id AND le.period @> now()
+    LIMIT 1
+) lease ON true
+WHERE l.city = %s AND l.state = %s AND p."propertyType" = %s
+HAVING count(*) > 0
+"""
+
+# Take queued changes; the rows stay locked, and come back if the recompute fails
+CLAIM_MARKET_CHANGES_SQL = """
+DELETE FROM "MarketGroupChange"
+WHERE id IN (
+    SELECT id FROM "MarketGroupChange" ORDER BY id LIMIT %s
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING city, state, "propertyType"
+"""
+
+
+def groupKey(city: str, state: str, propertyType: str) -> str:
+    return f"{city}|{state}|{propertyType}"
+
+
+def recomputeGroups(groups: set):
+    """
+    Rewrite the MarketStatsDelta rows of `groups` from the live tables. An
+    emptied group is stored with 0 listings so it hides its stale view row.
+    """
+    computedAt = timezone.now()
+    for city, state, propertyType in groups:
+        with connection.cursor() as cursor:
+            cursor.execute(MARKET_GROUP_SQL, [city, state, propertyType])
+            row = cursor.fetchone()
+        stats = dict(zip(STAT_COLUMNS, row)) if row else {
+            'listings': 0, 'leased': 0, 'vacancy': None, 'medianRent': None, 'medianPricePerSqft': None,
+        }
+        MarketStatsDelta.objects.update_or_create(
+            key=groupKey(city, state, propertyType),
+            defaults={'city': city, 'state': state, 'propertyType': propertyType, 'computedAt': computedAt, **stats},
+        )
+
+
+def processMarketChanges(batchSize: int) -> int:
+    """
+    Recompute the groups of up to `batchSize` queued changes. A change queued
+    by a transaction still open stays invisible until it commits, and is
+    recomputed on a later round.
+    Returns:
+        int: Number of groups recomputed.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(CLAIM_MARKET_CHANGES_SQL, [batchSize])
+            groups = set(cursor.fetchall())
+        recomputeGroups(groups)
+    return len(groups)
+
+
+def refreshMarketStats():
+    """
+    Rebuild the materialized view without blocking readers, then drop the
+    delta rows it now includes.
+    """
+    startedAt = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute('REFRESH MATERIALIZED VIEW CONCURRENTLY "MarketStats"')
+    MarketStatsDelta.objects.filter(computedAt__lt=startedAt).delete()
+
+
+def parseMarketFilters(params) -> dict:
+    """
+    Read city/state/propertyType from the query string.
+    Raises:
+        ValueError: If propertyType is unknown.
+    """
+    filters = {}
+    for name in ('city', 'state', 'propertyType'):
+        value = params.get(name)
+        if value:
+            filters[name] = value
+    if 'propertyType' in filters and filters['propertyType'] not in PropertyType.values:
+        raise ValueError(f"Invalid propertyType: {filters['propertyType']}")
+    return filters
+
+
+def getMarketStats(filters: dict) -> dict:
+    """
+    Market statistics of the groups matching `filters`. The number of rows
+    read depends on the number of groups, not on the inventory size.
+    Args:
+        filters (dict): Output of parseMarketFilters.
+    Returns:
+        dict: {'stats': [...], 'refreshedAt': last full refresh or None}
+    """
+    rows = {row.key: row for row in MarketStats.objects.filter(**filters)}
+    refreshedAt = max((row.refreshedAt for row in rows.values()), default=None)
+    for row in MarketStatsDelta.objects.filter(**filters):
+        rows[row.key] = row
+
+    stats = []
+    for row in sorted(rows.values(), key=lambda row: (row.state, row.city, row.propertyType)):
+        if row.listings == 0:
+            continue
+        stats.append({
+            'city': row.city,
+            'state': row.state,
+            'propertyType': row.propertyType,
+            **{name: getattr(row, name) for name in STAT_COLUMNS},
+        })
+    return {'stats': stats, 'refreshedAt': refreshedAt}
@@ -1,13 +1,16 @@
 from rest_framework import serializers
 from apps.models import Property, Location
 
+def distanceKm(meters):
+    return round(meters / 1000, 3) if meters is not None else None
+
 class LocationSerializer(serializers.ModelSerializer):
     longitude = serializers.SerializerMethodField()
     latitude = serializers.SerializerMethodField()
 
     class Meta:
         model = Location
-        fields = ['address', 'city', 'state', 'country', 'postalCode', 'longitude', 'latitude']
+        fields = ['address', 'city', 'state', 'country', 'postalCode', 'longitude', 'latitude', 'geocodeStatus']
 
     def get_longitude(self, obj):
         return obj.coordinates.x if obj.coordinates else None
@@ -22,7 +25,22 @@ class PropertySerializer(serializers.ModelSerializer):
         model = Property
         fields = [
             'id', 'name', 'description', 'pricePerMonth', 'securityDeposit', 'applicationFee',
-            'photoUrls', 'amenities', 'highlights', 'isPetsAllowed', 'isParkingIncluded',
+            'photoUrls', 'photoDerivatives', 'amenities', 'highlights', 'isPetsAllowed', 'isParkingIncluded',
             'beds', 'baths', 'squareFeet', 'propertyType', 'postedDate', 'averageRating',
             'numberOfReviews', 'location'
-        ]
\ No newline at end of file
+        ]
+
+class PropertySearchSerializer(PropertySerializer):
+    distanceKm = serializers.SerializerMethodField()
+    searchSnippet = serializers.SerializerMethodField()
+
+    class Meta(PropertySerializer.Meta):
+        fields = PropertySerializer.Meta.fields + ['distanceKm', 'searchSnippet']
+
+    def get_distanceKm(self, obj):
+        # set by buildPropertyQuerySet when the search has a latitude/longitude
+        return distanceKm(getattr(obj, 'distanceMeters', None))
+
+    def get_searchSnippet(self, obj):
+        # set by attachSnippets when the search has a q
+        return getattr(obj, 'searchSnippet', None)
@@ -0,0 +1,693 @@
+import base64
+import hashlib
+import json
+import math
+from datetime import datetime, time, timezone
+from dateutil import parser
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.contrib.gis.geos import Polygon
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.core.cache import cache
+from django.db import connection
+from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
+from django.db.models import Avg, Count, Exists, F, FloatField, Min, OuterRef, Q
+from django.db.models.functions import Cast, Substr
+from apps import geohash
+from apps.models import PLACED_GEOCODE_STATUSES, Amenity, Highlight, Property, Lease, choicesMask
+from apps.functions import GeographyDWithin, KnnDistance, Median, PointX, PointY
+from .cache import dataGeneration
+from .fastserializers import propertySearchRows
+from .serializers import distanceKm
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+DEFAULT_SEARCH_RADIUS_KM = 1000
+MAX_SEARCH_RADIUS_KM = 20000
+MAX_QUERY_LENGTH = 200
+# length of the stay checked by availableFrom when availableFor is not given
+DEFAULT_AVAILABLE_MONTHS = 12
+MAX_AVAILABLE_MONTHS = 60
+SEARCH_CONFIG = 'english'
+MAX_MAP_ZOOM = 22
+# grid cells across one 256px map tile, i.e. roughly one cluster per 64px
+MAP_CELLS_PER_TILE = 4
+# geohash cells covering a map viewport (see inBoundingBox)
+MAP_REGION_CELLS = 32
+MVT_EXTENT = 4096
+MVT_LAYER = 'properties'
+# GROUPING() bitmask of the facet query -> facet name, see getPropertyFacets
+FACET_GROUPS = {
+    0b01111: 'propertyType',
+    0b10111: 'beds',
+    0b11011: 'baths',
+    0b11101: 'price',
+    0b11110: 'amenities',
+    0b11111: 'total',
+}
+
+# Sort key -> model field. Every key is paired with `id` so the order is total
+# and a keyset cursor can resume exactly where the previous page stopped.
+# Each has a (field, id) B-tree index, scanned forwards or backwards.
+PROPERTY_SORT_FIELDS = {
+    'postedDate': 'postedDate',
+    'id': 'id',
+    'pricePerMonth': 'pricePerMonth',
+    'averageRating': 'averageRating',
+    'squareFeet': 'squareFeet',
+    # only valid with latitude/longitude, see buildPropertyQuerySet
+    'distance': 'distanceMeters',
+    # only valid with q
+    'relevance': 'searchRank',
+}
+# Sort fields that can be NULL (last ascending, first descending)
+NULLABLE_SORT_FIELDS = {'averageRating'}
+# Sorts whose default direction is ascending (nearest, cheapest first)
+ASCENDING_SORTS = {'distance', 'pricePerMonth'}
+
+
+def _parseNumber(value, cast, name: str):
+    if value in (None, '', 'any'):
+        return None
+    try:
+        number = cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid value for {name}: {value}")
+    # 0 is what the client sends for "no limit"
+    return number or None
+
+
+def parsePropertyFilters(params) -> dict:
+    """
+    Normalize the query string of a property search into a filter dict.
+    Args:
+        params (QueryDict): request.GET of the search request.
+    Returns:
+        dict: Filters with unset values as None and defaults folded in.
+    Raises:
+        ValueError: If a parameter cannot be parsed.
+    """
+    favoriteIds = params.get('favoriteIds', '')
+    amenities = params.get('amenities', 'any')
+    highlights = params.get('highlights', 'any')
+    amenitiesMatch = params.get('amenitiesMatch', 'all')
+    propertyType = params.get('propertyType', 'any')
+    availableFrom = params.get('availableFrom', 'any')
+
+    q = ' '.join(params.get('q', '').split())
+    if len(q) > MAX_QUERY_LENGTH:
+        raise ValueError(f"q is longer than {MAX_QUERY_LENGTH} characters")
+
+    filters = {
+        'q': q or None,
+        'favoriteIds': sorted({int(id) for id in favoriteIds.split(',') if id.isdigit()}) or None,
+        'priceMin': _parseNumber(params.get('priceMin'), float, 'priceMin'),
+        'priceMax': _parseNumber(params.get('priceMax'), float, 'priceMax'),
+        'beds': _parseNumber(params.get('beds'), int, 'beds'),
+        'baths': _parseNumber(params.get('baths'), float, 'baths'),
+        'squareFeetMin': _parseNumber(params.get('squareFeetMin'), int, 'squareFeetMin'),
+        'squareFeetMax': _parseNumber(params.get('squareFeetMax'), int, 'squareFeetMax'),
+        'propertyType': propertyType if propertyType and propertyType != 'any' else None,
+        'amenities': sorted({a for a in amenities.split(',') if a}) if amenities and amenities != 'any' else None,
+        'amenitiesMatch': amenitiesMatch,
+        'highlights': sorted({h for h in highlights.split(',') if h}) if highlights and highlights != 'any' else None,
+        'availableFrom': None,
+        'availableFor': _parseNumber(params.get('availableFor'), int, 'availableFor') or DEFAULT_AVAILABLE_MONTHS,
+        'latitude': _parseNumber(params.get('latitude'), float, 'latitude'),
+        'longitude': _parseNumber(params.get('longitude'), float, 'longitude'),
+        'radius': _parseNumber(params.get('radius'), float, 'radius') or DEFAULT_SEARCH_RADIUS_KM,
+    }
+
+    if filters['latitude'] is not None and not -90 <= filters['latitude'] <= 90:
+        raise ValueError(f"Invalid value for latitude: {filters['latitude']}")
+    if filters['longitude'] is not None and not -180 <= filters['longitude'] <= 180:
+        raise ValueError(f"Invalid value for longitude: {filters['longitude']}")
+    if not 0 < filters['radius'] <= MAX_SEARCH_RADIUS_KM:
+        raise ValueError(f"Invalid value for radius: {filters['radius']}")
+
+    if amenitiesMatch not in ('all', 'any'):
+        raise ValueError(f"Invalid value for amenitiesMatch: {amenitiesMatch}")
+    # validates the names too
+    choicesMask(Amenity, filters['amenities'] or [])
+    choicesMask(Highlight, filters['highlights'] or [])
+
+    if not 0 < filters['availableFor'] <= MAX_AVAILABLE_MONTHS:
+        raise ValueError(f"Invalid value for availableFor: {filters['availableFor']}")
+
+    if availableFrom and availableFrom != 'any':
+        try:
+            filters['availableFrom'] = datetime.strptime(availableFrom[:10], '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError(f"Invalid value for availableFrom: {availableFrom}")
+
+    return filters
+
+
+def buildPropertyQuerySet(filters: dict):
+    """
+    Translate a filter dict into a single Property queryset.
+    Args:
+        filters (dict): Output of parsePropertyFilters.
+    Returns:
+        QuerySet: Filtered properties with their Location joined in. With a
+        latitude/longitude it is also annotated with `distanceMeters`, with
+        q with `searchRank`.
+    """
+    queryset = Property.objects.select_related('locationId')
+
+    if filters['q']:
+        # @@ against the trigger-maintained searchVector column (GIN indexed)
+        query = searchQuery(filters['q'])
+        # ts_rank is real (float4); as double precision the value a cursor carries
+        # compares equal to the row it came from, so keyset pages neither repeat nor skip
+        queryset = queryset.filter(searchVector=query).annotate(
+            searchRank=Cast(SearchRank(F('searchVector'), query), FloatField()),
+        )
+
+    if filters['favoriteIds']:
+        queryset = queryset.filter(id__in=filters['favoriteIds'])
+
+    if filters['priceMin'] is not None:
+        queryset = queryset.filter(pricePerMonth__gte=filters['priceMin'])
+
+    if filters['priceMax'] is not None:
+        queryset = queryset.filter(pricePerMonth__lte=filters['priceMax'])
+
+    if filters['beds'] is not None:
+        queryset = queryset.filter(beds__gte=filters['beds'])
+
+    if filters['baths'] is not None:
+        queryset = queryset.filter(baths__gte=filters['baths'])
+
+    if filters['squareFeetMin'] is not None:
+        queryset = queryset.filter(squareFeet__gte=filters['squareFeetMin'])
+
+    if filters['squareFeetMax'] is not None:
+        queryset = queryset.filter(squareFeet__lte=filters['squareFeetMax'])
+
+    if filters['propertyType']:
+        queryset = queryset.filter(propertyType=filters['propertyType'])
+
+    if filters['amenities']:
+        # Bitwise test on the generated amenityMask column instead of array @>
+        mask = choicesMask(Amenity, filters['amenities'])
+        queryset = queryset.alias(amenityHits=F('amenityMask').bitand(mask))
+        if filters['amenitiesMatch'] == 'all':
+            queryset = queryset.filter(amenityHits=mask)
+        else:
+            queryset = queryset.filter(amenityHits__gt=0)
+
+    if filters['highlights']:
+        mask = choicesMask(Highlight, filters['highlights'])
+        queryset = queryset.alias(highlightHits=F('highlightMask').bitand(mask)).filter(highlightHits=mask)
+
+    if filters['availableFrom']:
+        # Free for the whole stay: no lease whose period overlaps it. NOT EXISTS
+        # is an anti-join probing the (propertyId, period) GiST index
+        queryset = queryset.filter(~Exists(
+            Lease.objects.filter(propertyId=OuterRef('pk'), period__overlap=availabilityWindow(filters))
+        ))
+
+    if hasLocation(filters):
+        # Radius in meters on the spheroid, not degrees: 1 degree of longitude
+        # shrinks with latitude so the old km / 111 conversion was only right at the equator
+        lng, lat = filters['longitude'], filters['latitude']
+        queryset = placed(queryset).filter(
+            GeographyDWithin('locationId__coordinates', lng, lat, filters['radius'] * 1000)
+        ).annotate(distanceMeters=KnnDistance('locationId__coordinates', lng, lat))
+
+    return queryset
+
+
+def placed(queryset):
+    """Only properties whose location is geocoded, not at the POINT(0 0) placeholder."""
+    return queryset.filter(locationId__geocodeStatus__in=PLACED_GEOCODE_STATUSES)
+
+
+def availabilityWindow(filters: dict) -> DateTimeTZRange:
+    """[availableFrom, availableFrom + availableFor months) in UTC."""
+    start = datetime.combine(filters['availableFrom'], time.min, tzinfo=timezone.utc)
+    return DateTimeTZRange(start, start + relativedelta(months=filters['availableFor']), '[)')
+
+
+def searchQuery(q: str) -> SearchQuery:
+    return SearchQuery(q, search_type='websearch', config=SEARCH_CONFIG)
+
+
+def attachSnippets(properties: list, q: str):
+    """
+    Set `searchSnippet` (description with matches in <mark>) on a page of
+    serialized results.
+    Run on the page ids only: ts_headline re-parses the whole text and is
+    far too slow to evaluate for every match.
+    """
+    if not properties:
+        return
+    snippets = dict(Property.objects.filter(id__in=[p['id'] for p in properties]).annotate(
+        searchSnippet=SearchHeadline(
+            'description', searchQuery(q), config=SEARCH_CONFIG,
+            start_sel='<mark>', stop_sel='</mark>', max_fragments=2,
+        )
+    ).values_list('id', 'searchSnippet'))
+    for property in properties:
+        property['searchSnippet'] = snippets.get(property['id'])
+
+
+def hasLocation(filters: dict) -> bool:
+    return filters['latitude'] is not None and filters['longitude'] is not None
+
+
+def encodeCursor(values: list) -> str:
+    raw = json.dumps(values, default=lambda v: v.isoformat(), separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decodeCursor(cursor: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != 2:
+            raise ValueError
+        return values
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def parseSort(params, filters: dict) -> tuple:
+    """
+    Read `sort`/`direction` from the query string.
+    Args:
+        params (QueryDict): request.GET of the search request.
+        filters (dict): Output of parsePropertyFilters.
+    Returns:
+        tuple: (sort key, descending)
+    Raises:
+        ValueError: If the sort key or direction is unknown.
+    """
+    sort = params.get('sort', 'relevance' if filters['q'] else 'postedDate')
+    if sort not in PROPERTY_SORT_FIELDS:
+        raise ValueError(f"Invalid sort: {sort}")
+    if sort == 'distance' and not hasLocation(filters):
+        raise ValueError("sort=distance requires latitude and longitude")
+    if sort == 'relevance' and not filters['q']:
+        raise ValueError("sort=relevance requires q")
+    direction = params.get('direction', 'asc' if sort in ASCENDING_SORTS else 'desc')
+    if direction not in ('asc', 'desc'):
+        raise ValueError(f"Invalid direction: {direction}")
+    return sort, direction == 'desc'
+
+
+def parseLimit(params) -> int:
+    try:
+        limit = int(params.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError(f"Invalid limit: {params.get('limit')}")
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def sortOrdering(sortKey: str, descending: bool) -> list:
+    # (sort field, id): id breaks ties so the order is total
+    field = PROPERTY_SORT_FIELDS[sortKey]
+    prefix = '-' if descending else ''
+    if field == 'id':
+        return [f'{prefix}id']
+    return [f'{prefix}{field}', f'{prefix}id']
+
+
+def keysetAfter(field: str, value, lastId: int, descending: bool) -> Q:
+    """
+    Rows after (value, lastId) in ORDER BY field, id. Postgres puts NULLs last
+    ascending and first descending, the same order the B-tree index returns.
+    """
+    compare = 'lt' if descending else 'gt'
+    idAfter = Q(**{f'id__{compare}': lastId})
+    if value is None:
+        # inside the NULL block; descending, all non-NULL rows are still to come
+        after = Q(**{f'{field}__isnull': True}) & idAfter
+        return after | Q(**{f'{field}__isnull': False}) if descending else after
+    # The redundant >= / <= bound becomes an Index Cond, so later pages seek
+    # into the (field, id) index instead of filtering from its start
+    bound = Q(**{f"{field}__{'lte' if descending else 'gte'}": value})
+    after = bound & (Q(**{f'{field}__{compare}': value}) | (Q(**{field: value}) & idAfter))
+    if not descending and field in NULLABLE_SORT_FIELDS:
+        after |= Q(**{f'{field}__isnull': True})
+    return after
+
+
+def afterCursor(queryset, sortKey: str, descending: bool, cursor: str):
+    """
+    Restrict `queryset` to the rows after a nextCursor.
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    field = PROPERTY_SORT_FIELDS[sortKey]
+    value, lastId = decodeCursor(cursor)
+    if field == 'id':
+        return queryset.filter(**{f"id__{'lt' if descending else 'gt'}": lastId})
+    if field == 'postedDate':
+        value = parser.isoparse(value)
+    return queryset.filter(keysetAfter(field, value, lastId, descending))
+
+
+def paginateKeyset(queryset, sortKey: str, descending: bool, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE, rows=None):
+    """
+    Return one page of `queryset` ordered by (sort field, id) using a keyset cursor.
+    Args:
+        queryset (QuerySet): Filtered properties.
+        sortKey (str): Key of PROPERTY_SORT_FIELDS.
+        descending (bool): Sort direction.
+        cursor (str, optional): nextCursor of the previous page.
+        limit (int): Page size.
+        rows (RowSerializer, optional): Read the page with values_list() and
+            return serialized dicts instead of Property instances.
+    Returns:
+        tuple: (list of Property or dict, next cursor or None)
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    field = PROPERTY_SORT_FIELDS[sortKey]
+    ordering = sortOrdering(sortKey, descending)
+    if cursor:
+        queryset = afterCursor(queryset, sortKey, descending, cursor)
+
+    # Fetch one extra row to know whether another page exists
+    queryset = queryset.order_by(*ordering)
+    if rows is None:
+        page = list(queryset[:limit + 1])
+        cursorValues = lambda last: [getattr(last, field), last.id]
+    else:
+        # the sort value rides along as an extra column when it isn't rendered
+        extra = [field, 'id']
+        page = list(rows.values(queryset, extra)[:limit + 1])
+        valueAt, idAt = rows.position(field, extra), rows.position('id', extra)
+        cursorValues = lambda last: [last[valueAt], last[idAt]]
+
+    nextCursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        nextCursor = encodeCursor(cursorValues(page[-1]))
+    if rows is not None:
+        page = [rows.render(row) for row in page]
+    return page, nextCursor
+
+
+def searchProperties(filters: dict, sortKey: str, descending: bool, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE):
+    """
+    One page of search results, serialized like PropertySearchSerializer.
+    Served from the shared columnar index when SEARCH_INDEX_ENABLED is set and
+    it can answer the search, from SQL otherwise.
+    Returns:
+        tuple: (list of dict, next cursor or None)
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    if filters['q']:
+        properties, nextCursor = paginateKeyset(buildPropertyQuerySet(filters), sortKey, descending, cursor, limit, propertySearchRows)
+        attachSnippets(properties, filters['q'])
+        return properties, nextCursor
+
+    if getattr(settings, 'SEARCH_INDEX_ENABLED', False):
+        from .columnar import searchIndex
+        result = searchIndex().search(filters, sortKey, descending, decodeCursor(cursor) if cursor else None, limit)
+        if result is not None:
+            ids, distances, nextCursor = result
+            # Only the page itself is read from Postgres
+            rows = {row['id']: row for row in propertySearchRows.serialize(Property.objects.filter(id__in=ids))}
+            properties = []
+            for i, id in enumerate(ids):
+                if id in rows:
+                    if distances is not None:
+                        rows[id]['distanceKm'] = distanceKm(distances[i])
+                    properties.append(rows[id])
+            return properties, encodeCursor(nextCursor) if nextCursor else None
+
+    return paginateKeyset(buildPropertyQuerySet(filters), sortKey, descending, cursor, limit, propertySearchRows)
+
+
+def iterateProperties(filters: dict, sortKey: str, descending: bool, chunkSize: int):
+    """
+    Every property matching `filters`, in sort order and serialized like
+    PropertySearchSerializer, read through a server-side cursor `chunkSize`
+    rows at a time. Used by streaming responses, so there is no cursor/limit:
+    the whole result set is produced lazily.
+    Yields:
+        dict
+    """
+    rows = propertySearchRows.iterate(buildPropertyQuerySet(filters).order_by(*sortOrdering(sortKey, descending)), chunkSize)
+    if not filters['q']:
+        yield from rows
+        return
+
+    # Snippets are fetched per chunk, one extra query each
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunkSize:
+            attachSnippets(chunk, filters['q'])
+            yield from chunk
+            chunk = []
+    if chunk:
+        attachSnippets(chunk, filters['q'])
+        yield from chunk
+
+
+def parseBoundingBox(params) -> tuple:
+    """
+    Read `bbox=minLng,minLat,maxLng,maxLat` from the query string.
+    Raises:
+        ValueError: If the box is missing or malformed.
+    """
+    try:
+        minLng, minLat, maxLng, maxLat = [float(v) for v in params.get('bbox', '').split(',')]
+    except ValueError:
+        raise ValueError("bbox must be minLng,minLat,maxLng,maxLat")
+    if not (-180 <= minLng < maxLng <= 180 and -90 <= minLat < maxLat <= 90):
+        raise ValueError(f"Invalid bbox: {params.get('bbox')}")
+    return minLng, minLat, maxLng, maxLat
+
+
+def parseZoom(params) -> int:
+    try:
+        zoom = int(params.get('zoom', 0))
+    except ValueError:
+        raise ValueError(f"Invalid zoom: {params.get('zoom')}")
+    if not 0 <= zoom <= MAX_MAP_ZOOM:
+        raise ValueError(f"Invalid zoom: {zoom}")
+    return zoom
+
+
+def inBoundingBox(queryset, bbox: tuple):
+    """
+    Restrict properties to a bounding box with geohash prefix scans on the
+    B-tree index. Only cells crossing the box edge compare coordinates.
+    Every location has a geohash (trigger of migration 0014, backfilled by
+    0023); those still waiting for the geocoder are not found.
+    """
+    inside, edge = geohash.cover(bbox, MAP_REGION_CELLS)
+    region = Q()
+    for prefix in inside:
+        region |= Q(locationId__geohash__startswith=prefix)
+    if edge:
+        minLng, minLat, maxLng, maxLat = bbox
+        crossing = Q()
+        for prefix in edge:
+            crossing |= Q(locationId__geohash__startswith=prefix)
+        queryset = queryset.alias(
+            regionLng=PointX('locationId__coordinates'), regionLat=PointY('locationId__coordinates'),
+        )
+        region |= crossing & Q(regionLng__gte=minLng, regionLng__lte=maxLng, regionLat__gte=minLat, regionLat__lte=maxLat)
+    return placed(queryset).filter(region)
+
+
+def getPropertyMap(filters: dict, bbox: tuple, zoom: int) -> dict:
+    """
+    Markers for the map viewport: individual points when the viewport holds at
+    most MAP_POINT_THRESHOLD matches, otherwise grid clusters.
+    Args:
+        filters (dict): Output of parsePropertyFilters.
+        bbox (tuple): (minLng, minLat, maxLng, maxLat)
+        zoom (int): Map zoom level, sets the grid cell size.
+    Returns:
+        dict: {'type': 'points', 'points': [...]} or
+              {'type': 'clusters', 'cellSize': ..., 'precision': geohash length,
+               'total': ..., 'clusters': [...]}
+    """
+    threshold = getattr(settings, 'MAP_POINT_THRESHOLD', 200)
+    maxClusters = getattr(settings, 'MAP_MAX_CLUSTERS', 500)
+
+    queryset = inBoundingBox(buildPropertyQuerySet(filters), bbox).order_by()
+    longitude = PointX('locationId__coordinates')
+    latitude = PointY('locationId__coordinates')
+
+    # One row past the threshold tells us whether to cluster
+    points = list(
+        queryset.annotate(longitude=longitude, latitude=latitude)
+        .values('id', 'longitude', 'latitude', 'pricePerMonth')[:threshold + 1]
+    )
+    if len(points) <= threshold:
+        return {'type': 'points', 'points': points}
+
+    # Cell size follows the zoom, but never so small that the viewport holds
+    # more than maxClusters cells: the payload stays bounded for any bbox.
+    # Cells are geohash prefixes at least that wide, grouped as plain strings
+    minLng, minLat, maxLng, maxLat = bbox
+    precision = geohash.precisionFor(max(
+        360 / (2 ** zoom * MAP_CELLS_PER_TILE),
+        math.sqrt((maxLng - minLng) * (maxLat - minLat) / maxClusters),
+    ))
+    clusters = list(
+        queryset.annotate(cell=Substr('locationId__geohash', 1, precision))
+        .values('cell')
+        .annotate(
+            count=Count('id'),
+            longitude=Avg(longitude),
+            latitude=Avg(latitude),
+            minPrice=Min('pricePerMonth'),
+            medianPrice=Median('pricePerMonth'),
+        )
+        .values('count', 'longitude', 'latitude', 'minPrice', 'medianPrice')
+    )
+    return {
+        'type': 'clusters',
+        'cellSize': geohash.cellSize(precision)[0],
+        'precision': precision,
+        'total': sum(c['count'] for c in clusters),
+        'clusters': clusters,
+    }
+
+
+def filtersHash(filters: dict) -> str:
+    """Stable digest of a parsed filter dict, for cache keys."""
+    raw = json.dumps(filters, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def tileBounds(z: int, x: int, y: int) -> tuple:
+    """
+    WGS84 bounds of a web mercator (slippy map) tile.
+    Returns:
+        tuple: (minLng, minLat, maxLng, maxLat)
+    Raises:
+        ValueError: If z/x/y is not a valid tile.
+    """
+    if not 0 <= z <= MAX_MAP_ZOOM or not 0 <= x < 2 ** z or not 0 <= y < 2 ** z:
+        raise ValueError(f"Invalid tile: {z}/{x}/{y}")
+    n = 2 ** z
+
+    def latitude(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360 - 180, latitude(y + 1), (x + 1) / n * 360 - 180, latitude(y)
+
+
+def getPropertyTile(filters: dict, z: int, x: int, y: int) -> bytes:
+    """
+    Mapbox vector tile of the properties matching `filters` inside tile z/x/y.
+    Tiles are cached per (data generation, filter hash, z, x, y) for
+    MVT_CACHE_TIMEOUT seconds, and hold at most the MVT_MAX_FEATURES newest
+    matches.
+    Args:
+        filters (dict): Output of parsePropertyFilters.
+        z, x, y (int): Tile coordinates.
+    Returns:
+        bytes: Encoded tile, empty when nothing matches.
+    Raises:
+        ValueError: If z/x/y is not a valid tile.
+    """
+    bounds = tileBounds(z, x, y)
+    key = f"mvt:{dataGeneration()}:{filtersHash(filters)}:{z}:{x}:{y}"
+    tile = cache.get(key)
+    if tile is not None:
+        return tile
+
+    envelope = Polygon.from_bbox(bounds)
+    envelope.srid = 4326
+    maxFeatures = getattr(settings, 'MVT_MAX_FEATURES', 50000)
+    # past the cap, the newest listings win: a fixed subset, so a cached tile
+    # and its neighbours agree on what a dense area shows
+    ids = placed(buildPropertyQuerySet(filters)).filter(
+        locationId__coordinates__bboverlaps=envelope
+    ).order_by('-postedDate', '-id').values('id')[:maxFeatures]
+    idsSql, idsParams = ids.query.sql_with_params()
+
+    # The ORM has no ST_AsMVT; it only supplies the filtered ids so the tile
+    # honours exactly the same filters as get_properties
+    sql = f"""
+        SELECT ST_AsMVT(tile.*, %s, %s, 'geom') FROM (
+            SELECT ST_AsMVTGeom(ST_Transform(l.coordinates, 3857), ST_TileEnvelope(%s, %s, %s), %s) AS geom,
+                   p.id, p."pricePerMonth" AS price, p.beds, p."propertyType"
+            FROM "Property" p
+            JOIN "Location" l ON l.id = p."locationId"
+            WHERE p.id IN ({idsSql})
+        ) AS tile
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [MVT_LAYER, MVT_EXTENT, z, x, y, MVT_EXTENT, *idsParams])
+        row = cursor.fetchone()
+    tile = bytes(row[0]) if row and row[0] else b''
+
+    cache.set(key, tile, getattr(settings, 'MVT_CACHE_TIMEOUT', 300))
+    return tile
+
+
+def getPropertyFacets(filters: dict) -> dict:
+    """
+    Counts per propertyType, beds, baths (whole baths), price bucket and
+    amenity for the properties matching `filters`, in one GROUPING SETS query.
+    Args:
+        filters (dict): Output of parsePropertyFilters.
+    Returns:
+        dict: {'total': n, 'propertyType': [{'value', 'count'}], 'beds': [...],
+               'baths': [...], 'amenities': [...], 'price': [{'min', 'max', 'count'}]}
+    """
+    # inlined rather than bound: GROUPING() must see the same expression text
+    # as the GROUP BY, which separate placeholders would break
+    bucket = int(getattr(settings, 'FACET_PRICE_BUCKET', 500))
+    filtered = buildPropertyQuerySet(filters).order_by().values(
+        'id', 'amenities', 'propertyType', 'beds', 'baths', 'pricePerMonth'
+    )
+    filteredSql, filteredParams = filtered.query.sql_with_params()
+
+    # unnest() repeats a property once per amenity. The amenity set counts
+    # those rows; every other set only counts the first (or the only, when
+    # there are no amenities) row per property, so no COUNT(DISTINCT) is needed.
+    sql = f"""
+        WITH filtered(id, amenities, "propertyType", beds, baths, price) AS ({filteredSql})
+        SELECT GROUPING(f."propertyType", f.beds, floor(f.baths), floor(f.price / {bucket}), a.amenity),
+               COALESCE(f."propertyType", f.beds::text, floor(f.baths)::text,
+                        floor(f.price / {bucket})::text, a.amenity),
+               COUNT(*) FILTER (WHERE a.n IS NULL OR a.n = 1),
+               COUNT(a.amenity)
+        FROM filtered f
+        LEFT JOIN LATERAL unnest(f.amenities) WITH ORDINALITY AS a(amenity, n) ON TRUE
+        GROUP BY GROUPING SETS (
+            (f."propertyType"), (f.beds), (floor(f.baths)), (floor(f.price / {bucket})), (a.amenity), ()
+        )
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, filteredParams)
+        rows = cursor.fetchall()
+
+    facets = {'total': 0, 'propertyType': [], 'beds': [], 'baths': [], 'price': [], 'amenities': []}
+    for grouping, value, count, amenityCount in rows:
+        name = FACET_GROUPS[grouping]
+        if name == 'total':
+            facets['total'] = count
+        elif value is None:
+            continue
+        elif name == 'amenities':
+            facets['amenities'].append({'value': value, 'count': amenityCount})
+        elif name == 'price':
+            start = int(float(value)) * bucket
+            facets['price'].append({'min': start, 'max': start + bucket, 'count': count})
+        elif name == 'propertyType':
+            facets['propertyType'].append({'value': value, 'count': count})
+        else:
+            facets[name].append({'value': int(float(value)), 'count': count})
+
+    for name in ('propertyType', 'amenities'):
+        facets[name].sort(key=lambda f: -f['count'])
+    for name in ('beds', 'baths'):
+        facets[name].sort(key=lambda f: f['value'])
+    facets['price'].sort(key=lambda f: f['min'])
+    return facets
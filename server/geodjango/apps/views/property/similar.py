@@ -0,0 +1,355 @@
+import os
+import numpy as np
+from django.conf import settings
+from apps.models import PLACED_GEOCODE_STATUSES, Amenity, Highlight, Property
+from apps.functions import GeographyDWithin, KnnDistance
+from .columnar import EARTH_RADIUS_M, PROPERTY_TYPES, searchIndex
+from .fastserializers import propertySearchRows
+from .serializers import distanceKm
+
+# Feature vectors for "similar listings", derived from the columnar search
+# index (columnar.py) so they follow its generations and change log:
+#
+#   g<ns>/features.npy       float32 matrix, one row per base row
+#   g<ns>/featureNorms.npy   float32 (attribute norm, squared row norm) per row
+#   g<ns>/featureStats.npy   mean/std of the numeric columns of that build
+#
+# The files are written by the first worker that needs them and memory-mapped
+# by every other one. Rows changed since the build are marked stale in the
+# index and re-encoded from its overlay, with the stats of the base build, so
+# an incremental update never shifts the scale of the other rows.
+#
+# Row layout: [numeric | amenities | highlights | property type | location].
+# cosine compares the attribute columns only; l2 also counts distance, one
+# unit per SIMILAR_LOCATION_SCALE_KM.
+
+FEATURES = 'features.npy'
+FEATURE_NORMS = 'featureNorms.npy'
+FEATURE_STATS = 'featureStats.npy'
+BLOCK_ROWS = 65536
+DEFAULT_SIMILAR = 6
+MAX_SIMILAR = 50
+MAX_SIMILAR_RADIUS_KM = 500
+METRICS = ('cosine', 'l2')
+
+NUMERIC_WEIGHT = 1.0
+AMENITY_WEIGHT = 1.0
+HIGHLIGHT_WEIGHT = 0.5
+TYPE_WEIGHT = 1.5
+AMENITY_BITS = len(Amenity)
+HIGHLIGHT_BITS = len(Highlight)
+ATTRIBUTES = 4 + AMENITY_BITS + HIGHLIGHT_BITS + len(PROPERTY_TYPES)
+DIMENSIONS = ATTRIBUTES + 3
+
+
+def _numeric(columns: dict):
+    # prices and sizes are compared on a log scale: 1000 vs 1500 is as far as 2000 vs 3000
+    return np.column_stack([
+        np.log1p(np.maximum(columns['pricePerMonth'], 0)),
+        columns['beds'].astype(np.float64),
+        columns['baths'].astype(np.float64),
+        np.log1p(np.maximum(columns['squareFeet'], 0)).astype(np.float64),
+    ])
+
+
+def _bits(masks, count: int):
+    return ((masks[:, None] >> np.arange(count, dtype=np.int64)) & 1).astype(np.float32)
+
+
+def numericStats(columns: dict):
+    """(2, 4) array of mean and std of the numeric features; std is never 0."""
+    numeric = _numeric(columns)
+    if not len(numeric):
+        return np.vstack([np.zeros(4), np.ones(4)])
+    std = numeric.std(axis=0)
+    return np.vstack([numeric.mean(axis=0), np.where(std > 0, std, 1.0)])
+
+
+def encode(columns: dict, stats):
+    """
+    Feature vectors of columnar index rows.
+    Args:
+        columns (dict): Columns of a ColumnarIndex part (base or overlay).
+        stats (ndarray): Output of numericStats() for the base build.
+    Returns:
+        tuple: (float32 matrix of DIMENSIONS columns, float32 (n, 2) norms)
+    """
+    n = len(columns['id'])
+    features = np.zeros((n, DIMENSIONS), dtype=np.float32)
+    features[:, :4] = NUMERIC_WEIGHT * (_numeric(columns) - stats[0]) / stats[1]
+
+    # each bit group has norm == weight when every bit is set
+    offset = 4
+    features[:, offset:offset + AMENITY_BITS] = _bits(columns['amenityMask'], AMENITY_BITS) * (AMENITY_WEIGHT / np.sqrt(AMENITY_BITS))
+    offset += AMENITY_BITS
+    features[:, offset:offset + HIGHLIGHT_BITS] = _bits(columns['highlightMask'], HIGHLIGHT_BITS) * (HIGHLIGHT_WEIGHT / np.sqrt(HIGHLIGHT_BITS))
+    offset += HIGHLIGHT_BITS
+    known = columns['propertyType'] >= 0
+    features[np.flatnonzero(known), offset + columns['propertyType'][known].astype(np.int64)] = TYPE_WEIGHT
+
+    # unit vector on the sphere: chord length ~ distance / earth radius for nearby points.
+    # Not yet geocoded (NaN) rows get no location part rather than one at POINT(0 0)
+    lat, lng = np.radians(columns['latitude']), np.radians(columns['longitude'])
+    scale = EARTH_RADIUS_M / 1000 / settings.SIMILAR_LOCATION_SCALE_KM
+    features[:, ATTRIBUTES] = np.nan_to_num(scale * np.cos(lat) * np.cos(lng))
+    features[:, ATTRIBUTES + 1] = np.nan_to_num(scale * np.cos(lat) * np.sin(lng))
+    features[:, ATTRIBUTES + 2] = np.nan_to_num(scale * np.sin(lat))
+
+    norms = np.column_stack([
+        np.linalg.norm(features[:, :ATTRIBUTES], axis=1),
+        np.einsum('ij,ij->i', features, features),
+    ]).astype(np.float32)
+    return features, norms
+
+
+def _haversine(columns: dict, rows, latitude: float, longitude: float):
+    lat1, lng1 = np.radians(latitude), np.radians(longitude)
+    lat2 = np.radians(columns['latitude'][rows])
+    lng2 = np.radians(columns['longitude'][rows])
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def _withinRadius(columns: dict, latitude: float, longitude: float, radiusKm: float):
+    """Row positions within radiusKm, through a cheap degree box first."""
+    dLat = np.degrees(radiusKm * 1000 / EARTH_RADIUS_M)
+    dLng = dLat / max(np.cos(np.radians(latitude)), 1e-6)
+    lat, lng = columns['latitude'], columns['longitude']
+    box = (lat >= latitude - dLat) & (lat <= latitude + dLat)
+    if dLng < 180:
+        # the box may wrap around the antimeridian
+        delta = np.abs((lng - longitude + 180) % 360 - 180)
+        box &= delta <= dLng
+    rows = np.flatnonzero(box)
+    return rows[_haversine(columns, rows, latitude, longitude) <= radiusKm * 1000]
+
+
+def topK(features, norms, query, k: int, metric: str, rows=None, live=None):
+    """
+    Best k rows of one matrix for `query`, scanned BLOCK_ROWS at a time so a
+    memory-mapped matrix is never copied whole.
+    Args:
+        features (ndarray): Output of encode().
+        norms (ndarray): Norms from encode().
+        query (ndarray): Encoded row of the listing to match.
+        k (int): Number of rows to keep.
+        metric (str): 'cosine' (higher is closer) or 'l2' (squared distance, negated).
+        rows (ndarray, optional): Only consider these row positions.
+        live (ndarray, optional): Boolean mask of usable rows.
+    Returns:
+        tuple: (row positions, scores), best first.
+    """
+    total = len(features) if rows is None else len(rows)
+    if metric == 'cosine':
+        vector = query[:ATTRIBUTES]
+        queryNorm = max(float(np.linalg.norm(vector)), 1e-12)
+    else:
+        vector = query
+        querySquared = float(query @ query)
+
+    bestRows, bestScores = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    for start in range(0, total, BLOCK_ROWS):
+        end = min(start + BLOCK_ROWS, total)
+        if rows is None:
+            positions = np.arange(start, end)
+            block, blockNorms = features[start:end], norms[start:end]
+        else:
+            positions = rows[start:end]
+            block, blockNorms = features[positions], norms[positions]
+
+        if metric == 'cosine':
+            scores = (block[:, :ATTRIBUTES] @ vector) / (np.maximum(blockNorms[:, 0], 1e-12) * queryNorm)
+        else:
+            # -||a - q||^2 = 2 a.q - ||a||^2 - ||q||^2
+            scores = 2 * (block @ vector) - blockNorms[:, 1] - querySquared
+        if live is not None:
+            scores[~live[positions]] = -np.inf
+
+        if len(scores) > k:
+            keep = np.argpartition(scores, -k)[-k:]
+            positions, scores = positions[keep], scores[keep]
+        bestRows = np.concatenate([bestRows, positions])
+        bestScores = np.concatenate([bestScores, scores.astype(np.float32)])
+        if len(bestScores) > k:
+            keep = np.argpartition(bestScores, -k)[-k:]
+            bestRows, bestScores = bestRows[keep], bestScores[keep]
+
+    valid = np.isfinite(bestScores)
+    bestRows, bestScores = bestRows[valid], bestScores[valid]
+    order = np.argsort(-bestScores, kind='stable')
+    return bestRows[order], bestScores[order]
+
+
+class SimilarityIndex:
+    def __init__(self, index):
+        self.index = index
+        self.generation = None
+        self.features = None
+        self.norms = None
+        self.stats = None
+        self.overlay = None
+        self.overlayFeatures = None
+
+    def _load(self, generation: str, base: dict):
+        path = os.path.join(self.index.directory, generation)
+        featuresPath = os.path.join(path, FEATURES)
+        if not os.path.exists(featuresPath):
+            # concurrent workers may both encode; the renames keep files whole
+            stats = numericStats(base)
+            features, norms = encode(base, stats)
+            for name, values in ((FEATURE_STATS, stats), (FEATURE_NORMS, norms), (FEATURES, features)):
+                temporary = os.path.join(path, f"{name}.{os.getpid()}.tmp")
+                with open(temporary, 'wb') as f:
+                    np.save(f, values)
+                os.replace(temporary, os.path.join(path, name))
+        self.stats = np.load(os.path.join(path, FEATURE_STATS))
+        self.norms = np.load(os.path.join(path, FEATURE_NORMS), mmap_mode='r')
+        self.features = np.load(featuresPath, mmap_mode='r')
+        self.generation = generation
+        self.overlay = None
+        self.overlayFeatures = None
+
+    def _snapshot(self):
+        """Current base/overlay of the columnar index with their feature rows."""
+        index = self.index
+        with index.lock:
+            if not index._refresh():
+                return None
+            base, stale, overlay, generation = index.base, index.stale, index.overlay, index.generation
+            if generation != self.generation:
+                self._load(generation, base)
+            # the index swaps in a new overlay dict on every change
+            if overlay is not self.overlay:
+                self.overlay = overlay
+                self.overlayFeatures = encode(overlay, self.stats) if overlay is not None else None
+            return base, stale, overlay, self.features, self.norms, self.overlayFeatures
+
+    def similar(self, id: int, k: int, metric: str, radiusKm: float = None):
+        """
+        Listings closest to property `id` in feature space.
+        Args:
+            id (int): Property to match.
+            k (int): Number of results.
+            metric (str): One of METRICS.
+            radiusKm (float, optional): Only listings within this distance of it;
+                none match while either listing is not geocoded.
+        Returns:
+            list: (id, score, distance in meters) tuples, best first; score is
+            the cosine similarity or the l2 distance. None when the index is
+            not built, Property.DoesNotExist when the listing is not in it.
+        """
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return None
+        base, stale, overlay, features, norms, overlayEncoded = snapshot
+        live = None if stale is None else ~stale
+
+        position = None
+        if overlay is not None:
+            found = np.flatnonzero(overlay['id'] == id)
+            if len(found):
+                source, position, query = overlay, found[0], overlayEncoded[0][found[0]]
+        if position is None:
+            found = np.searchsorted(base['id'], id)
+            if found >= len(base['id']) or base['id'][found] != id or (live is not None and not live[found]):
+                raise Property.DoesNotExist
+            source, position, query = base, found, np.asarray(features[found])
+        latitude, longitude = float(source['latitude'][position]), float(source['longitude'][position])
+
+        # k + 1: the listing itself is always among the best
+        parts = [(base, features, norms, live)]
+        if overlay is not None:
+            parts.append((overlay, overlayEncoded[0], overlayEncoded[1], None))
+        results = []
+        for columns, partFeatures, partNorms, partLive in parts:
+            rows = _withinRadius(columns, latitude, longitude, radiusKm) if radiusKm is not None else None
+            positions, scores = topK(partFeatures, partNorms, query, k + 1, metric, rows, partLive)
+            distances = _haversine(columns, positions, latitude, longitude)
+            # NaN when either listing is not geocoded yet
+            distances = [None if np.isnan(d) else d for d in distances.tolist()]
+            results.extend(zip(columns['id'][positions].tolist(), scores.tolist(), distances))
+
+        results = sorted((r for r in results if r[0] != id), key=lambda r: (-r[1], r[0]))[:k]
+        if metric == 'l2':
+            results = [(rid, float(np.sqrt(max(-score, 0.0))), distance) for rid, score, distance in results]
+        return results
+
+
+_similarityIndex = None
+
+
+def similarityIndex() -> SimilarityIndex:
+    """Process-wide feature index over the shared columnar search index."""
+    global _similarityIndex
+    if _similarityIndex is None:
+        _similarityIndex = SimilarityIndex(searchIndex())
+    return _similarityIndex
+
+
+def parseSimilarParams(params) -> dict:
+    """
+    Raises:
+        ValueError: On a malformed k, metric or radius.
+    """
+    try:
+        k = int(params.get('k', DEFAULT_SIMILAR))
+    except ValueError:
+        raise ValueError("Invalid k")
+    if not 1 <= k <= MAX_SIMILAR:
+        raise ValueError(f"k must be between 1 and {MAX_SIMILAR}")
+
+    metric = params.get('metric', 'cosine').lower()
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {', '.join(METRICS)}")
+
+    radiusKm = None
+    if params.get('radius') not in (None, ''):
+        try:
+            radiusKm = float(params['radius'])
+        except ValueError:
+            raise ValueError("Invalid radius")
+        if not 0 < radiusKm <= MAX_SIMILAR_RADIUS_KM:
+            raise ValueError(f"radius must be between 0 and {MAX_SIMILAR_RADIUS_KM} km")
+    return {'k': k, 'metric': metric, 'radiusKm': radiusKm}
+
+
+def _similarFromSql(id: int, k: int, radiusKm: float = None) -> list:
+    # Without the index: same property type, nearest first
+    target = Property.objects.select_related('locationId').get(id=id)
+    point = target.locationId.coordinates
+    queryset = Property.objects.filter(propertyType=target.propertyType).exclude(id=id)
+    if target.locationId.geocodeStatus not in PLACED_GEOCODE_STATUSES:
+        # its POINT(0 0) placeholder says nothing about what is near it
+        if radiusKm is not None:
+            return []
+        return [(rid, None, None) for rid in queryset.order_by('-postedDate', '-id').values_list('id', flat=True)[:k]]
+    queryset = queryset.filter(locationId__geocodeStatus__in=PLACED_GEOCODE_STATUSES)
+    if radiusKm is not None:
+        queryset = queryset.filter(GeographyDWithin('locationId__coordinates', point.x, point.y, radiusKm * 1000))
+    rows = queryset.annotate(distanceMeters=KnnDistance('locationId__coordinates', point.x, point.y)) \
+        .order_by('distanceMeters', 'id').values_list('id', 'distanceMeters')[:k]
+    return [(rid, None, distance) for rid, distance in rows]
+
+
+def getSimilarProperties(id: int, k: int = DEFAULT_SIMILAR, metric: str = 'cosine', radiusKm: float = None) -> dict:
+    """
+    Up to k listings similar to property `id`, serialized like
+    PropertySearchSerializer plus their score.
+    Raises:
+        Property.DoesNotExist: If the property does not exist.
+    """
+    results = None
+    if getattr(settings, 'SEARCH_INDEX_ENABLED', False):
+        results = similarityIndex().similar(id, k, metric, radiusKm)
+    if results is None:
+        metric = None
+        results = _similarFromSql(id, k, radiusKm)
+
+    rows = {row['id']: row for row in propertySearchRows.serialize(Property.objects.filter(id__in=[r[0] for r in results]))}
+    properties = []
+    for rid, score, distance in results:
+        if rid in rows:
+            rows[rid]['distanceKm'] = distanceKm(distance)
+            rows[rid]['score'] = round(score, 6) if score is not None else None
+            properties.append(rows[rid])
+    return {'properties': properties, 'metric': metric}
@@ -3,6 +3,11 @@ from django.urls import path
 from .api import *
 urlpatterns = [
     path('', get_properties, name="properties"),
+    path('map/', get_property_map, name="property-map"),
+    path('tiles/<int:z>/<int:x>/<int:y>.mvt', get_property_tile, name="property-tile"),
+    path('market-stats/', get_market_stats, name="market-stats"),
+    path('<int:id>/similar/', get_similar_properties, name="property-similar"),
+    path('import', import_properties, name='property-import'),
     path('<str:id>/', PropertyViewDetails.as_view(), name="property"),
     path('create', perform_create, name='property-create'),
 ]
@@ -0,0 +1,67 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework import status
+from apps.models import SavedSearch
+from apps.views.property.services import parseLimit
+from .serializers import SavedSearchSerializer
+from .services import createSavedSearch, getInbox, markRead
+import logging
+
+
+@api_view(["GET", "POST"])
+@permission_classes([AllowAny])
+def saved_searches(request, cognitoId):
+    try:
+        if request.method == "POST":
+            savedSearch = createSavedSearch(cognitoId, request.data.get('name'), request.data.get('query', ''))
+            return Response({"data": SavedSearchSerializer(savedSearch).data}, status=status.HTTP_201_CREATED)
+
+        savedSearches = SavedSearch.objects.filter(tenantCognitoId=cognitoId).order_by('-createdAt')
+        return Response({"data": SavedSearchSerializer(savedSearches, many=True).data}, status=status.HTTP_200_OK)
+    except ValueError as e:
+        return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logging.error(f"Error handling saved searches: {str(e)}")
+        return Response({"message": f"Error handling saved searches: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(["DELETE"])
+@permission_classes([AllowAny])
+def delete_saved_search(request, cognitoId, id):
+    try:
+        deleted, _ = SavedSearch.objects.filter(id=id, tenantCognitoId=cognitoId).delete()
+        if not deleted:
+            return Response({"message": "Saved search not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    except Exception as e:
+        logging.error(f"Error deleting saved search: {str(e)}")
+        return Response({"message": f"Error deleting saved search: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def saved_search_inbox(request, cognitoId):
+    try:
+        unreadOnly = request.GET.get('unread', 'false').lower() == 'true'
+        return Response({"data": getInbox(cognitoId, unreadOnly, parseLimit(request.GET))}, status=status.HTTP_200_OK)
+    except ValueError as e:
+        return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logging.error(f"Error retrieving saved search inbox: {str(e)}")
+        return Response({"message": f"Error retrieving saved search inbox: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def mark_inbox_read(request, cognitoId):
+    try:
+        ids = request.data.get('ids')
+        if ids is not None and not isinstance(ids, list):
+            raise ValueError("ids must be a list")
+        return Response({"updated": markRead(cognitoId, ids)}, status=status.HTTP_200_OK)
+    except ValueError as e:
+        return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logging.error(f"Error updating saved search inbox: {str(e)}")
+        return Response({"message": f"Error updating saved search inbox: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,7 @@
+from rest_framework import serializers
+from apps.models import SavedSearch
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SavedSearch
+        fields = ['id', 'name', 'query', 'createdAt']
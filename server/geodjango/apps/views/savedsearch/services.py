@@ -0,0 +1,290 @@
+import logging
+import math
+from datetime import timedelta
+from functools import lru_cache
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import IntegerField, Value
+from django.http import QueryDict
+from django.utils import timezone
+from apps.functions import PointX, PointY
+from apps.models import (
+    Amenity, Highlight, PercolateJob, Property, SavedSearch, SavedSearchAnchor, SavedSearchMatch, choicesMask,
+)
+from apps.views.property.fastserializers import propertyRows
+from apps.views.property.services import buildPropertyQuerySet, hasLocation, parsePropertyFilters
+
+# Percolation: instead of re-running every saved search, each new or updated
+# listing is run against the saved searches. A saved search is stored under
+# the keys of its most selective predicate (SavedSearchAnchor): the grid cells
+# its radius covers, else its price bands, else its propertyType, else 'all'.
+# A listing looks up the (at most four) keys it falls under, the candidates are
+# pre-checked in Python and the survivors confirmed by buildPropertyQuerySet.
+
+ANCHOR_ALL = 'all'
+ANCHOR_CELL_DEGREES = 0.5
+MAX_ANCHOR_CELLS = 64
+ANCHOR_PRICE_BAND = 500
+MAX_ANCHOR_BANDS = 8
+# km per degree of latitude, rounded down so cell ranges err on the wide side
+KM_PER_DEGREE = 110.5
+CONFIRM_BATCH_SIZE = 100
+MAX_SAVED_SEARCHES_PER_TENANT = 50
+
+# Leased like GeocodeJob (apps/geocoding.py). Matching is idempotent, so a job
+# run twice after a lost lease only finds matches already in the inboxes.
+CLAIM_PERCOLATE_JOBS_SQL = """
+UPDATE "PercolateJob" SET "runAt" = now() + %s * interval '1 second', attempts = attempts + 1
+WHERE id IN (
+    SELECT id FROM "PercolateJob" WHERE "runAt" <= now()
+    ORDER BY "runAt" LIMIT %s
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING id, "propertyIds", attempts
+"""
+
+
+def _cell(latitude: float, longitude: float) -> str:
+    columns = round(360 / ANCHOR_CELL_DEGREES)
+    row = math.floor((latitude + 90) / ANCHOR_CELL_DEGREES)
+    column = math.floor((longitude + 180) / ANCHOR_CELL_DEGREES) % columns
+    return f"cell:{row}:{column}"
+
+
+def _circleCells(latitude: float, longitude: float, radiusKm: float):
+    """Grid cells of the circle's bounding box, or None if there are too many."""
+    dLat = radiusKm / KM_PER_DEGREE
+    south, north = max(-90.0, latitude - dLat), min(90.0, latitude + dLat)
+    # the circle is widest on its poleward edge
+    cos = math.cos(math.radians(max(abs(south), abs(north))))
+    if cos < 1e-6:
+        return None
+    dLng = radiusKm / (KM_PER_DEGREE * cos)
+    if dLng >= 180:
+        return None
+
+    rows = range(math.floor((south + 90) / ANCHOR_CELL_DEGREES), math.floor((north + 90) / ANCHOR_CELL_DEGREES) + 1)
+    firstColumn = math.floor((longitude - dLng + 180) / ANCHOR_CELL_DEGREES)
+    lastColumn = math.floor((longitude + dLng + 180) / ANCHOR_CELL_DEGREES)
+    if len(rows) * (lastColumn - firstColumn + 1) > MAX_ANCHOR_CELLS:
+        return None
+    columns = round(360 / ANCHOR_CELL_DEGREES)
+    return [f"cell:{row}:{column % columns}" for row in rows for column in range(firstColumn, lastColumn + 1)]
+
+
+def _priceBands(priceMin, priceMax):
+    if priceMax is None:
+        return None
+    first = math.floor((priceMin or 0) / ANCHOR_PRICE_BAND)
+    last = math.floor(priceMax / ANCHOR_PRICE_BAND)
+    if last - first + 1 > MAX_ANCHOR_BANDS:
+        return None
+    return [f"price:{band}" for band in range(first, last + 1)]
+
+
+def searchAnchors(filters: dict) -> list:
+    """Anchor keys of a saved search, from its most selective predicate."""
+    if hasLocation(filters):
+        cells = _circleCells(filters['latitude'], filters['longitude'], filters['radius'])
+        if cells is not None:
+            return cells
+    bands = _priceBands(filters['priceMin'], filters['priceMax'])
+    if bands is not None:
+        return bands
+    if filters['propertyType']:
+        return [f"type:{filters['propertyType']}"]
+    return [ANCHOR_ALL]
+
+
+def listingAnchors(row: dict) -> list:
+    """Every anchor key a listing can be found under."""
+    return [
+        _cell(row['latitude'], row['longitude']),
+        f"price:{math.floor(row['pricePerMonth'] / ANCHOR_PRICE_BAND)}",
+        f"type:{row['propertyType']}",
+        ANCHOR_ALL,
+    ]
+
+
+@lru_cache(maxsize=100000)
+def _savedFilters(query: str) -> dict:
+    # read-only: the dict is shared between calls
+    return parsePropertyFilters(QueryDict(query))
+
+
+def couldMatch(filters: dict, row: dict) -> bool:
+    """
+    Cheap pre-check of the column predicates. q, favoriteIds, radius and
+    availableFrom are left to confirmMatches.
+    """
+    price = row['pricePerMonth']
+    if filters['priceMin'] is not None and price < filters['priceMin']:
+        return False
+    if filters['priceMax'] is not None and price > filters['priceMax']:
+        return False
+    if filters['beds'] is not None and row['beds'] < filters['beds']:
+        return False
+    if filters['baths'] is not None and row['baths'] < filters['baths']:
+        return False
+    if filters['squareFeetMin'] is not None and row['squareFeet'] < filters['squareFeetMin']:
+        return False
+    if filters['squareFeetMax'] is not None and row['squareFeet'] > filters['squareFeetMax']:
+        return False
+    if filters['propertyType'] and row['propertyType'] != filters['propertyType']:
+        return False
+    if filters['amenities']:
+        mask = choicesMask(Amenity, filters['amenities'])
+        hits = row['amenityMask'] & mask
+        if (hits != mask) if filters['amenitiesMatch'] == 'all' else (hits == 0):
+            return False
+    if filters['highlights']:
+        mask = choicesMask(Highlight, filters['highlights'])
+        if row['highlightMask'] & mask != mask:
+            return False
+    return True
+
+
+def confirmMatches(propertyId: int, candidates: list) -> set:
+    """
+    Ids of the saved searches in `candidates` ([(id, filters)]) whose full
+    search returns `propertyId`: one UNION ALL query per batch.
+    """
+    matched = set()
+    for start in range(0, len(candidates), CONFIRM_BATCH_SIZE):
+        queries = [
+            buildPropertyQuerySet(filters).filter(id=propertyId)
+            .annotate(savedSearchId=Value(searchId, output_field=IntegerField()))
+            .values_list('savedSearchId', flat=True)
+            for searchId, filters in candidates[start:start + CONFIRM_BATCH_SIZE]
+        ]
+        matched.update(queries[0].union(*queries[1:], all=True))
+    return matched
+
+
+def percolate(propertyIds: list) -> int:
+    """
+    Match listings against every saved search and add the hits to the owners'
+    inboxes. A listing already in an inbox for a search is not added again.
+    Returns:
+        int: Number of matches found (including ones already in inboxes).
+    """
+    rows = Property.objects.filter(id__in=propertyIds).annotate(
+        longitude=PointX('locationId__coordinates'),
+        latitude=PointY('locationId__coordinates'),
+    ).values(
+        'id', 'pricePerMonth', 'beds', 'baths', 'squareFeet', 'propertyType',
+        'amenityMask', 'highlightMask', 'longitude', 'latitude',
+    )
+
+    matches = []
+    for row in rows:
+        candidates = SavedSearchAnchor.objects.filter(key__in=listingAnchors(row)).values_list(
+            'savedSearch_id', 'savedSearch__query', 'savedSearch__tenantCognitoId_id'
+        ).distinct()
+        owners, survivors = {}, []
+        for searchId, query, tenantId in candidates:
+            try:
+                filters = _savedFilters(query)
+            except ValueError:
+                continue
+            if couldMatch(filters, row):
+                owners[searchId] = tenantId
+                survivors.append((searchId, filters))
+        if not survivors:
+            continue
+        for searchId in confirmMatches(row['id'], survivors):
+            matches.append(SavedSearchMatch(savedSearch_id=searchId, tenantCognitoId_id=owners[searchId], propertyId_id=row['id']))
+
+    SavedSearchMatch.objects.bulk_create(matches, ignore_conflicts=True)
+    return len(matches)
+
+
+def enqueuePercolate(propertyIds: list):
+    """Queue `propertyIds` for percolate_worker; call inside the transaction that wrote them."""
+    now = timezone.now()
+    size = settings.PERCOLATE_JOB_SIZE
+    PercolateJob.objects.bulk_create([
+        PercolateJob(propertyIds=propertyIds[start:start + size], runAt=now)
+        for start in range(0, len(propertyIds), size)
+    ])
+
+
+def claimPercolateJobs(batchSize: int) -> list:
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(CLAIM_PERCOLATE_JOBS_SQL, [settings.PERCOLATE_JOB_LEASE, batchSize])
+        return cursor.fetchall()
+
+
+def processPercolateJobs(batchSize: int) -> dict:
+    """
+    Claim and run up to `batchSize` due jobs.
+    Returns:
+        dict: Jobs per outcome ('done', 'retry', 'failed') and the number of matches found.
+    """
+    counts = {'done': 0, 'retry': 0, 'failed': 0, 'matches': 0}
+    for jobId, propertyIds, attempts in claimPercolateJobs(batchSize):
+        try:
+            counts['matches'] += percolate(propertyIds)
+        except Exception as e:
+            logging.error(f"Error matching saved searches (job {jobId}): {str(e)}")
+            if attempts >= settings.PERCOLATE_MAX_ATTEMPTS:
+                PercolateJob.objects.filter(id=jobId).delete()
+                counts['failed'] += 1
+            else:
+                PercolateJob.objects.filter(id=jobId).update(
+                    runAt=timezone.now() + timedelta(seconds=60 * 2 ** attempts), lastError=str(e),
+                )
+                counts['retry'] += 1
+            continue
+        PercolateJob.objects.filter(id=jobId).delete()
+        counts['done'] += 1
+    return counts
+
+
+def anchorsFor(savedSearch: SavedSearch, filters: dict) -> list:
+    return [SavedSearchAnchor(savedSearch=savedSearch, key=key) for key in searchAnchors(filters)]
+
+
+def createSavedSearch(cognitoId: str, name: str, query: str) -> SavedSearch:
+    """
+    Save a get_properties query string for a tenant.
+    Raises:
+        ValueError: If the query is not a valid search or the tenant has too many.
+    """
+    query = query.lstrip('?')
+    filters = parsePropertyFilters(QueryDict(query))
+    if not name:
+        raise ValueError("name is required")
+    if SavedSearch.objects.filter(tenantCognitoId=cognitoId).count() >= MAX_SAVED_SEARCHES_PER_TENANT:
+        raise ValueError(f"A tenant can keep at most {MAX_SAVED_SEARCHES_PER_TENANT} saved searches")
+    with transaction.atomic():
+        savedSearch = SavedSearch.objects.create(tenantCognitoId_id=cognitoId, name=name, query=query)
+        SavedSearchAnchor.objects.bulk_create(anchorsFor(savedSearch, filters))
+    return savedSearch
+
+
+def getInbox(cognitoId: str, unreadOnly: bool, limit: int) -> list:
+    """Newest matches of a tenant's saved searches, with the matched property."""
+    matches = SavedSearchMatch.objects.filter(tenantCognitoId=cognitoId)
+    if unreadOnly:
+        matches = matches.filter(isRead=False)
+    matches = list(matches.select_related('savedSearch').order_by('-matchedAt')[:limit])
+    properties = {row['id']: row for row in propertyRows.serialize(
+        Property.objects.filter(id__in=[match.propertyId_id for match in matches])
+    )}
+    return [{
+        'id': match.id,
+        'savedSearchId': match.savedSearch_id,
+        'savedSearchName': match.savedSearch.name,
+        'matchedAt': match.matchedAt,
+        'isRead': match.isRead,
+        'property': properties.get(match.propertyId_id),
+    } for match in matches]
+
+
+def markRead(cognitoId: str, ids: list = None) -> int:
+    """Mark inbox entries (all of them without `ids`) as read."""
+    matches = SavedSearchMatch.objects.filter(tenantCognitoId=cognitoId, isRead=False)
+    if ids is not None:
+        matches = matches.filter(id__in=ids)
+    return matches.update(isRead=True)
@@ -0,0 +1,9 @@
+from django.urls import path
+from .api import delete_saved_search, mark_inbox_read, saved_search_inbox, saved_searches
+
+urlpatterns = [
+    path('<str:cognitoId>/', saved_searches, name='saved-searches'),
+    path('<str:cognitoId>/inbox/', saved_search_inbox, name='saved-search-inbox'),
+    path('<str:cognitoId>/inbox/read', mark_inbox_read, name='saved-search-inbox-read'),
+    path('<str:cognitoId>/<int:id>/', delete_saved_search, name='saved-search'),
+]
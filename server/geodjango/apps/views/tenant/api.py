@@ -10,7 +10,7 @@ from core.authMiddleware import jwt_auth
 from django.http import JsonResponse
 from rest_framework.decorators import permission_classes
 from apps.models import Property
-from apps.views.property.serializers import PropertySerializer
+from apps.views.property.fastserializers import propertyRows
 
 
 @api_view(["GET"])
@@ -129,13 +129,12 @@ def getCurrentResidences(request, cognitoId):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        properties = Property.objects.select_related('locationId').filter(
+        properties = Property.objects.filter(
             tenants__cognitoId=cognitoId
         )
-        
-        serializer = PropertySerializer(properties, many=True)
+
         return Response(
-            {"properties": serializer.data},
+            {"properties": propertyRows.serialize(properties)},
             status=status.HTTP_200_OK
         )
     except Exception as e:
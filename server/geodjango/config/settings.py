@@ -43,6 +43,7 @@ ALLOWED_HOSTS = [
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.gis',
+    'django.contrib.postgres',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -104,11 +105,107 @@ CORS_ALLOW_HEADERS = [
 
 
 
+# Property map: at most this many individual markers per viewport, above it
+# the map endpoint switches to grid clusters (capped at MAP_MAX_CLUSTERS)
+MAP_POINT_THRESHOLD = int(os.getenv('MAP_POINT_THRESHOLD', 200))
+MAP_MAX_CLUSTERS = int(os.getenv('MAP_MAX_CLUSTERS', 500))
+# Vector tiles (properties/tiles/z/x/y.mvt)
+MVT_MAX_FEATURES = int(os.getenv('MVT_MAX_FEATURES', 50000))
+MVT_CACHE_TIMEOUT = int(os.getenv('MVT_CACHE_TIMEOUT', 300))
+# Width of the price histogram buckets returned with ?facets=true
+FACET_PRICE_BUCKET = int(os.getenv('FACET_PRICE_BUCKET', 500))
+# Shared memory-mapped search index (python manage.py build_search_index)
+SEARCH_INDEX_ENABLED = os.getenv('SEARCH_INDEX_ENABLED', 'false').lower() == 'true'
+SEARCH_INDEX_DIR = BASE_DIR / 'searchindex'
+# properties/<id>/similar: km of distance worth one unit of feature difference (metric=l2)
+SIMILAR_LOCATION_SCALE_KM = float(os.getenv('SIMILAR_LOCATION_SCALE_KM', 25))
+
 LEAFLET_CONFIG = {
     'DEFAULT_CENTER': (55.505, -0.09),
     'DEFAULT_ZOOM': 13
 }
 
+# 'search' holds property search responses (apps/views/property/cache.py).
+# The default local memory backend keeps one copy per process.
+# django.core.cache.backends.redis.RedisCache with a redis:// SEARCH_CACHE_LOCATION
+# shares it between processes and hosts, and with it the search/geocode hit
+# counters, which only leave the process on a backend with an atomic incr
+# (Redis, Memcached) so `search_cache_stats` and `geocode_stats` can read them.
+SEARCH_CACHE_BACKEND = os.getenv('SEARCH_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'search': {
+        'BACKEND': SEARCH_CACHE_BACKEND,
+        'LOCATION': os.getenv('SEARCH_CACHE_LOCATION', 'property-search'),
+        'TIMEOUT': int(os.getenv('SEARCH_CACHE_TIMEOUT', 60)),
+    },
+}
+if not SEARCH_CACHE_BACKEND.endswith('RedisCache'):
+    CACHES['search']['OPTIONS'] = {'MAX_ENTRIES': int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 10000))}
+SEARCH_CACHE_TIMEOUT = int(os.getenv('SEARCH_CACHE_TIMEOUT', 60))
+# decimals kept from latitude/longitude in cache keys (3 is ~110 m)
+SEARCH_CACHE_COORDINATE_PRECISION = int(os.getenv('SEARCH_CACHE_COORDINATE_PRECISION', 3))
+
+# rows fetched per server-side cursor round trip by ?stream= responses
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 2000))
+
+# queue new/updated listings for matching against saved searches (apps/signals.py)
+SAVED_SEARCH_PERCOLATE = os.getenv('SAVED_SEARCH_PERCOLATE', 'true').lower() == 'true'
+# matched by `manage.py percolate_worker`: listings per PercolateJob, seconds a
+# claimed job stays invisible, attempts before it is dropped
+PERCOLATE_JOB_SIZE = int(os.getenv('PERCOLATE_JOB_SIZE', 1000))
+PERCOLATE_JOB_LEASE = int(os.getenv('PERCOLATE_JOB_LEASE', 300))
+PERCOLATE_MAX_ATTEMPTS = int(os.getenv('PERCOLATE_MAX_ATTEMPTS', 5))
+# locations/suggest: hard per-query budget, and the per-worker LRU in front of it
+LOCATION_SUGGEST_TIMEOUT_MS = int(os.getenv('LOCATION_SUGGEST_TIMEOUT_MS', 150))
+LOCATION_SUGGEST_CACHE_SIZE = int(os.getenv('LOCATION_SUGGEST_CACHE_SIZE', 2048))
+LOCATION_SUGGEST_CACHE_TTL = int(os.getenv('LOCATION_SUGGEST_CACHE_TTL', 300))
+
+# Geocoding of new locations by `manage.py geocode_worker` (apps/geocoding.py).
+# GEOCODER_URL may point at `manage.py geocode_stub` for local runs.
+GEOCODER_CLASS = os.getenv('GEOCODER_CLASS', 'apps.geocoding.NominatimGeocoder')
+GEOCODER_URL = os.getenv('GEOCODER_URL', 'https://nominatim.openstreetmap.org/search')
+GEOCODER_USER_AGENT = os.getenv('GEOCODER_USER_AGENT', 'RealEstateApp (justsomedummyemail@gmail.com)')
+GEOCODER_TIMEOUT = float(os.getenv('GEOCODER_TIMEOUT', 5))
+# across all workers; the Nominatim usage policy allows at most 1 request/s
+GEOCODER_RATE_PER_SECOND = float(os.getenv('GEOCODER_RATE_PER_SECOND', 1))
+GEOCODE_MAX_ATTEMPTS = int(os.getenv('GEOCODE_MAX_ATTEMPTS', 6))
+GEOCODE_RETRY_BASE_DELAY = int(os.getenv('GEOCODE_RETRY_BASE_DELAY', 30))
+GEOCODE_RETRY_MAX_DELAY = int(os.getenv('GEOCODE_RETRY_MAX_DELAY', 3600))
+# seconds a claimed job stays invisible to other workers: one rate limit
+# slot wait per concurrent worker plus GEOCODER_TIMEOUT, with room to spare
+GEOCODE_JOB_LEASE = int(os.getenv('GEOCODE_JOB_LEASE', 120))
+# GeocodeCache: per-process LRU in front of the table, and how long a
+# "no match" answer is trusted before the geocoder is asked again
+GEOCODE_LRU_SIZE = int(os.getenv('GEOCODE_LRU_SIZE', 10000))
+GEOCODE_LRU_TTL = int(os.getenv('GEOCODE_LRU_TTL', 3600))
+GEOCODE_NEGATIVE_TTL_DAYS = int(os.getenv('GEOCODE_NEGATIVE_TTL_DAYS', 30))
+
+# Property photos (apps/photos.py): uploads above FILE_UPLOAD_MAX_MEMORY_SIZE
+# are spooled to a temp file instead of being held in memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', 2 * 1024 * 1024))
+PHOTO_MAX_BYTES = int(os.getenv('PHOTO_MAX_BYTES', 20 * 1024 * 1024))
+PHOTO_CHUNK_SIZE = int(os.getenv('PHOTO_CHUNK_SIZE', 1024 * 1024))
+PHOTO_MAX_ATTEMPTS = int(os.getenv('PHOTO_MAX_ATTEMPTS', 5))
+PHOTO_JOB_LEASE = int(os.getenv('PHOTO_JOB_LEASE', 300))
+
+# Serving MEDIA_URL (apps/views/media): '' streams from Django,
+# 'x-accel-redirect' (nginx, internal location MEDIA_ACCEL_PREFIX aliased to
+# MEDIA_ROOT) or 'x-sendfile' leave the transfer to the front server
+MEDIA_SENDFILE = os.getenv('MEDIA_SENDFILE', '').lower()
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')
+# max-age of media files that are not content-addressed
+MEDIA_MAX_AGE = int(os.getenv('MEDIA_MAX_AGE', 3600))
+# Unreferenced blobs are only collected once unused this long (seconds)
+MEDIA_GC_GRACE = int(os.getenv('MEDIA_GC_GRACE', 24 * 3600))
+
+# Bulk property import (apps/importer.py): rows per COPY batch and checkpoint,
+# and how many rejected rows are listed in the report
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 5000))
+IMPORT_MAX_ERRORS = int(os.getenv('IMPORT_MAX_ERRORS', 100))
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -17,8 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from apps.views.views import HelloWorld
-from django.conf.urls.static import static
-from .settings import MEDIA_URL, MEDIA_ROOT
+from .settings import MEDIA_URL
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('hello-world/', HelloWorld.as_view(), name="hello-world"),
@@ -27,7 +26,10 @@ urlpatterns = [
     path('properties/', include('apps.views.property.urls'), name="property"),
     path('leases/', include('apps.views.lease.urls'), name="lease"),
     path('applications/', include('apps.views.application.urls'), name="application"),
+    path('saved-searches/', include('apps.views.savedsearch.urls'), name="saved-search"),
+    path('locations/', include('apps.views.location.urls'), name="location"),
+    # Ảnh tải lên: cache immutable, ETag, Range, X-Accel-Redirect (apps/views/media)
+    path(MEDIA_URL.lstrip('/'), include('apps.views.media.urls')),
     # path('payments/', include('apps.views.payment.urls'), name="payment"),
 
 ]
-urlpatterns += static(MEDIA_URL, document_root=MEDIA_ROOT)
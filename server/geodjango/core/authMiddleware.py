@@ -97,11 +97,13 @@ def jwt_auth(allowed_roles=None):
     
     def decorator(view_func):
         @wraps(view_func)
-        def wrapped_view(view_instance, request, *args, **kwargs):
+        def wrapped_view(*args, **kwargs):
+            # (self, request) on APIView methods, (request,) on function views
+            request = args[-1]
             middleware = JwtAuthMiddleware(lambda req: None)
-            result = middleware.process_view(request, view_func, args, {'allowed_roles': allowed_roles})
+            result = middleware.process_view(request, view_func, args[:-1], {'allowed_roles': allowed_roles})
             if result:
                 return result
-            return view_func(view_instance, request, *args, **kwargs)
+            return view_func(*args, **kwargs)
         return wrapped_view
     return decorator
\ No newline at end of file
@@ -0,0 +1,34 @@
+import hashlib
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+
+# Conditional GET helpers. Views compute a strong ETag from cheap inputs
+# (row versions, filter key + data generation) before doing the real work,
+# and answer 304 without querying or serializing when the client has it.
+
+NOT_MODIFIED_CACHE_CONTROL = 'no-cache'
+
+
+def strongETag(*parts) -> str:
+    raw = ':'.join(str(part) for part in parts)
+    return quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+
+
+def etagMatches(request, etag: str) -> bool:
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    # If-None-Match uses weak comparison (RFC 9110 13.1.2)
+    candidates = [tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(header)]
+    return '*' in candidates or etag in candidates
+
+
+def notModified(etag: str) -> HttpResponseNotModified:
+    return withETag(HttpResponseNotModified(), etag)
+
+
+def withETag(response, etag: str):
+    response['ETag'] = etag
+    # cache, but revalidate every time: the client gets a 304 while nothing changed
+    response['Cache-Control'] = NOT_MODIFIED_CACHE_CONTROL
+    return response
@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Small per-process LRU with an optional time to live, for hot lookups that
+# should not pay even a cache round trip (location suggestions, geocoding).
+# Entries are not shared between workers; each one warms its own copy.
+
+_MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, maxSize: int, ttl: float = None):
+        """
+        Args:
+            maxSize (int): Entries kept; the least recently used one is evicted first.
+            ttl (float, optional): Seconds an entry stays valid, forever when None.
+        """
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        if self.maxSize <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self.lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxSize:
+                self.entries.popitem(last=False)
+
+    def getOrSet(self, key, compute):
+        """Cached value of `key`, or store and return compute(). None is never cached."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'maxSize': self.maxSize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRate': self.hits / total if total else None,
+            }
@@ -0,0 +1,143 @@
+from operator import itemgetter
+from django.db.models import Value
+from rest_framework import serializers
+
+# DRF fields whose to_representation returns database values unchanged
+# (str(str), int(int), float(float8), bool(bool), choice key == value)
+PASSTHROUGH_FIELDS = (
+    serializers.CharField, serializers.ChoiceField, serializers.IntegerField,
+    serializers.FloatField, serializers.BooleanField,
+)
+
+
+class MethodColumn:
+    """
+    How to read a SerializerMethodField in SQL.
+    Args:
+        expression (callable, optional): path -> expression, e.g. ST_X of `{path}coordinates`.
+        annotation (str, optional): Annotation the queryset may already carry;
+            read as NULL when it doesn't.
+        outputField (Field, optional): Type of that NULL.
+        convert (callable, optional): Applied to non-NULL values.
+    """
+
+    def __init__(self, expression=None, annotation=None, outputField=None, convert=None):
+        self.expression = expression
+        self.annotation = annotation
+        self.outputField = outputField
+        self.convert = convert
+
+
+class RowSerializer:
+    """
+    Read-only serializer compiled from a DRF ModelSerializer. The queryset is
+    read with values_list() (relations joined, method fields computed in SQL)
+    and each tuple goes through a renderer built once per serializer: one
+    itemgetter call picks its columns and converters run only on the fields
+    that need one, instead of DRF's per-field get_attribute /
+    to_representation. Output is equal, key order included, to
+    `serializerClass(obj).data`, so any JSON renderer produces the same bytes.
+
+    Nested serializers must follow non-null foreign keys.
+    """
+
+    def __init__(self, serializerClass, methodColumns: dict = None):
+        self.lookups = []
+        self.expressions = {}
+        self.optional = {}
+        self.methodColumns = methodColumns or {}
+        self.render = self._compile(serializerClass(), '')
+        self.methodColumns = None
+
+    def _column(self, lookup: str) -> int:
+        self.lookups.append(lookup)
+        return len(self.lookups) - 1
+
+    @staticmethod
+    def _renderer(fields: list):
+        """
+        Build row -> dict from (key, column index, converter) in output order.
+        A converter is skipped for NULL; an index of None marks a nested
+        serializer, whose renderer gets the whole row.
+        """
+        keys = tuple(key for key, _, _ in fields)
+        columns = [0 if index is None else index for _, index, _ in fields]
+        getter = itemgetter(*columns) if len(columns) > 1 else lambda row: tuple(row[index] for index in columns)
+        converted = [(position, convert) for position, (_, index, convert) in enumerate(fields) if index is not None and convert]
+        nested = [(position, render) for position, (_, index, render) in enumerate(fields) if index is None]
+        if not converted and not nested:
+            return lambda row: dict(zip(keys, getter(row)))
+
+        def render(row):
+            values = list(getter(row))
+            for position, convert in converted:
+                if values[position] is not None:
+                    values[position] = convert(values[position])
+            for position, renderNested in nested:
+                values[position] = renderNested(row)
+            return dict(zip(keys, values))
+        return render
+
+    def _converter(self, field):
+        if isinstance(field, serializers.ListField):
+            child = self._converter(field.child)
+            if child is None:
+                return list
+            return lambda value: [None if item is None else child(item) for item in value]
+        if isinstance(field, PASSTHROUGH_FIELDS):
+            return None
+        return field.to_representation
+
+    def _compile(self, serializer, path: str):
+        model = serializer.Meta.model
+        fields = []
+        for name, field in serializer.fields.items():
+            if isinstance(field, serializers.SerializerMethodField):
+                spec = self.methodColumns.get((type(serializer), name))
+                if spec is None:
+                    raise ValueError(f"No MethodColumn for {type(serializer).__name__}.{name}")
+                if spec.expression is not None:
+                    lookup = f"row{len(self.lookups)}"
+                    self.expressions[lookup] = spec.expression(path)
+                else:
+                    lookup = spec.annotation
+                    self.optional[lookup] = spec.outputField
+                fields.append((name, self._column(lookup), spec.convert))
+            elif isinstance(field, serializers.ListSerializer):
+                # DRF skips read-only fields whose source doesn't exist (Lease has
+                # payment_set, not payments); anything else isn't supported here
+                if not hasattr(model, field.source) and not field.required:
+                    continue
+                raise ValueError(f"Nested many=True field {name} is not supported")
+            elif isinstance(field, serializers.BaseSerializer):
+                fields.append((name, None, self._compile(field, f"{path}{field.source}__")))
+            else:
+                fields.append((name, self._column(f"{path}{field.source}"), self._converter(field)))
+        return self._renderer(fields)
+
+    def values(self, queryset, extra=()):
+        """
+        values_list() queryset feeding render(). `extra` lookups are appended
+        after the rendered columns (see position()).
+        """
+        annotations = dict(self.expressions)
+        for name, outputField in self.optional.items():
+            if name not in queryset.query.annotations:
+                annotations[name] = Value(None, output_field=outputField)
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset.values_list(*self.lookups, *[e for e in extra if e not in self.lookups])
+
+    def position(self, lookup: str, extra=()) -> int:
+        if lookup in self.lookups:
+            return self.lookups.index(lookup)
+        return len(self.lookups) + [e for e in extra if e not in self.lookups].index(lookup)
+
+    def serialize(self, queryset) -> list:
+        render = self.render
+        return [render(row) for row in self.values(queryset)]
+
+    def iterate(self, queryset, chunkSize: int):
+        render = self.render
+        for row in self.values(queryset).iterator(chunk_size=chunkSize):
+            yield render(row)
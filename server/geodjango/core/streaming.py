@@ -0,0 +1,81 @@
+import json
+import logging
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+logger = logging.getLogger(__name__)
+
+STREAM_FORMATS = ('json', 'ndjson')
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+
+def streamChunkSize() -> int:
+    return getattr(settings, 'STREAM_CHUNK_SIZE', 2000)
+
+
+def parseStreamFormat(request):
+    """
+    Streaming format requested through ?stream=json|ndjson (a query parameter,
+    not Accept: DRF answers 406 to media types it has no renderer for).
+    None means a regular, buffered response.
+    Raises:
+        ValueError: If ?stream= is not a known format.
+    """
+    value = request.GET.get('stream', '').lower()
+    if value in ('', 'false'):
+        return None
+    if value == 'true':
+        return 'json'
+    if value not in STREAM_FORMATS:
+        raise ValueError(f"stream must be one of: {', '.join(STREAM_FORMATS)}")
+    return value
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, cls=DjangoJSONEncoder)
+
+
+def _jsonChunks(rows, key: str):
+    yield '{' + _dumps(key) + ':['
+    first = True
+    for row in rows:
+        yield ('' if first else ',') + _dumps(row)
+        first = False
+    yield ']}'
+
+
+def _ndjsonChunks(rows):
+    for row in rows:
+        yield _dumps(row) + '\n'
+
+
+def _guarded(chunks, label: str):
+    # The status line is already sent when rows fail, so the body is cut short
+    # (invalid JSON / a missing trailing line) and the error only gets logged
+    try:
+        yield from chunks
+    except Exception as e:
+        logger.error(f"Error streaming {label}: {str(e)}")
+
+
+def streamingJsonResponse(rows, key: str, streamFormat: str, label: str) -> StreamingHttpResponse:
+    """
+    Response that serializes `rows` while they are produced, so memory stays
+    flat and the first bytes leave before the query is exhausted.
+    Args:
+        rows (iterable): Serialized rows (dicts), usually fed by QuerySet.iterator().
+        key (str): Key of the array in the JSON body, e.g. {"data": [...]}.
+        streamFormat (str): 'json' or 'ndjson' (one row per line, no wrapper).
+        label (str): What is streamed, for the error log.
+    Returns:
+        StreamingHttpResponse
+    """
+    if streamFormat == 'ndjson':
+        chunks, contentType = _ndjsonChunks(rows), NDJSON_CONTENT_TYPE
+    else:
+        chunks, contentType = _jsonChunks(rows, key), 'application/json'
+    response = StreamingHttpResponse(_guarded(chunks, label), content_type=contentType)
+    # ask nginx not to buffer the body, otherwise nothing is sent before the end
+    response['X-Accel-Buffering'] = 'no'
+    return response